@@ -0,0 +1,128 @@
+import asyncio
+import time
+from collections import OrderedDict, namedtuple
+from functools import update_wrapper
+
+AsyncCacheInfo = namedtuple(
+    "AsyncCacheInfo",
+    ["hits", "misses", "coalesced", "stale", "refreshes", "errors", "maxsize", "currsize"],
+)
+
+_KWD_MARK = object()
+
+
+def async_memoize(ttl=60.0, stale_ttl=0.0, maxsize=1024, timer=time.monotonic):
+    """
+    Memoize an `async def` function: caches results, not coroutine objects.
+
+    - Single-flight: concurrent misses for one key share one in-flight task,
+      so a cold key costs one backend call however many callers arrive
+    - ttl: seconds a result is fresh
+    - stale_ttl: seconds after that during which the stale result is still
+      returned immediately while one background task refreshes it
+    - Exceptions reach every waiting caller and are never cached; a failed
+      background refresh keeps serving the stale value until it runs out
+
+    Meant for one event loop; no locks are needed because the bookkeeping
+    never awaits.
+    """
+    def decorator(func):
+        entries = OrderedDict()  # key -> (result, fresh until, stale until)
+        inflight = {}  # key -> asyncio.Task
+        stats = dict.fromkeys(["hits", "misses", "coalesced", "stale", "refreshes", "errors"], 0)
+
+        def make_key(args, kwargs):
+            if not kwargs:
+                return args[0] if len(args) == 1 and type(args[0]) in (int, str) else args
+            return args + (_KWD_MARK,) + tuple(kwargs.items())
+
+        async def load(key, args, kwargs):
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                stats["errors"] += 1
+                raise
+            finally:
+                del inflight[key]
+            now = timer()
+            entries[key] = (result, now + ttl, now + ttl + stale_ttl)
+            entries.move_to_end(key)
+            while len(entries) > maxsize:
+                entries.popitem(last=False)
+            return result
+
+        def start(key, args, kwargs):
+            task = inflight[key] = asyncio.ensure_future(load(key, args, kwargs))
+            # Mark the exception retrieved: waiters re-raise it, refreshes drop it
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            return task
+
+        async def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            entry = entries.get(key)
+            if entry is not None:
+                result, fresh_until, stale_until = entry
+                now = timer()
+                if now < fresh_until:
+                    stats["hits"] += 1
+                    entries.move_to_end(key)
+                    return result
+                if now < stale_until:
+                    stats["stale"] += 1
+                    if key not in inflight:
+                        stats["refreshes"] += 1
+                        start(key, args, kwargs)
+                    return result
+
+            task = inflight.get(key)
+            if task is None:
+                stats["misses"] += 1
+                task = start(key, args, kwargs)
+            else:
+                stats["coalesced"] += 1
+            # Shielded: one caller being cancelled must not cancel the others
+            return await asyncio.shield(task)
+
+        def cache_info():
+            return AsyncCacheInfo(**stats, maxsize=maxsize, currsize=len(entries))
+
+        def cache_clear():
+            entries.clear()
+            stats.update(dict.fromkeys(stats, 0))
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return update_wrapper(wrapper, func)
+
+    return decorator
+
+
+backend_calls = 0
+
+
+@async_memoize(ttl=0.5, stale_ttl=5.0)
+async def product_price(sku: str) -> float:
+    global backend_calls
+    backend_calls += 1
+    await asyncio.sleep(0.1)  # Simulate a slow pricing service
+    return 19.99
+
+
+async def main():
+    # 1,000 concurrent requests for a cold key: one backend call
+    prices = await asyncio.gather(*(product_price("SKU-1") for _ in range(1000)))
+    print(f"{len(prices)} results, {backend_calls} backend call")
+    print(product_price.cache_info())
+    # AsyncCacheInfo(hits=0, misses=1, coalesced=999, stale=0, refreshes=0, errors=0, maxsize=1024, currsize=1)
+
+    # Past the TTL: the stale price comes back at once, refreshed in the background
+    await asyncio.sleep(0.6)
+    await asyncio.gather(*(product_price("SKU-1") for _ in range(1000)))
+    await asyncio.sleep(0.2)
+    print(f"{backend_calls} backend calls after stale-while-revalidate")
+    print(product_price.cache_info())
+    # AsyncCacheInfo(hits=0, misses=1, coalesced=999, stale=1000, refreshes=1, errors=0, maxsize=1024, currsize=1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
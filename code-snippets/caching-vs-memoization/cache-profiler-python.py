@@ -0,0 +1,219 @@
+import inspect
+import random
+import time
+from collections import Counter, OrderedDict
+from functools import lru_cache, update_wrapper
+from itertools import accumulate
+
+_KWD_MARK = object()
+_profiled = []
+
+
+class StackDistances:
+    """
+    Ghost LRU cache: remembers the last `capacity` keys, not their values,
+    and records each access's LRU stack distance (Mattson's algorithm). An
+    access at distance d hits in any LRU cache larger than d, so one pass
+    gives the miss ratio for every cache size up to `capacity`.
+
+    Distances are counted with a Fenwick tree over access times, O(log n)
+    per access.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.histogram = [0] * capacity  # distance -> accesses
+        self.beyond = 0  # first accesses, or keys older than `capacity`
+        self.accesses = 0
+        self._last = OrderedDict()  # key -> access time, oldest first
+        self._size = 4 * capacity + 4
+        self._tree = [0] * (self._size + 1)
+        self._clock = 0
+
+    def _add(self, slot, delta):
+        while slot <= self._size:
+            self._tree[slot] += delta
+            slot += slot & -slot
+
+    def _count_to(self, slot):
+        total = 0
+        while slot > 0:
+            total += self._tree[slot]
+            slot -= slot & -slot
+        return total
+
+    def access(self, key):
+        """Record one access; return its stack distance, or None if beyond capacity."""
+        self.accesses += 1
+        if self._clock == self._size:
+            self._renumber()
+        previous = self._last.pop(key, None)
+        distance = None
+        if previous is not None:
+            distance = self._count_to(self._clock) - self._count_to(previous)
+            self._add(previous, -1)
+            self.histogram[distance] += 1
+        else:
+            self.beyond += 1
+
+        self._clock += 1
+        self._last[key] = self._clock
+        self._add(self._clock, 1)
+        if len(self._last) > self.capacity:
+            _, oldest = self._last.popitem(last=False)
+            self._add(oldest, -1)
+        return distance
+
+    def _renumber(self):
+        # Access times only matter relative to each other: compact them to 1..n
+        self._tree = [0] * (self._size + 1)
+        for clock, key in enumerate(self._last, start=1):
+            self._last[key] = clock
+            self._add(clock, 1)
+        self._clock = len(self._last)
+
+    def miss_ratio(self, size):
+        if not self.accesses:
+            return 0.0
+        hits = sum(self.histogram[:min(size, self.capacity)])
+        return 1 - hits / self.accesses
+
+
+class _TopKeys(Counter):
+    """Counter that keeps only its heaviest keys, so memory stays bounded."""
+
+    def __init__(self, keep):
+        super().__init__()
+        self.keep = keep
+
+    def add(self, key):
+        self[key] += 1
+        if len(self) > 10 * self.keep:
+            survivors = self.most_common(self.keep)
+            self.clear()
+            self.update(dict(survivors))
+
+
+class CacheProfile:
+    """What one memoized function's cache is doing, and what it would do at other sizes."""
+
+    def __init__(self, name, maxsize, ghost_factor=4, top=10):
+        self.name = name
+        self.maxsize = maxsize
+        self.ghost = StackDistances(max(1, ghost_factor * (maxsize or 1024)))
+        self.top = top
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+        self.refetches = 0
+        self.hot_keys = _TopKeys(top)
+        self.thrashing_keys = _TopKeys(top)
+
+    def record(self, key, hit, elapsed):
+        distance = self.ghost.access(key)
+        self.hot_keys.add(key)
+        if hit:
+            self.hits += 1
+            return
+        self.misses += 1
+        self.miss_seconds += elapsed
+        if distance is not None:
+            # Seen recently enough to be remembered, yet missed: evicted, then fetched again
+            self.refetches += 1
+            self.thrashing_keys.add(key)
+
+    def miss_ratio_curve(self, sizes=None):
+        if sizes is None:
+            base = self.maxsize or 1024
+            sizes = sorted({max(1, int(base * factor)) for factor in (0.25, 0.5, 1, 2, 4)})
+        return [(size, self.ghost.miss_ratio(size)) for size in sizes]
+
+    def suggested_size(self, tolerance=0.01):
+        """Smallest simulated size within `tolerance` of the best miss ratio."""
+        accesses = self.ghost.accesses
+        if not accesses:
+            return 1
+        # One running sum of the histogram gives the hits at every size: O(capacity)
+        ratios = [1 - hits / accesses for hits in accumulate(self.ghost.histogram)]
+        best = ratios[-1]  # A larger LRU cache never misses more
+        return next(size for size, ratio in enumerate(ratios, start=1) if ratio <= best + tolerance)
+
+    def report(self):
+        calls = self.hits + self.misses
+        mean_miss = self.miss_seconds / self.misses if self.misses else 0.0
+        lines = [
+            f"{self.name}: {calls} calls, hit ratio {self.hits / max(calls, 1):.1%}, maxsize {self.maxsize}",
+            f"  mean miss {mean_miss * 1000:.2f}ms, ~{self.hits * mean_miss:.2f}s saved by hits",
+            f"  evicted then refetched: {self.refetches} ({self.refetches / max(self.misses, 1):.1%} of misses)",
+            f"  hot keys: {self.hot_keys.most_common(5)}",
+            f"  thrashing keys: {self.thrashing_keys.most_common(5)}",
+            "  simulated LRU miss ratio: " + ", ".join(
+                f"{size}: {ratio:.1%}" for size, ratio in self.miss_ratio_curve()
+            ),
+            f"  suggested maxsize: {self.suggested_size()}",
+        ]
+        return "\n".join(lines)
+
+
+def profiled(cached, ghost_factor=4, top=10):
+    """
+    Instrument a memoized function that exposes cache_info(): functools.lru_cache
+    or any of the memoizers in this directory. A call is a miss if it moved
+    cache_info().misses; its duration is the miss latency. Counts can be
+    misattributed when several threads call the same function at once.
+
+    An `async def` memoizer (async_memoize) gets an async wrapper that awaits
+    the result, so the latency is the backend's, not coroutine creation's;
+    calls overlapping on one event loop can be misattributed the same way.
+    """
+    profile = CacheProfile(cached.__qualname__, cached.cache_info().maxsize, ghost_factor, top)
+    _profiled.append(profile)
+
+    def make_key(args, kwargs):
+        key = args if not kwargs else args + (_KWD_MARK,) + tuple(sorted(kwargs.items()))
+        return key[0] if len(key) == 1 else key
+
+    if inspect.iscoroutinefunction(cached):
+        async def wrapper(*args, **kwargs):
+            misses = cached.cache_info().misses
+            start = time.perf_counter()
+            result = await cached(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            profile.record(make_key(args, kwargs), cached.cache_info().misses == misses, elapsed)
+            return result
+    else:
+        def wrapper(*args, **kwargs):
+            misses = cached.cache_info().misses
+            start = time.perf_counter()
+            result = cached(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            profile.record(make_key(args, kwargs), cached.cache_info().misses == misses, elapsed)
+            return result
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    wrapper.cache_profile = profile
+    return update_wrapper(wrapper, cached)
+
+
+def report_all():
+    return "\n\n".join(profile.report() for profile in _profiled)
+
+
+@profiled
+@lru_cache(maxsize=128)
+def expensive_computation(n: int) -> int:
+    """Pure function - result depends only on input."""
+    time.sleep(0.0002)  # Simulate expensive operation
+    return n * n
+
+
+if __name__ == "__main__":
+    # Skewed traffic over 2,000 keys: a few are hot, most are rare
+    random.seed(1)
+    keys = random.choices(range(2000), weights=[1 / (rank + 1) for rank in range(2000)], k=20_000)
+    for n in keys:
+        expensive_computation(n)
+
+    print(expensive_computation.cache_info())
+    print(report_all())
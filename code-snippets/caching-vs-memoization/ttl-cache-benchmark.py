@@ -0,0 +1,108 @@
+"""
+Checks and hit-path benchmark for ttl_cache (ttl-cache-python.py) against
+functools.lru_cache.
+
+The checks drive expiry with a fake clock, so they run instantly: per-entry
+TTL, weight-based eviction, and consistent counters under eight threads.
+"""
+
+import importlib.util
+import os
+import threading
+import timeit
+from functools import lru_cache
+
+spec = importlib.util.spec_from_file_location(
+    "ttl_cache_python", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ttl-cache-python.py")
+)
+ttl_cache_python = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(ttl_cache_python)
+ttl_cache = ttl_cache_python.ttl_cache
+
+CALLS = 1_000_000
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def check_expiry():
+    clock = FakeClock()
+    calls = []
+
+    @ttl_cache(ttl=lambda value: 1.0 if value < 10 else 5.0, timer=clock)
+    def lookup(n):
+        calls.append(n)
+        return n
+
+    lookup(1), lookup(20)
+    clock.now = 2.0
+    lookup(1), lookup(20)  # 1 expired after 1s, 20 still fresh
+    assert calls == [1, 20, 1], calls
+    clock.now = 10.0
+    lookup(99)  # A miss drains both expired entries
+    assert lookup.cache_info().expired == 2, lookup.cache_info()
+
+
+def check_weight():
+    @ttl_cache(ttl=60.0, maxsize=None, maxweight=1000, weigh=len)
+    def blob(n):
+        return b"x" * n
+
+    blob(400), blob(400 + 1), blob(300)
+    info = blob.cache_info()
+    # Least recently used 400 bytes went to fit the 300
+    assert (info.currsize, info.currweight) == (2, 701), info
+    blob(5000)  # Heavier than the whole cache: returned, never cached
+    assert blob.cache_info().currweight == 701
+
+
+def check_threads():
+    @ttl_cache(ttl=60.0, maxsize=50)
+    def square(n):
+        return n * n
+
+    def worker():
+        for i in range(20_000):
+            assert square(i % 100) == (i % 100) ** 2
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    info = square.cache_info()
+    assert info.hits + info.misses == 8 * 20_000 and info.currsize <= 50, info
+
+
+def hit_path_ns(cached):
+    cached(42)
+    return min(timeit.repeat(lambda: cached(42), number=CALLS, repeat=3)) / CALLS * 1e9
+
+
+def main():
+    check_expiry()
+    check_weight()
+    check_threads()
+    print("checks passed")
+
+    def square(n):
+        return n * n
+
+    baseline = hit_path_ns(square)
+    print(f"{'':<32} {'ns/call':>8} {'over plain call':>16}")
+    for name, cached in (
+        ("functools.lru_cache(128)", lru_cache(maxsize=128)(square)),
+        ("ttl_cache(ttl=60)", ttl_cache(ttl=60.0)(square)),
+        ("ttl_cache(ttl=60, maxweight=64K)", ttl_cache(ttl=60.0, maxweight=64 * 1024)(square)),
+    ):
+        cost = hit_path_ns(cached)
+        print(f"{name:<32} {cost:>8.0f} {cost - baseline:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import heapq
+import itertools
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import update_wrapper
+
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize", "maxweight", "currweight", "expired"]
+)
+
+_KWD_MARK = object()
+
+
+def ttl_cache(ttl=60.0, maxsize=128, maxweight=None, weigh=sys.getsizeof, timer=time.monotonic):
+    """
+    lru_cache with expiry: entries live for `ttl` seconds, then are recomputed.
+
+    - ttl: seconds, or a callable taking the result and returning seconds, so
+      each entry can have its own lifetime (e.g. shorter for low stock)
+    - maxsize: entry count bound (None for no count bound)
+    - maxweight: total weight bound, in bytes by default (None for no bound);
+      `weigh` measures one result. Least recently used entries go first
+    - Expiry is lazy: a hit checks its own deadline (O(1)), and a min-heap of
+      deadlines is drained on misses, so expired entries free their weight
+      without a sweeper thread
+
+    Thread-safe: one lock guards the bookkeeping; the function itself runs
+    outside it, so concurrent misses on one key may both compute.
+    """
+    def decorator(func):
+        entries = OrderedDict()  # key -> [result, deadline, weight]
+        deadlines = []  # heap of (deadline, seq, key); stale items are skipped
+        sequence = itertools.count()  # tie-breaker, so keys are never compared
+        lock = threading.Lock()
+        stats = {"hits": 0, "misses": 0, "expired": 0, "weight": 0}
+
+        def make_key(args, kwargs):
+            if not kwargs:
+                return args[0] if len(args) == 1 and type(args[0]) in (int, str) else args
+            return args + (_KWD_MARK,) + tuple(kwargs.items())
+
+        def discard(key):
+            entry = entries.pop(key)
+            stats["weight"] -= entry[2]
+
+        def drain_expired(now):
+            while deadlines and deadlines[0][0] <= now:
+                deadline, _, key = heapq.heappop(deadlines)
+                entry = entries.get(key)
+                # The entry may have been evicted or refreshed since
+                if entry is not None and entry[1] == deadline:
+                    discard(key)
+                    stats["expired"] += 1
+            # Evictions by size leave stale heap items behind; rebuild occasionally
+            if len(deadlines) > 2 * len(entries) + 64:
+                deadlines[:] = [(entry[1], next(sequence), key) for key, entry in entries.items()]
+                heapq.heapify(deadlines)
+
+        # Bound once: the hit path is a handful of local lookups
+        get_entry = entries.get
+        move_to_end = entries.move_to_end
+
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            with lock:
+                entry = get_entry(key)
+                if entry is not None and entry[1] > timer():
+                    move_to_end(key)
+                    stats["hits"] += 1
+                    return entry[0]
+                stats["misses"] += 1
+
+            result = func(*args, **kwargs)
+            lifetime = ttl(result) if callable(ttl) else ttl
+            weight = weigh(result) if maxweight is not None else 0
+            if lifetime <= 0 or (maxweight is not None and weight > maxweight):
+                return result  # Never cached
+
+            with lock:
+                now = timer()
+                if key in entries:
+                    discard(key)
+                deadline = now + lifetime
+                entries[key] = [result, deadline, weight]
+                heapq.heappush(deadlines, (deadline, next(sequence), key))
+                stats["weight"] += weight
+                drain_expired(now)
+                while (maxsize is not None and len(entries) > maxsize) or (
+                    maxweight is not None and stats["weight"] > maxweight
+                ):
+                    discard(next(iter(entries)))
+            return result
+
+        def cache_info():
+            with lock:
+                return CacheInfo(
+                    stats["hits"], stats["misses"], maxsize, len(entries),
+                    maxweight, stats["weight"], stats["expired"],
+                )
+
+        def cache_clear():
+            with lock:
+                entries.clear()
+                deadlines.clear()
+                stats.update(hits=0, misses=0, expired=0, weight=0)
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return update_wrapper(wrapper, func)
+
+    return decorator
+
+
+# Prices go stale after 30 seconds; at most ~64 KB of them are kept
+@ttl_cache(ttl=30.0, maxweight=64 * 1024)
+def product_price(sku: str) -> float:
+    print(f"Fetching price for {sku}...")
+    time.sleep(0.1)  # Simulate a slow pricing service
+    return 19.99
+
+
+# Low stock changes fast, so it gets a shorter lifetime
+@ttl_cache(ttl=lambda level: 5.0 if level < 10 else 60.0, maxsize=1024)
+def stock_level(sku: str) -> int:
+    print(f"Fetching stock for {sku}...")
+    return 3
+
+
+if __name__ == "__main__":
+    product_price("SKU-1")  # Prints: "Fetching price for SKU-1..."
+    product_price("SKU-1")  # No print - cached until 30 seconds have passed
+    stock_level("SKU-1")    # Cached for 5 seconds: only 3 left
+
+    print(product_price.cache_info())
+    # CacheInfo(hits=1, misses=1, maxsize=128, currsize=1, maxweight=65536, currweight=24, expired=0)
+
+    product_price.cache_clear()
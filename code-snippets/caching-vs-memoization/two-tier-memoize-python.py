@@ -0,0 +1,284 @@
+import hashlib
+import importlib.util
+import inspect
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, wraps
+
+# Values are unpickled on read, so the store must be writable only by us:
+# never a shared directory such as /tmp
+CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "memoize-shared.sqlite"
+)
+
+
+def _load_ttl_cache():
+    # ttl-cache-python.py is a sibling script, not a package module
+    spec = importlib.util.spec_from_file_location(
+        "ttl_cache_python", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ttl-cache-python.py")
+    )
+    module = sys.modules.get(spec.name)
+    if module is None:
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules[spec.name] = module
+    return module.ttl_cache
+
+
+ttl_cache = _load_ttl_cache()
+
+_MISSING = object()
+
+
+class DiskTier:
+    """
+    Host-wide memo store: one sqlite file in WAL mode, shared by every process.
+
+    WAL lets readers in all processes run while one writes; each write is a
+    single INSERT OR REPLACE in its own transaction, so readers see the old
+    value or the new one, never half of a row. Connections are opened per
+    process and thread, so the store survives fork().
+
+    A lease row per key being computed stops a cold host from computing the
+    same key in every process at once: the other processes wait for the
+    leaseholder's value, and take over if the lease expires.
+
+    Every read unpickles, so whoever can write the file can run code in every
+    process using it. The file is created 0600 in a 0700 directory, and a
+    file owned by another user, or writable by group or others, is refused.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            self._check_owner()
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # A lost write is just a future miss
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS memo ("
+                " func TEXT, version TEXT, key BLOB, value BLOB, expires REAL,"
+                " PRIMARY KEY (func, version, key))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS lease ("
+                " func TEXT, version TEXT, key BLOB, expires REAL,"
+                " PRIMARY KEY (func, version, key))"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _check_owner(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # O_NOFOLLOW: a planted symlink cannot point us at someone else's file
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        try:
+            info = os.fstat(fd)
+        finally:
+            os.close(fd)
+        if info.st_uid != os.getuid() or info.st_mode & 0o022:
+            raise PermissionError(f"{self.path} is not private to this user; refusing to unpickle from it")
+
+    def get(self, func, version, key):
+        """(value, expires): _MISSING if absent or expired; expires is None for no TTL."""
+        row = self._connection().execute(
+            "SELECT value, expires FROM memo WHERE func = ? AND version = ? AND key = ?",
+            (func, version, key),
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return _MISSING, None
+        try:
+            return pickle.loads(row[0]), row[1]
+        except Exception:
+            return _MISSING, None  # Unreadable value: recompute and overwrite it
+
+    def put(self, func, version, key, value, ttl=None):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO memo VALUES (?, ?, ?, ?, ?)",
+            (func, version, key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+             None if ttl is None else time.time() + ttl),
+        )
+
+    def claim(self, func, version, key, lease):
+        """True if this process should compute the key."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "DELETE FROM lease WHERE func = ? AND version = ? AND key = ? AND expires <= ?",
+            (func, version, key, now),
+        )
+        return conn.execute(
+            "INSERT OR IGNORE INTO lease VALUES (?, ?, ?, ?)", (func, version, key, now + lease)
+        ).rowcount == 1
+
+    def release(self, func, version, key):
+        self._connection().execute(
+            "DELETE FROM lease WHERE func = ? AND version = ? AND key = ?", (func, version, key)
+        )
+
+    def wait(self, func, version, key, poll=0.01):
+        """Wait for another process's (value, expires); _MISSING if its lease ends without one."""
+        while True:
+            value, expires = self.get(func, version, key)
+            if value is not _MISSING:
+                return value, expires
+            leased = self._connection().execute(
+                "SELECT 1 FROM lease WHERE func = ? AND version = ? AND key = ? AND expires > ?",
+                (func, version, key, time.time()),
+            ).fetchone()
+            if leased is None:
+                return _MISSING, None
+            time.sleep(poll)
+
+    def purge_other_versions(self, func, version):
+        """Drop a function's entries from earlier deploys."""
+        return self._connection().execute(
+            "DELETE FROM memo WHERE func = ? AND version != ?", (func, version)
+        ).rowcount
+
+
+def _canonical(value):
+    """
+    Rebuild an argument so equal values pickle to equal bytes in every
+    process: set and frozenset order follows the per-process hash seed, and
+    dict order follows insertion. Other objects are pickled as they are.
+    """
+    if isinstance(value, (set, frozenset)):
+        return (type(value).__name__, tuple(sorted(map(_canonical, value), key=repr)))
+    if isinstance(value, dict):
+        items = ((_canonical(k), _canonical(v)) for k, v in value.items())
+        return ("dict", tuple(sorted(items, key=repr)))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(map(_canonical, value)))
+    return value
+
+
+def shared_memoize(maxsize=128, version="1", ttl=None, lease=30.0, store=None):
+    """
+    Two-tier memoization: an in-process lru_cache in front of a DiskTier
+    shared by every process on the host, so a restarted or new worker starts
+    warm from what the others already computed.
+
+    With `ttl`, tier one is a ttl_cache (ttl-cache-python.py) instead, and an
+    entry read from disk only lives there for what is left of its disk TTL,
+    so neither tier serves a value older than `ttl` seconds.
+
+    Keys are versioned by `version` and a hash of the function's source, so a
+    deploy that changes the function never reads results of the old code.
+    Arguments must be picklable; they are hashed into the disk key, with sets
+    and dicts put in a canonical order first (see _canonical). `lease`
+    bounds how long other processes wait on one that is computing a key.
+    """
+    disk = store or DiskTier()
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        try:
+            source = inspect.getsource(func)
+        except (OSError, TypeError):
+            source = func.__code__.co_code.hex()
+        full_version = f"{version}:{hashlib.sha256(source.encode()).hexdigest()[:16]}"
+        stats = {"disk_hits": 0, "disk_waits": 0, "disk_misses": 0}
+        # Seconds left on the disk entry from_disk just returned, per thread;
+        # ttl_cache asks for the lifetime right after the call, on the same thread
+        remaining = threading.local()
+
+        def found(result, expires, counter):
+            stats[counter] += 1
+            remaining.seconds = ttl if expires is None else expires - time.time()
+            return result
+
+        @wraps(func)
+        def from_disk(*args, **kwargs):
+            key = hashlib.sha256(pickle.dumps(_canonical((args, sorted(kwargs.items()))), 4)).digest()
+            result, expires = disk.get(name, full_version, key)
+            if result is not _MISSING:
+                return found(result, expires, "disk_hits")
+            while not disk.claim(name, full_version, key, lease):
+                result, expires = disk.wait(name, full_version, key)
+                if result is not _MISSING:
+                    return found(result, expires, "disk_waits")
+            try:
+                # The previous leaseholder may have finished since our get()
+                result, expires = disk.get(name, full_version, key)
+                if result is not _MISSING:
+                    return found(result, expires, "disk_waits")
+                stats["disk_misses"] += 1
+                result = func(*args, **kwargs)
+                disk.put(name, full_version, key, result, ttl)
+                remaining.seconds = ttl
+            finally:
+                disk.release(name, full_version, key)
+            return result
+
+        if ttl is None:
+            wrapper = lru_cache(maxsize=maxsize)(from_disk)
+        else:
+            wrapper = ttl_cache(ttl=lambda _: remaining.seconds, maxsize=maxsize)(from_disk)
+        wrapper.disk_info = lambda: dict(stats)
+        wrapper.purge_other_versions = lambda: disk.purge_other_versions(name, full_version)
+        return wrapper
+
+    return decorator
+
+
+STORE = DiskTier()
+
+
+@shared_memoize(maxsize=128, version="1", store=STORE)
+def expensive_computation(n: int) -> int:
+    """Pure function - result depends only on input."""
+    time.sleep(0.1)  # Simulate expensive operation
+    return n * n
+
+
+def use_store(path):
+    STORE.path = path  # Before this process opens a connection
+
+
+def worker(numbers):
+    results = [expensive_computation(n) for n in numbers]
+    return results, expensive_computation.disk_info()["disk_misses"]
+
+
+if __name__ == "__main__":
+    # A throwaway store, so the demo starts cold without touching CACHE_PATH
+    with tempfile.TemporaryDirectory() as demo:
+        demo_path = os.path.join(demo, "memoize-shared.sqlite")
+        use_store(demo_path)
+
+        # Four workers after a deploy, each needing the same 20 results
+        with ProcessPoolExecutor(4, initializer=use_store, initargs=(demo_path,)) as pool:
+            start = time.perf_counter()
+            runs = list(pool.map(worker, [range(20)] * 4))
+            computed = sum(misses for _, misses in runs)
+            print(f"cold host: {computed} computations in {time.perf_counter() - start:.1f}s (80 without the shared tier)")
+
+        # A restarted worker starts warm
+        with ProcessPoolExecutor(1, initializer=use_store, initargs=(demo_path,)) as pool:
+            start = time.perf_counter()
+            _, computed = pool.submit(worker, range(20)).result()
+            print(f"new worker: {computed} computations in {time.perf_counter() - start:.2f}s")
+
+        print(expensive_computation.cache_info())  # Tier one, as with plain lru_cache
+        print(f"entries from earlier versions purged: {expensive_computation.purge_other_versions()}")
+
+        # With a TTL, tier one expires with the disk entry
+        @shared_memoize(ttl=0.2, store=STORE)
+        def quote(sku):
+            return time.time()
+
+        first = quote("SKU-1")
+        time.sleep(0.3)
+        print(f"after the TTL: {'recomputed' if quote('SKU-1') != first else 'stale'}")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Verdict checks and benchmark for the combined command matcher in
+prevent-subagent-tests.py.
+
+Checks the verdict for long piped and chained commands, then times a
+classification against the shipped rules and against a rule set padded
+with hundreds of extra tool patterns.
+"""
+
+import importlib.util
+import json
+import os
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RUNS = 200
+
+spec = importlib.util.spec_from_file_location(
+    'prevent_subagent_tests', os.path.join(HERE, 'prevent-subagent-tests.py')
+)
+hook = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(hook)
+
+NOISE = ' | '.join(f'grep -v pattern{i}' for i in range(500))
+CHAIN = ' && '.join(f'echo step{i}' for i in range(1000))
+
+CASES = [
+    ('ls -la', (None, None)),
+    ('vendor/bin/phpunit --filter OrderTest', ('block', 'phpunit')),
+    ('./bin/qa -t allCs', ('allow', 'qa-all-cs')),
+    ('bin/qa --type allStatic', ('allow', 'qa-all-static')),
+    ('bin/qa -t unit', ('block', 'qa-unit')),
+    (f'cat log | {NOISE} | wc -l', (None, None)),
+    (f'cat log | {NOISE} | infection --threads=4', ('block', 'infection')),
+    (f'{CHAIN} && php vendor/bin/phpunit', ('block', 'phpunit')),
+    (f'{CHAIN}; ./bin/qa -t allCs', ('allow', 'qa-all-cs')),
+    # Chaining a test run behind an allowed command no longer slips through
+    ('bin/qa -t allCs && phpunit', ('block', 'phpunit')),
+    ('bin/qa -t allCs\nbin/qa -t unit', ('block', 'qa-unit')),
+    (f'{CHAIN} || ' * 3 + 'true', (None, None)),
+    # Wrapped, quoted, substituted and redirected test runs are still seen
+    ("bash -c 'vendor/bin/phpunit'", ('block', 'phpunit')),
+    ('sh -c "cd app && phpunit"', ('block', 'phpunit')),
+    ("bash -c 'bin/qa -t unit'", ('block', 'qa-unit')),
+    ('(phpunit)', ('block', 'phpunit')),
+    ('echo $(phpunit)', ('block', 'phpunit')),
+    ('`phpunit`', ('block', 'phpunit')),
+    ('vendor/bin/phpunit>out.txt', ('block', 'phpunit')),
+    ('infection<input.txt', ('block', 'infection')),
+    ('"vendor/bin/phpunit" --filter OrderTest', ('block', 'phpunit')),
+    ('bin/qa -t allCs $(vendor/bin/phpunit)', ('block', 'phpunit')),
+    ("bash -c 'bin/qa -t allCs'", ('allow', 'qa-all-cs')),
+    # A test run backgrounded next to an allowed command is its own segment
+    ('phpunit & bin/qa -t allCs', ('block', 'phpunit')),
+    ('bin/qa -t allCs & phpunit', ('block', 'phpunit')),
+    ('bin/qa -t allCs 2>&1 | tee cs.log', ('allow', 'qa-all-cs')),
+    ('bin/qa -t allCs >&2', ('allow', 'qa-all-cs')),
+    ('bin/qa -t allCs &> cs.log', ('allow', 'qa-all-cs')),
+    ('vendor/bin/phpunit 2>&1 | tee test.log', ('block', 'phpunit')),
+    # Phar builds are the same tools
+    ('php phpunit.phar --filter OrderTest', ('block', 'phpunit-phar')),
+    ('./tools/infection.phar --threads=4', ('block', 'infection-phar')),
+]
+
+
+def check(rules) -> None:
+    for command, expected in CASES:
+        verdict = rules.classify(command)
+        assert verdict == expected, f'{command[:60]!r}: {verdict} != {expected}'
+
+
+def time_classify(rules, command: str) -> float:
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        rules.classify(command)
+    return (time.perf_counter() - start) / RUNS * 1_000_000
+
+
+def main() -> None:
+    shipped = hook.get_rules()
+    check(shipped)
+    print(f'{len(CASES)} verdict checks passed')
+
+    with open(hook.RULES_PATH) as rules_file:
+        rules = json.load(rules_file)
+    extra_tools = {f'tool-{i}': {'tool': f'sometool{i}', 'args': r'--run\b'} for i in range(300)}
+    padded = hook.RuleSet(rules['allow'], {**extra_tools, **rules['block']})
+    check(padded)
+
+    command = f'{CHAIN} && {NOISE}'
+    print(f'{len(command):,} char command')
+    for name, rules_set in (('shipped', shipped), ('padded', padded)):
+        count = sum(len(entries) for entries in rules_set.by_name.values())
+        print(f'  {name:<8} {count:>4} rules {time_classify(rules_set, command):>8.0f} µs/classify')
+
+
+if __name__ == '__main__':
+    main()
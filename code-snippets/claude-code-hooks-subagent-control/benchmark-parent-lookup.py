@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parent process lookup in prevent-subagent-tests.py
+
+Compares the original `ps -o comm= -p <ppid>` subprocess with reading
+/proc/<ppid>/comm, the lookup the hook runs on every Bash tool call.
+"""
+
+import os
+import statistics
+import subprocess
+import time
+
+RUNS = 200
+
+
+def lookup_with_ps(pid: int) -> str:
+    """Before: fork + exec ps."""
+    result = subprocess.run(
+        ['ps', '-o', 'comm=', '-p', str(pid)],
+        capture_output=True,
+        text=True,
+        timeout=2
+    )
+    return result.stdout.strip()
+
+
+def lookup_with_proc(pid: int) -> str:
+    """After: one read from procfs."""
+    with open(f'/proc/{pid}/comm') as comm:
+        return comm.read().strip()
+
+
+def measure(lookup, pid: int) -> list[float]:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        lookup(pid)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return sorted(timings)
+
+
+def main() -> None:
+    pid = os.getppid()
+    assert lookup_with_ps(pid) == lookup_with_proc(pid)
+
+    print(f'{"lookup":<8} {"mean µs":>10} {"p50 µs":>10} {"p99 µs":>10}')
+    for name, lookup in (('ps', lookup_with_ps), ('/proc', lookup_with_proc)):
+        timings = measure(lookup, pid)
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f'{name:<8} {statistics.mean(timings):>10.1f} '
+              f'{statistics.median(timings):>10.1f} {p99:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
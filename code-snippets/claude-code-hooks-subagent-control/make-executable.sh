@@ -1 +1,3 @@
 chmod +x prevent-subagent-tests.py
+chmod +x prevent-subagent-tests-client.py
+chmod +x test-slot.py
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+PreToolUse hook client for the prevent-subagent-tests daemon.
+
+Point settings.json at this file instead of prevent-subagent-tests.py and
+start the daemon once per session:
+
+    prevent-subagent-tests.py --daemon &
+
+The client forwards the payload and its own PPID over a Unix socket and
+exits with the daemon's verdict. If the daemon is not running, it loads
+prevent-subagent-tests.py and decides in-process, so the hook never
+depends on the daemon being up.
+"""
+
+import json
+import os
+import socket
+import sys
+
+SOCKET_PATH = os.environ.get(
+    'PREVENT_SUBAGENT_TESTS_SOCKET',
+    os.path.join(os.environ.get('XDG_RUNTIME_DIR', '/tmp'), f'prevent-subagent-tests-{os.getuid()}.sock')
+)
+CONNECT_TIMEOUT = 0.5
+
+
+def ask_daemon(raw_payload: str) -> tuple[int, str | None]:
+    """Send one request and read one JSON line back."""
+    # Re-encoded onto one line: a pretty-printed payload would split the request
+    request = json.dumps({'payload': json.loads(raw_payload), 'ppid': os.getppid()}) + '\n'
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(CONNECT_TIMEOUT)
+        client.connect(SOCKET_PATH)
+        client.sendall(request.encode())
+        response = json.loads(client.makefile('rb').readline())
+    return response['exit'], response['message']
+
+
+def decide_in_process(raw_payload: str) -> tuple[int, str | None]:
+    """Fallback: the full hook, loaded only when the daemon is down."""
+    import importlib.util
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prevent-subagent-tests.py')
+    spec = importlib.util.spec_from_file_location('prevent_subagent_tests', path)
+    hook = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(hook)
+    try:
+        return hook.decide(json.loads(raw_payload), os.getppid())
+    finally:
+        # One entry never fills a batch; write it before this process exits
+        hook.audit_log.flush()
+
+
+def main() -> int:
+    try:
+        raw_payload = sys.stdin.read().strip()
+        try:
+            code, message = ask_daemon(raw_payload)
+        except OSError:
+            code, message = decide_in_process(raw_payload)
+        if message:
+            print(message, file=sys.stderr)
+        return code
+    except Exception as e:
+        # Fail open, like the hook itself
+        print(f"Hook error: {e}", file=sys.stderr)
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
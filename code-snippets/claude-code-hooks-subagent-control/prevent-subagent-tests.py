@@ -1,101 +1,521 @@
 #!/usr/bin/env python3
 """
-PreToolUse hook to prevent subagents from running tests.
+PreToolUse hook to schedule test runs from subagents.
 
-Subagents can run allCS and allStatic, but NOT unit tests, PHPUnit, or Infection.
-Tests cannot run in parallel due to database lock conflicts.
+Subagents can run allCS and allStatic freely. Unit tests, PHPUnit and
+Infection cannot run in parallel against one database, so a subagent may
+only run them through the test-slot.py scheduler, which admits runs one at a
+time (or N at a time, each with its own database slot) and queues the rest
+with a timeout. An unscheduled test command is blocked with the scheduled
+form in the `retry` field, so the subagent can rerun it as-is. Without
+test-slot.py next to this file, test commands are simply blocked.
 
 Detection: Subagents have the main 'claude' process as their parent (PPID).
+The parent's name is read from /proc, so no subprocess is forked per call;
+`ps` is only used on systems without /proc (macOS).
+
+Rules: allow and block rules live in subagent-test-rules.json. Each names a
+tool and an optional regex over the tool's arguments. The command is
+tokenised in one pass (a single regex of words and separators) and every
+word is looked up by tool name in a dict, so the cost does not grow with the
+number of rules. Rules apply per command segment (split on `;`, `&`, `&&`,
+`||`, `|`, newlines, parentheses and backticks). Quoting is not interpreted:
+quotes, `$` and redirections only end a word, so commands passed to
+`bash -c` or written as `$(...)` are still matched. A segment matching an
+allow rule is allowed, and a segment matching only block rules blocks the
+whole command.
+
+Daemon mode: `prevent-subagent-tests.py --daemon` keeps the compiled rules
+and recent parent lookups warm and serves decisions over a Unix socket to
+prevent-subagent-tests-client.py, which falls back to this file in-process
+when the daemon is not running.
+
+Decisions are cached (LRU keyed by parent identity and command; useful in the
+daemon, where the same commands repeat) and every decision is appended to a
+JSONL audit log with the time spent in decide(), written in batches off the
+hot path. `prevent-subagent-tests.py --summary [log]` reports block rates and
+p50/p99 decide() latency from that log. That figure leaves out interpreter
+startup and imports, which dominate a single-shot hook call; the daemon
+client is what removes them.
 """
 
 import json
 import os
 import re
+import shlex
+import socket
+import socketserver
+import statistics
 import subprocess
 import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from itertools import chain
+
+SOCKET_PATH = os.environ.get(
+    'PREVENT_SUBAGENT_TESTS_SOCKET',
+    os.path.join(os.environ.get('XDG_RUNTIME_DIR', '/tmp'), f'prevent-subagent-tests-{os.getuid()}.sock')
+)
+
+RULES_PATH = os.environ.get(
+    'PREVENT_SUBAGENT_TESTS_RULES',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'subagent-test-rules.json')
+)
+
+AUDIT_LOG_PATH = os.environ.get(
+    'PREVENT_SUBAGENT_TESTS_AUDIT_LOG',
+    os.path.join(
+        os.environ.get('XDG_STATE_HOME', os.path.expanduser('~/.local/state')),
+        'prevent-subagent-tests.jsonl'
+    )
+)
+SCHEDULER_PATH = os.environ.get(
+    'PREVENT_SUBAGENT_TESTS_SCHEDULER',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test-slot.py')
+)
+
+AUDIT_BATCH_SIZE = 100
+AUDIT_FLUSH_INTERVAL = 1.0
+DECISION_CACHE_SIZE = 1024
+
+# One scan splits a command into words and segment separators. Quotes,
+# redirections and `$` end a word rather than joining it, and subshells and
+# command substitution are segments of their own, so a tool inside
+# `bash -c '...'`, `(...)`, `$(...)` or backticks is seen like any other.
+# A lone `&` (background) is a separator; the `&` in a redirection such as
+# `2>&1`, `>&2` or `&>` is consumed with it and ends nothing.
+TOKENS = re.compile(
+    r'(?P<redir>\d*[<>]&\d*-?|&>>?)|(?P<sep>&&|\|\||[;&|\n()`])|(?P<word>[^\s;&|()`\'"<>$]+)'
+)
+
+
+class RuleSet:
+    """Rules indexed by tool name: one tokenising pass per command."""
+
+    def __init__(self, allow: dict[str, dict], block: dict[str, dict]) -> None:
+        # Last path component -> [(action, rule, tool, compiled args or None)]
+        self.by_name: dict[str, list[tuple[str, str, str, re.Pattern | None]]] = {}
+        # Allow rules are indexed first; order does not change the verdict
+        for action, rules in (('allow', allow), ('block', block)):
+            for rule, spec in rules.items():
+                tool = spec['tool'].lower()
+                args = re.compile(spec['args'], re.IGNORECASE) if spec.get('args') else None
+                self.by_name.setdefault(tool.rsplit('/', 1)[-1], []).append((action, rule, tool, args))
 
+    @classmethod
+    def load(cls, path: str) -> 'RuleSet':
+        with open(path) as rules_file:
+            rules = json.load(rules_file)
+        return cls(rules.get('allow', {}), rules.get('block', {}))
 
-def is_subagent() -> bool:
-    """Check if running in subagent context by examining PPID."""
+    def classify(self, command: str) -> tuple[str | None, str | None]:
+        """
+        Return ('block', rule) for the first segment that matches only block
+        rules, ('allow', rule) if an allow rule matched and nothing blocked,
+        or (None, None) when no rule matched.
+        """
+        allowed_by = None
+        # Tool words seen in the current segment, with where their args start
+        hits: list[tuple[str, str, re.Pattern | None, int]] = []
+
+        for match in chain(TOKENS.finditer(command), [None]):
+            if match is not None and match.lastgroup == 'redir':
+                continue
+            if match is not None and match.lastgroup == 'word':
+                word = match.group().lower()
+                for action, rule, tool, args in self.by_name.get(word.rsplit('/', 1)[-1], ()):
+                    if word == tool or word.endswith('/' + tool):
+                        hits.append((action, rule, args, match.end()))
+                continue
+
+            # Separator or end of command: settle the segment
+            end = len(command) if match is None else match.start()
+            segment_allowed = False
+            blocked_by = None
+            for action, rule, args, args_start in hits:
+                if args is not None and not args.search(command, args_start, end):
+                    continue
+                if action == 'allow':
+                    segment_allowed = True
+                    allowed_by = allowed_by or rule
+                elif blocked_by is None:
+                    blocked_by = rule
+            if blocked_by and not segment_allowed:
+                return 'block', blocked_by
+            hits = []
+
+        return ('allow', allowed_by) if allowed_by else (None, None)
+
+
+# Unquoted shell syntax that could run something outside the test slot
+SHELL_SYNTAX = ';&|\n()`'
+
+
+def is_scheduled(command: str) -> bool:
+    """
+    True if the whole command runs under the scheduler: it starts with
+    `SCHEDULER_PATH run` and has no unquoted separators, subshells or command
+    substitution that would run part of it outside the slot.
+    """
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=SHELL_SYNTAX)
+    # Double quotes still expand $(...), so only single quotes protect
+    lexer.quotes = "'"
+    lexer.whitespace = ' \t\r'
+    lexer.whitespace_split = True
     try:
-        ppid = os.getppid()
-        # Get parent process command name
-        result = subprocess.run(
-            ['ps', '-o', 'comm=', '-p', str(ppid)],
-            capture_output=True,
-            text=True,
-            timeout=2
-        )
-        parent_cmd = result.stdout.strip()
-        return parent_cmd == 'claude'
+        words = list(lexer)
+    except ValueError:
+        return False
+    if any(set(word) <= set(SHELL_SYNTAX) for word in words):
+        return False
+    if words[:1] and os.path.basename(words[0]).startswith('python'):
+        words = words[1:]
+    return words[:2] == [SCHEDULER_PATH, 'run']
+
+
+def scheduled_command(command: str) -> str:
+    """The command rewritten to run under the scheduler."""
+    prefix = f'{shlex.quote(SCHEDULER_PATH)} run --'
+    if is_scheduled(f'{prefix} {command}'):
+        return f'{prefix} {command}'
+    # '\'' rather than shlex.quote's "'" form, which is_scheduled reads as unquoted
+    quoted = "'" + command.replace("'", "'\\''") + "'"
+    return f'{prefix} bash -c {quoted}'
+
+
+# Loaded on first use (once per daemon, in daemon mode)
+_rules: RuleSet | None = None
+
+
+def get_rules() -> RuleSet:
+    global _rules
+    if _rules is None:
+        _rules = RuleSet.load(RULES_PATH)
+    return _rules
+
+
+PROC_ROOT = '/proc'
+
+# pid -> (command name, expiry); short-lived so a reused PID is not misread
+NAME_CACHE_TTL = 5.0
+_name_cache: dict[int, tuple[str, float]] = {}
+
+
+def process_name(pid: int) -> str:
+    """Get a process's command name, from /proc if available."""
+    if os.path.isdir(PROC_ROOT):
+        with open(f'{PROC_ROOT}/{pid}/comm') as comm:
+            return comm.read().strip()
+
+    # No /proc: fall back to forking ps
+    result = subprocess.run(
+        ['ps', '-o', 'comm=', '-p', str(pid)],
+        capture_output=True,
+        text=True,
+        timeout=2
+    )
+    return result.stdout.strip()
+
+
+def parent_pid(pid: int) -> int:
+    """Get a process's parent PID from /proc/<pid>/stat."""
+    with open(f'{PROC_ROOT}/{pid}/stat') as stat:
+        # The command name in field 2 can contain spaces and parentheses,
+        # so split after its closing parenthesis: "pid (comm) state ppid ..."
+        fields = stat.read().rsplit(')', 1)[1].split()
+    return int(fields[1])
+
+
+def cached_process_name(pid: int) -> str:
+    """process_name() with a short TTL, for the long-lived daemon."""
+    now = time.monotonic()
+    cached = _name_cache.get(pid)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    name = process_name(pid)
+    _name_cache[pid] = (name, now + NAME_CACHE_TTL)
+    return name
+
+
+def is_subagent(ppid: int | None = None, max_depth: int = 1) -> bool:
+    """
+    Check if running in subagent context by examining PPID.
+
+    `ppid` defaults to this process's parent; the daemon passes the client's.
+    With max_depth > 1, also check ancestors (e.g. when the hook runs under
+    a wrapper shell), walking /proc/<pid>/stat.
+    """
+    try:
+        pid = os.getppid() if ppid is None else ppid
+        for depth in range(max_depth):
+            if cached_process_name(pid) == 'claude':
+                return True
+            if depth + 1 < max_depth:
+                pid = parent_pid(pid)
+                if pid <= 1:
+                    break
+        return False
     except Exception:
         # If we can't determine, assume not subagent (fail open)
         return False
 
 
-def is_test_command(command: str) -> bool:
-    """Check if command is a test execution (not allowed in subagents)."""
-    test_patterns = [
-        r'\bphpunit\b',
-        r'\bbin/qa\s+.*-t\s+unit\b',
-        r'\bbin/qa\s+.*--type\s+unit\b',
-        r'\binfection\b',
-        r'\bvendor/bin/phpunit\b',
-        r'\bphp\s+vendor/bin/phpunit\b',
-        r'\.\/bin\/qa\s+.*-t\s+unit\b',
-    ]
+# (exit code, stderr message or None, matched rule or None)
+Verdict = tuple[int, str | None, str | None]
 
-    return any(re.search(pattern, command, re.IGNORECASE) for pattern in test_patterns)
 
+class DecisionCache:
+    """Thread-safe LRU of verdicts keyed by (parent identity, command)."""
 
-def is_allowed_qa_command(command: str) -> bool:
-    """Check if command is an allowed QA command (allCS or allStatic)."""
-    allowed_patterns = [
-        r'\bbin/qa\s+.*-t\s+allCs\b',
-        r'\bbin/qa\s+.*--type\s+allCs\b',
-        r'\bbin/qa\s+.*-t\s+allStatic\b',
-        r'\bbin/qa\s+.*--type\s+allStatic\b',
-        r'\.\/bin\/qa\s+.*-t\s+allCs\b',
-        r'\.\/bin\/qa\s+.*-t\s+allStatic\b',
-    ]
+    def __init__(self, maxsize: int = DECISION_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple, Verdict] = OrderedDict()
+        self._lock = threading.Lock()
 
-    return any(re.search(pattern, command, re.IGNORECASE) for pattern in allowed_patterns)
+    def get(self, key: tuple) -> Verdict | None:
+        with self._lock:
+            verdict = self._entries.get(key)
+            if verdict is not None:
+                self._entries.move_to_end(key)
+            return verdict
+
+    def put(self, key: tuple, verdict: Verdict) -> None:
+        with self._lock:
+            self._entries[key] = verdict
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class AuditLog:
+    """
+    Append-only JSONL log. record() only appends to an in-memory batch; the
+    batch is written in one call when it fills, on a timer (daemon), or at
+    exit (single-shot hook).
+    """
+
+    def __init__(self, path: str = AUDIT_LOG_PATH, batch_size: int = AUDIT_BATCH_SIZE) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self._batch: list[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, entry: dict) -> None:
+        with self._lock:
+            self._batch.append(entry)
+            full = len(self._batch) >= self.batch_size
+        if full:
+            threading.Thread(target=self.flush, daemon=True).start()
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._batch = self._batch, []
+        if not batch:
+            return
+        data = ''.join(json.dumps(entry) + '\n' for entry in batch).encode()
+        try:
+            try:
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            except FileNotFoundError:
+                # Only the first write ever creates the directory
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            # Auditing must never change a verdict
+            print(f"Hook audit log error: {e}", file=sys.stderr)
+
+    def flush_periodically(self, interval: float = AUDIT_FLUSH_INTERVAL) -> None:
+        """Start a background flusher (daemon mode)."""
+        def loop() -> None:
+            while True:
+                time.sleep(interval)
+                self.flush()
+        threading.Thread(target=loop, daemon=True).start()
+
+
+decision_cache = DecisionCache()
+audit_log = AuditLog()
+
+
+def parent_identity(ppid: int) -> tuple[int, str]:
+    """PID plus command name, so a reused PID does not hit a stale verdict."""
+    try:
+        return ppid, cached_process_name(ppid)
+    except Exception:
+        return ppid, ''
+
+
+def decide(payload: dict, ppid: int) -> tuple[int, str | None]:
+    """Decide on one hook payload: (exit code, stderr message or None)."""
+    start = time.perf_counter()
+    tool = payload.get('tool')
+    command = payload.get('parameters', {}).get('command', '')
+    parent = parent_identity(ppid)
+
+    # Only check Bash tool invocations
+    if tool != 'Bash':
+        verdict, cached = (0, None, None), False
+    else:
+        verdict = decision_cache.get((parent, command))
+        cached = verdict is not None
+        if not cached:
+            verdict = decide_command(ppid, command)
+            decision_cache.put((parent, command), verdict)
+
+    audit_log.record({
+        'ts': time.time(),
+        'ppid': ppid,
+        'parent': parent[1],
+        'tool': tool,
+        'command': command[:500],
+        'verdict': 'block' if verdict[0] else 'allow',
+        'rule': verdict[2],
+        'cached': cached,
+        # decide() only: excludes interpreter startup, imports and the client
+        'decide_us': round((time.perf_counter() - start) * 1_000_000, 1),
+    })
+    return verdict[0], verdict[1]
+
+
+def decide_command(ppid: int, command: str) -> Verdict:
+    """Decide on one Bash command from the given parent process."""
+    # Check if we're in a subagent
+    if not is_subagent(ppid):
+        return 0, None, None  # Not a subagent, allow all commands
+
+    # Scheduled test runs wait for a slot instead of being blocked
+    if is_scheduled(command):
+        return 0, None, 'test-slot'
+
+    # One scan gives the verdict: allowed QA commands pass, test commands block
+    action, rule = get_rules().classify(command)
+
+    # Redirect test commands to the scheduler, or block them without one
+    if action == 'block' and os.path.exists(SCHEDULER_PATH):
+        error_msg = {
+            'error': 'Unscheduled test run in subagent context',
+            'reason': 'Test runs share the database, so they must hold a test slot',
+            'command': command,
+            'rule': rule,
+            'retry': scheduled_command(command),
+            'note': 'The retry waits for a free slot (test-slot.py status shows who holds them)'
+        }
+        return 1, json.dumps(error_msg), rule
+    if action == 'block':
+        error_msg = {
+            'error': 'Test execution blocked in subagent context',
+            'reason': 'Tests cannot run in parallel due to database lock conflicts',
+            'command': command,
+            'rule': rule,
+            'allowed': 'Subagents can run: bin/qa -t allCs, bin/qa -t allStatic',
+            'blocked': 'Blocked commands: phpunit, bin/qa -t unit, infection'
+        }
+        return 1, json.dumps(error_msg), rule  # Block the command
+
+    return 0, None, rule  # Allow all other commands
+
+
+class DecisionHandler(socketserver.StreamRequestHandler):
+    """One request per connection: {"payload": ..., "ppid": ...} as a JSON line."""
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return  # A liveness probe from daemon_running()
+        try:
+            request = json.loads(line)
+            code, message = decide(request['payload'], request['ppid'])
+        except Exception as e:
+            # Same fail-open rule as the in-process path
+            code, message = 0, f"Hook error: {e}"
+        self.wfile.write(json.dumps({'exit': code, 'message': message}).encode() + b'\n')
+
+
+def daemon_running(socket_path: str) -> bool:
+    """True if something is accepting connections on the socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        probe.settimeout(0.5)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def serve(socket_path: str = SOCKET_PATH) -> int:
+    """Run the decision daemon until interrupted."""
+    if daemon_running(socket_path):
+        print(f"prevent-subagent-tests daemon already listening on {socket_path}", file=sys.stderr)
+        return 1
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)  # Left behind by a daemon that died
+    get_rules()  # Compile before the first request, not during it
+    audit_log.flush_periodically()
+    with socketserver.ThreadingUnixStreamServer(socket_path, DecisionHandler) as server:
+        os.chmod(socket_path, 0o600)
+        print(f"prevent-subagent-tests daemon listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+            audit_log.flush()
+    return 0
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarise(log_path: str = AUDIT_LOG_PATH) -> None:
+    """Print block rates and decide() latency from the audit log."""
+    try:
+        with open(log_path) as log:
+            entries = [json.loads(line) for line in log if line.strip()]
+    except FileNotFoundError:
+        entries = []
+    if not entries:
+        print('No decisions logged')
+        return
+
+    bash = [entry for entry in entries if entry['tool'] == 'Bash']
+    subagent = [entry for entry in bash if entry['parent'] == 'claude']
+    blocked = [entry for entry in bash if entry['verdict'] == 'block']
+    scheduled = [entry for entry in bash if entry['rule'] == 'test-slot']
+    # Older logs called the same measurement latency_us
+    latencies = sorted(entry.get('decide_us', entry.get('latency_us', 0.0)) for entry in entries)
+
+    print(f"Decisions:        {len(entries)} ({len(bash)} Bash, {len(subagent)} from subagents)")
+    print(f"Blocked:          {len(blocked)} ({len(blocked) / max(len(bash), 1):.1%} of Bash, "
+          f"{len(blocked) / max(len(subagent), 1):.1%} of subagent Bash)")
+    print(f"Scheduled runs:   {len(scheduled)}")
+    print(f"Cache hits:       {sum(entry['cached'] for entry in bash) / max(len(bash), 1):.1%}")
+    print(f"decide() µs:      p50 {percentile(latencies, 0.50):.1f}  p99 {percentile(latencies, 0.99):.1f}  "
+          f"mean {statistics.mean(latencies):.1f}")
+    for rule, count in Counter(entry['rule'] for entry in blocked).most_common(5):
+        print(f"  {count:>6}  {rule}")
 
 
 def main() -> int:
     """Main hook logic."""
+    if sys.argv[1:2] == ['--daemon']:
+        return serve(sys.argv[2] if len(sys.argv) > 2 else SOCKET_PATH)
+    if sys.argv[1:2] == ['--summary']:
+        summarise(sys.argv[2] if len(sys.argv) > 2 else AUDIT_LOG_PATH)
+        return 0
+
     try:
         # Read hook payload from stdin
         payload = json.loads(sys.stdin.read())
-
-        # Only check Bash tool invocations
-        if payload.get('tool') != 'Bash':
-            return 0
-
-        # Check if we're in a subagent
-        if not is_subagent():
-            return 0  # Not a subagent, allow all commands
-
-        # Get the command being executed
-        command = payload.get('parameters', {}).get('command', '')
-
-        # Allow QA commands that are explicitly allowed
-        if is_allowed_qa_command(command):
-            return 0
-
-        # Block test commands in subagents
-        if is_test_command(command):
-            error_msg = {
-                'error': 'Test execution blocked in subagent context',
-                'reason': 'Tests cannot run in parallel due to database lock conflicts',
-                'command': command,
-                'allowed': 'Subagents can run: bin/qa -t allCs, bin/qa -t allStatic',
-                'blocked': 'Blocked commands: phpunit, bin/qa -t unit, infection'
-            }
-            print(json.dumps(error_msg), file=sys.stderr)
-            return 1  # Block the command
-
-        return 0  # Allow all other commands
+        code, message = decide(payload, os.getppid())
+        if message:
+            print(message, file=sys.stderr)
+        audit_log.flush()
+        return code
 
     except Exception as e:
         # Log error but don't block (fail open for safety)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test slot scheduler for subagents.
+
+Runs a test command while holding one of N slots, so subagents can run tests
+without fighting over the database:
+
+    test-slot.py run -- vendor/bin/phpunit --filter OrderTest
+    test-slot.py status
+
+Each slot is a file lock (flock) in TEST_SLOT_DIR. With TEST_SLOTS=1 (the
+default) test runs are admitted one at a time against the usual database.
+With TEST_SLOTS=N, runs are admitted N at a time and each gets TEST_TOKEN set
+to its slot number (1..N), the same variable ParaTest sets, so the test
+bootstrap can point each slot at its own database (e.g. app_test_3).
+
+Runs that find every slot busy wait in a queue: one waiter at a time holds
+the queue lock and polls for a free slot, the rest wait for the queue lock.
+A run still waiting after TEST_SLOT_TIMEOUT seconds gives up with exit code
+75 (EX_TEMPFAIL) without running anything.
+
+The command is exec'd with the slot's lock descriptor inherited, so the slot
+is held exactly as long as the test process (and anything it spawns) lives,
+and is released by the kernel even if the run is killed. A nested
+`test-slot.py run` inside a held slot runs straight away instead of waiting
+on its own parent.
+"""
+
+import fcntl
+import json
+import os
+import sys
+import time
+
+SLOT_DIR = os.environ.get(
+    'TEST_SLOT_DIR',
+    os.path.join(os.environ.get('XDG_RUNTIME_DIR', '/tmp'), f'test-slots-{os.getuid()}')
+)
+SLOTS = int(os.environ.get('TEST_SLOTS', '1'))
+QUEUE_TIMEOUT = float(os.environ.get('TEST_SLOT_TIMEOUT', '600'))
+POLL_INTERVAL = 0.1
+EX_TEMPFAIL = 75
+
+
+def open_lock(name: str) -> int:
+    os.makedirs(SLOT_DIR, mode=0o700, exist_ok=True)
+    return os.open(os.path.join(SLOT_DIR, name), os.O_RDWR | os.O_CREAT, 0o600)
+
+
+def try_lock(fd: int) -> bool:
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+def lock_before(fd: int, deadline: float) -> bool:
+    """Poll for an exclusive lock until the deadline."""
+    while not try_lock(fd):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(POLL_INTERVAL)
+    return True
+
+
+def acquire_slot(slots: int = SLOTS, timeout: float = QUEUE_TIMEOUT) -> tuple[int, int] | None:
+    """Return (slot number, locked descriptor), or None on timeout."""
+    deadline = time.monotonic() + timeout
+    queue = open_lock('queue.lock')
+    try:
+        # Only the head of the queue polls the slots
+        if not lock_before(queue, deadline):
+            return None
+        while True:
+            for slot in range(1, slots + 1):
+                fd = open_lock(f'slot-{slot}.lock')
+                if try_lock(fd):
+                    return slot, fd
+                os.close(fd)
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+    finally:
+        # Closing drops the queue lock; the next waiter moves to the head
+        os.close(queue)
+
+
+def run(command: list[str]) -> int:
+    """Wait for a slot, then become the test command while holding it."""
+    if not command:
+        print('test-slot: no command given', file=sys.stderr)
+        return 2
+
+    if os.environ.get('TEST_SLOT_HELD'):
+        return exec_command(command, dict(os.environ))
+
+    waited = time.monotonic()
+    acquired = acquire_slot()
+    if acquired is None:
+        print(json.dumps({
+            'error': 'No test slot became free',
+            'timeout_seconds': QUEUE_TIMEOUT,
+            'slots': SLOTS,
+            'command': ' '.join(command),
+        }), file=sys.stderr)
+        return EX_TEMPFAIL
+
+    slot, fd = acquired
+    # Record the holder for `status`
+    os.ftruncate(fd, 0)
+    os.pwrite(fd, json.dumps({'pid': os.getpid(), 'since': time.time(), 'command': command}).encode(), 0)
+    print(f'test-slot: slot {slot}/{SLOTS} after {time.monotonic() - waited:.1f}s', file=sys.stderr)
+
+    env = dict(os.environ, TEST_SLOT_HELD=str(slot))
+    if SLOTS > 1:
+        env['TEST_TOKEN'] = str(slot)
+    os.set_inheritable(fd, True)
+    return exec_command(command, env)
+
+
+def exec_command(command: list[str], env: dict[str, str]) -> int:
+    """Replace this process with the command; only returns if exec fails."""
+    try:
+        os.execvpe(command[0], command, env)
+    except OSError as e:
+        print(f'test-slot: {command[0]}: {e.strerror}', file=sys.stderr)
+        return 127
+
+
+def status() -> int:
+    """Print which slots are held, and by what."""
+    for slot in range(1, SLOTS + 1):
+        fd = open_lock(f'slot-{slot}.lock')
+        try:
+            if try_lock(fd):
+                print(f'slot {slot}: free')
+                continue
+            holder = json.loads(os.pread(fd, 65536, 0) or b'{}')
+            age = time.time() - holder.get('since', time.time())
+            print(f"slot {slot}: pid {holder.get('pid')} for {age:.0f}s: {' '.join(holder.get('command', []))}")
+        finally:
+            os.close(fd)
+    return 0
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    if args[:1] == ['status']:
+        return status()
+    if args[:1] == ['run']:
+        args = args[1:]
+        if args[:1] == ['--']:
+            args = args[1:]
+        return run(args)
+    print('usage: test-slot.py run -- <command...> | status', file=sys.stderr)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
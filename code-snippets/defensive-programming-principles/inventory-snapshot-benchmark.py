@@ -0,0 +1,133 @@
+"""
+Checks and timings for inventory-snapshot.py.
+
+A validation job over 5,000 orders of 1-8 lines against 20,000 products in
+sqlite, run under the runtime N+1 detector from phpstan-project-level-rules/:
+- per item: Order.can_process() with a service that queries per line item
+- snapshot: one bulk load, then can_process_many() for all orders
+"""
+
+import importlib.util
+import os
+import random
+import sqlite3
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PRODUCTS = 20_000
+ORDERS = 5_000
+
+
+def load(name: str, path: str):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+snapshots = load("inventory_snapshot", "inventory-snapshot.py")
+outbox = load("order_outbox", "order-outbox.py")
+detectors = load("runtime_n_plus_one_detector", "../phpstan-project-level-rules/runtime-n-plus-one-detector.py")
+
+
+class QueryPerItemInventory:
+    def __init__(self, connection) -> None:
+        self.connection = connection
+
+    def has_sufficient_stock(self, product_id: str, quantity: int) -> bool:
+        row = self.connection.execute(
+            "SELECT quantity FROM inventory WHERE product_id = ?", (product_id,)
+        ).fetchone()
+        return row is not None and row[0] >= quantity
+
+
+def build(connection) -> list:
+    rng = random.Random(42)
+    connection.execute("CREATE TABLE inventory (product_id TEXT PRIMARY KEY, quantity INTEGER, version INTEGER)")
+    connection.executemany(
+        "INSERT INTO inventory VALUES (?, ?, 1)",
+        ((f"p{number}", rng.choice((0, 1, 5, 50, 500))) for number in range(PRODUCTS)),
+    )
+    return [
+        outbox.Order(f"o{number}", "customer", [
+            outbox.OrderItem(f"p{rng.randrange(PRODUCTS + 100)}", rng.randint(1, 6))  # A few unknown ids
+            for _ in range(rng.randint(1, 8))
+        ], 0.0)
+        for number in range(ORDERS)
+    ]
+
+
+def check() -> None:
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE inventory (product_id TEXT PRIMARY KEY, quantity INTEGER, version INTEGER)")
+    connection.executemany("INSERT INTO inventory VALUES (?, ?, 1)", [("a", 5), ("b", 0), ("c", 2)])
+    source = snapshots.SqliteStockSource(connection)
+    order = lambda *items: outbox.Order("o", "customer", [outbox.OrderItem(*item) for item in items], 0.0)
+    orders = [order(("a", 5)), order(("a", 6)), order(("a", 1), ("b", 1)), order(("zzz", 1)), order(), order(("c", 2))]
+
+    snapshot = snapshots.InventorySnapshot.for_orders(source, orders)
+    assert len(snapshot) == 3
+    assert snapshot.can_process_many(orders) == [True, False, False, False, True, True]
+    assert snapshot.can_process_many(orders[:1]) == [True]
+    assert [item.can_process(snapshot) for item in orders] == snapshot.can_process_many(orders)
+
+    applied = snapshot.apply([
+        snapshots.StockChanged("b", 3, version=2),
+        snapshots.StockChanged("c", 0, version=3),
+        snapshots.StockChanged("c", 9, version=2),  # Arrives late: ignored
+        snapshots.StockChanged("b", 3, version=2),  # Duplicate: ignored
+        snapshots.StockChanged("zzz", 1, version=1),  # New product: tracked from now on
+    ])
+    assert applied == 3
+    assert snapshot.quantity("c") == 0
+    assert snapshot.can_process_many(orders) == [True, False, True, True, True, False]
+    print("checks passed")
+
+
+def timed(detector, name: str, job) -> tuple[list[bool], float, int]:
+    with detector.unit_of_work(name) as reports:
+        start = time.perf_counter()
+        results = job()
+        elapsed = time.perf_counter() - start
+    return results, elapsed, sum(report.count for report in reports)
+
+
+def benchmark() -> None:
+    detector = detectors.NPlusOneDetector(threshold=3)
+    raw = sqlite3.connect(":memory:")
+    orders = build(raw)
+    connection = detectors.TracedConnection(raw, detector)
+    lines = sum(len(order.items) for order in orders)
+    print(f"{ORDERS:,} orders ({lines:,} lines), {PRODUCTS:,} products:")
+
+    inventory = QueryPerItemInventory(connection)
+    per_item, per_item_time, repeated = timed(
+        detector, "per item", lambda: [order.can_process(inventory) for order in orders]
+    )
+    print(f"  per item    {per_item_time * 1000:>8.1f} ms   {repeated:,} repeated queries flagged")
+
+    source = snapshots.SqliteStockSource(connection)
+    batched, batched_time, repeated = timed(
+        detector, "snapshot",
+        lambda: snapshots.InventorySnapshot.for_orders(source, orders).can_process_many(orders),
+    )
+    print(f"  snapshot    {batched_time * 1000:>8.1f} ms   {repeated:,} repeated queries flagged "
+          f"({per_item_time / batched_time:.0f}x)")
+
+    snapshot = snapshots.InventorySnapshot.for_orders(snapshots.SqliteStockSource(raw), orders)
+    start = time.perf_counter()
+    snapshot.can_process_many(orders)
+    check_time = time.perf_counter() - start
+    print(f"  of which can_process_many() {check_time * 1000:.1f} ms")
+    assert batched == per_item, "same answers as Order.can_process"
+
+
+def main() -> None:
+    check()
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
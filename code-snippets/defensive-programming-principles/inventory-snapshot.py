@@ -0,0 +1,122 @@
+"""
+Inventory snapshot for checking many orders without a query per line item.
+
+Order.can_process(inventory_service) asks has_sufficient_stock() once per
+item: the N+1 shape QueryInLoopChecker and the runtime detector in
+phpstan-project-level-rules/ flag. InventorySnapshot loads the stock for every
+product in a job with one query, then answers for thousands of orders at once:
+- Stock levels live in an array('q'), indexed by a product id -> slot dict;
+  slot 0 is "unknown product" with no stock, so lookups never branch
+- can_process_many() flattens every order line into slot and quantity
+  arrays and compares them in single C-level passes (itemgetter/map), then
+  marks the orders that own a failing line
+- apply() takes StockChanged events (absolute levels with a version), so
+  the snapshot stays current without reloading; duplicate and out-of-order
+  events are ignored, and apply() should run on one thread
+- has_sufficient_stock() keeps it a drop-in inventory_service for the
+  one-order path
+
+A snapshot is a read model: good for rejecting orders early, not a
+reservation. Reserve stock atomically at the source as before.
+"""
+
+import json
+import sqlite3
+from array import array
+from dataclasses import dataclass
+from itertools import compress, repeat
+from operator import gt, itemgetter
+from typing import Iterable, Mapping, Protocol, Sequence
+
+UNKNOWN_SLOT = 0
+
+
+@dataclass(frozen=True)
+class StockChanged:
+    product_id: str
+    quantity: int  # Level after the change, not a delta
+    version: int  # Increases with every change to this product
+
+
+class StockSource(Protocol):
+    def stock_levels(self, product_ids: Sequence[str]) -> Mapping[str, tuple[int, int]]:
+        """(quantity, version) for each known product id, in one fetch."""
+
+
+class SqliteStockSource:
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    def stock_levels(self, product_ids: Sequence[str]) -> Mapping[str, tuple[int, int]]:
+        # One statement however many ids: they travel as a single JSON parameter
+        rows = self.connection.execute(
+            "SELECT product_id, quantity, version FROM inventory"
+            " WHERE product_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(product_ids)),),
+        )
+        return {product_id: (quantity, version) for product_id, quantity, version in rows}
+
+
+class InventorySnapshot:
+    def __init__(self) -> None:
+        self._slots: dict[str, int] = {}
+        self._stock = array("q", [0])  # Slot 0: unknown product
+        self._versions = array("q", [0])
+
+    @classmethod
+    def load(cls, source: StockSource, product_ids: Iterable[str]) -> "InventorySnapshot":
+        snapshot = cls()
+        for product_id, (quantity, version) in source.stock_levels(list(dict.fromkeys(product_ids))).items():
+            snapshot._set(product_id, quantity, version)
+        return snapshot
+
+    @classmethod
+    def for_orders(cls, source: StockSource, orders: Iterable) -> "InventorySnapshot":
+        return cls.load(source, (item.product_id for order in orders for item in order.items))
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def quantity(self, product_id: str) -> int:
+        return self._stock[self._slots.get(product_id, UNKNOWN_SLOT)]
+
+    def has_sufficient_stock(self, product_id: str, quantity: int) -> bool:
+        return self._stock[self._slots.get(product_id, UNKNOWN_SLOT)] >= quantity
+
+    def can_process_many(self, orders: Sequence) -> list[bool]:
+        """Order.can_process() for every order, in input order."""
+        slot_of = self._slots.get
+        slots: list[int] = []
+        quantities: list[int] = []
+        owners: list[int] = []
+        for index, order in enumerate(orders):
+            items = order.items
+            slots.extend([slot_of(item.product_id, UNKNOWN_SLOT) for item in items])
+            quantities.extend([item.quantity for item in items])
+            owners.extend(repeat(index, len(items)))
+        if not slots:
+            return [True] * len(orders)
+        available = itemgetter(*slots)(self._stock) if len(slots) > 1 else (self._stock[slots[0]],)
+        short = set(compress(owners, map(gt, quantities, available)))
+        return [index not in short for index in range(len(orders))]
+
+    def apply(self, events: Iterable[StockChanged]) -> int:
+        """Fold stock changes in; return how many were newer than what was held."""
+        applied = 0
+        for event in events:
+            slot = self._slots.get(event.product_id)
+            if slot is not None and event.version <= self._versions[slot]:
+                continue  # Already seen, or overtaken by a later change
+            self._set(event.product_id, event.quantity, event.version)
+            applied += 1
+        return applied
+
+    def _set(self, product_id: str, quantity: int, version: int) -> None:
+        slot = self._slots.get(product_id)
+        if slot is None:
+            self._slots[product_id] = len(self._stock)
+            self._stock.append(quantity)
+            self._versions.append(version)
+        else:
+            self._stock[slot] = quantity
+            self._versions[slot] = version
@@ -0,0 +1,244 @@
+"""
+Checks and throughput for order-outbox.py.
+
+The broker stand-in costs 2ms per publish call, roughly an acknowledged write
+to a broker in the same datacentre. Timings compare:
+- publish-after-save: the pseudocode's save() then publish() on the request path
+- outbox, commit per order: execute() as written, one transaction per order
+- outbox, grouped commits: execute() inside repository.transaction() per 100
+- publisher drain: batches of 500 from the outbox through HandlerPool
+"""
+
+import importlib.util
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BROKER_LATENCY = 0.002
+ORDERS = 50_000
+BASELINE_ORDERS = 1_000
+GROUP = 100
+
+
+def load(name: str, filename: str):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+outbox = load("order_outbox", "order-outbox.py")
+
+
+class Inventory:
+    def has_sufficient_stock(self, product_id: str, quantity: int) -> bool:
+        return product_id != "sold-out"
+
+
+class Payments:
+    def charge(self, total: float, customer_id: str) -> None:
+        if customer_id.endswith("7"):
+            raise outbox.PaymentError("card declined")
+
+
+class RejectingBroker:
+    """Permanently rejects any batch holding an event whose reason is "poison"."""
+
+    def __init__(self, downstream) -> None:
+        self.downstream = downstream
+
+    def publish(self, events: list) -> None:
+        if any(getattr(event, "reason", None) == "poison" for event in events):
+            raise ValueError("schema validation failed")
+        self.downstream.publish(events)
+
+
+class SlowBroker:
+    def __init__(self, downstream, fail_first: int = 0) -> None:
+        self.downstream = downstream
+        self.fail_first = fail_first
+        self.calls = 0
+
+    def publish(self, events: list) -> None:
+        self.calls += 1
+        time.sleep(BROKER_LATENCY)
+        if self.calls <= self.fail_first:
+            raise ConnectionError("broker unavailable")
+        self.downstream.publish(events)
+
+
+def seed(path: str, count: int, prefix: str = "order") -> list[str]:
+    repository = outbox.SqliteOrderRepository(path)
+    ids = [f"{prefix}-{number}" for number in range(count)]
+    repository.add_many(
+        outbox.Order(order_id, f"customer-{number}",
+                     [outbox.OrderItem("sold-out" if number % 50 == 0 else "widget", 1)], 9.99)
+        for number, order_id in enumerate(ids)
+    )
+    return ids
+
+
+def check(directory: str) -> None:
+    path = os.path.join(directory, "check.db")
+    ids = seed(path, 200)
+    repository = outbox.SqliteOrderRepository(path)
+    service = outbox.ProcessOrderService(repository, Inventory(), Payments())
+
+    # Outcome and event land together
+    for order_id in ids:
+        service.execute(outbox.ProcessOrderCommand(order_id))
+    assert repository.find_by_id("order-0").status == outbox.OrderStatus.FAILED
+    assert repository.find_by_id("order-1").status == outbox.OrderStatus.PROCESSING
+    assert repository.find_by_id("order-7").status == outbox.OrderStatus.FAILED
+
+    # A failed save leaves neither the state change nor the event behind
+    publisher = outbox.OutboxPublisher(path, broker=None)
+    before = publisher.pending()
+    order = repository.find_by_id("order-2")
+    try:
+        with repository.transaction():
+            repository.save(order, order.fail("rolled back"))
+            raise RuntimeError("crash before commit")
+    except RuntimeError:
+        pass
+    assert publisher.pending() == before
+    assert repository.find_by_id("order-2").status == outbox.OrderStatus.PROCESSING
+
+    # So does one whose COMMIT fails (a deferred foreign key), and the
+    # connection is not left inside the open transaction
+    with repository.transaction() as connection:
+        connection.execute("CREATE TABLE parent (id INTEGER PRIMARY KEY)")
+        connection.execute("CREATE TABLE child (parent_id INTEGER REFERENCES parent DEFERRABLE INITIALLY DEFERRED)")
+    connection.execute("PRAGMA foreign_keys = ON")
+    try:
+        with repository.transaction():
+            repository.save(order, order.fail("commit fails"))
+            connection.execute("INSERT INTO child VALUES (1)")
+    except sqlite3.IntegrityError:
+        pass
+    assert not connection.in_transaction
+    connection.execute("PRAGMA foreign_keys = OFF")
+    assert publisher.pending() == before
+    assert repository.find_by_id("order-2").status == outbox.OrderStatus.PROCESSING
+
+    # Three events per order, a broker that fails its first five calls, four
+    # handler threads: every event still arrives, once, in order per order
+    for order_id in ids:
+        order = repository.find_by_id(order_id)
+        now = datetime.now(timezone.utc)
+        repository.save(order, *(outbox.OrderFailed(order_id, f"step {step}", now) for step in range(3)))
+    seen: dict[str, list[str]] = defaultdict(list)
+    lock = threading.Lock()
+
+    def record(event) -> None:
+        with lock:
+            seen[event.order_id].append(event.reason)
+
+    logging.getLogger(outbox.__name__).setLevel(logging.CRITICAL)  # The retries and dead letters below are expected
+    pool = outbox.HandlerPool({outbox.OrderFailed: [record]}, workers=4, queue_size=16)
+    broker = SlowBroker(pool, fail_first=5)
+    publisher = outbox.OutboxPublisher(path, broker, batch_size=64, base_backoff=0.01, max_backoff=0.05)
+    repository.on_commit.append(publisher.notify)
+    publisher.start()
+    assert publisher.wait_until_empty(timeout=10)
+    publisher.stop()
+    pool.join()
+    pool.close()
+    assert publisher.failed_batches + publisher.failed_events == 5
+    assert publisher.dead_lettered == 0
+    for order_id in ids:
+        steps = [reason for reason in seen[order_id] if reason.startswith("step")]
+        assert steps == ["step 0", "step 1", "step 2"], (order_id, seen[order_id])
+
+    # A poison event and an undecodable payload are dead-lettered; every other
+    # event, including the later ones for the poisoned order, still goes out
+    seen.clear()
+    for order_id in ids[:20]:
+        order = repository.find_by_id(order_id)
+        now = datetime.now(timezone.utc)
+        reasons = ["before", "poison", "after"] if order_id == "order-5" else ["before", "after"]
+        repository.save(order, *(outbox.OrderFailed(order_id, reason, now) for reason in reasons))
+    with repository.transaction() as connection:
+        connection.execute("INSERT INTO outbox (order_id, event_type, payload) VALUES ('order-9', 'OrderFailed', '{broken')")
+    pool = outbox.HandlerPool({outbox.OrderFailed: [record]}, workers=4, queue_size=16)
+    publisher = outbox.OutboxPublisher(path, RejectingBroker(pool), batch_size=16,
+                                       base_backoff=0.01, max_backoff=0.05, max_attempts=3)
+    publisher.start()
+    assert publisher.wait_until_empty(timeout=10)
+    publisher.stop()
+    pool.join()
+    pool.close()
+    assert publisher.dead_lettered == publisher.dead_letters() == 2
+    assert publisher.published == 2 * 20
+    assert seen["order-5"] == ["before", "after"], seen["order-5"]
+    assert all(seen[order_id] == ["before", "after"] for order_id in ids[:20])
+    print(f"checks passed ({publisher.failed_batches} failed batches retried one by one, "
+          f"{publisher.dead_lettered} events dead-lettered)")
+
+
+def orders_per_second(count: int, seconds: float) -> str:
+    return f"{count / seconds:>9,.0f} orders/s"
+
+
+def benchmark(directory: str) -> None:
+    print(f"{ORDERS:,} orders, {BROKER_LATENCY * 1000:.0f}ms per broker call:")
+
+    # The pseudocode: publish on the request path, one call per event
+    path = os.path.join(directory, "baseline.db")
+    ids = seed(path, BASELINE_ORDERS)
+    repository = outbox.SqliteOrderRepository(path)
+    pool = outbox.HandlerPool({}, workers=8)
+    broker = SlowBroker(pool)
+    service = outbox.ProcessOrderService(repository, Inventory(), Payments())
+    start = time.perf_counter()
+    for order_id in ids:
+        service.execute(outbox.ProcessOrderCommand(order_id))
+        broker.publish([outbox.OrderProcessed(order_id, "customer", 9.99, datetime.now(timezone.utc))])
+    print(f"  publish-after-save          {orders_per_second(BASELINE_ORDERS, time.perf_counter() - start)}")
+
+    path = os.path.join(directory, "outbox.db")
+    ids = seed(path, ORDERS)
+    repository = outbox.SqliteOrderRepository(path)
+    service = outbox.ProcessOrderService(repository, Inventory(), Payments())
+    half = ORDERS // 2
+
+    start = time.perf_counter()
+    for order_id in ids[:half]:
+        service.execute(outbox.ProcessOrderCommand(order_id))
+    print(f"  outbox, commit per order    {orders_per_second(half, time.perf_counter() - start)}")
+
+    start = time.perf_counter()
+    for offset in range(half, ORDERS, GROUP):
+        with repository.transaction():
+            for order_id in ids[offset:offset + GROUP]:
+                service.execute(outbox.ProcessOrderCommand(order_id))
+    print(f"  outbox, grouped commits     {orders_per_second(ORDERS - half, time.perf_counter() - start)}")
+
+    handled = outbox.HandlerPool({outbox.OrderProcessed: [lambda event: None]}, workers=8)
+    publisher = outbox.OutboxPublisher(path, SlowBroker(handled), batch_size=500)
+    start = time.perf_counter()
+    publisher.start()
+    assert publisher.wait_until_empty(timeout=120)
+    publisher.stop()
+    handled.join()
+    elapsed = time.perf_counter() - start
+    print(f"  publisher drain             {publisher.published / elapsed:>9,.0f} events/s "
+          f"({publisher.batches} broker calls, {handled.handled:,} handled)")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        check(directory)
+        benchmark(directory)
+
+
+if __name__ == "__main__":
+    main()
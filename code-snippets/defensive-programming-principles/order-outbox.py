@@ -0,0 +1,545 @@
+"""
+ProcessOrderService from pseudocode-principles.py with a transactional outbox.
+
+execute() no longer publishes. The order row and its events are written in one
+sqlite transaction, so an event exists if and only if its state change does,
+and a slow broker no longer sits on the checkout path.
+
+OutboxPublisher drains the outbox on a background thread:
+- Up to `batch_size` events per round, handed to the broker as one batch
+- A failed batch is retried one event at a time, so one poison event only
+  holds back later events for its own order; if the first event fails on its
+  own too, the broker is treated as down and the publisher pauses instead
+- A failed event is retried with capped exponential backoff plus jitter; after
+  `max_attempts`, or at once if its payload cannot be decoded, it moves to
+  the outbox_dead table, and later events for its order go out without it
+- Per-order ordering: an event is never picked while an earlier event for the
+  same order is still waiting out a backoff
+- Delivery is at-least-once (a crash between publish and delete repeats the
+  batch), so consumers dedupe on event_id
+- Run one publisher per outbox; two would race each other's ordering
+
+HandlerPool runs OrderCompletedHandler and friends on a fixed number of worker
+threads with bounded queues. Events for one order always go to the same
+worker, so handlers see them in order, and a full queue blocks the publisher
+instead of growing memory.
+"""
+
+import json
+import logging
+import queue
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Callable, Iterable, Iterator, Optional, Protocol, Union
+
+logger = logging.getLogger(__name__)
+
+
+class OrderStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+def _new_event_id() -> str:
+    return uuid.uuid4().hex
+
+
+@dataclass(frozen=True)
+class OrderProcessed:
+    order_id: str
+    customer_id: str
+    total: float
+    processed_at: datetime
+    event_id: str = field(default_factory=_new_event_id)
+
+
+@dataclass(frozen=True)
+class OrderFailed:
+    order_id: str
+    reason: str
+    failed_at: datetime
+    event_id: str = field(default_factory=_new_event_id)
+
+
+Event = Union[OrderProcessed, OrderFailed]
+EVENT_TYPES: dict[str, type] = {cls.__name__: cls for cls in (OrderProcessed, OrderFailed)}
+
+
+class DomainException(Exception):
+    pass
+
+
+class PaymentError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class OrderItem:
+    product_id: str
+    quantity: int
+
+
+@dataclass
+class Order:
+    order_id: str
+    customer_id: str
+    items: list[OrderItem]
+    total: float
+    status: OrderStatus = OrderStatus.PENDING
+
+    def can_process(self, inventory_service) -> bool:
+        return all(
+            inventory_service.has_sufficient_stock(item.product_id, item.quantity)
+            for item in self.items
+        )
+
+    def process(self) -> OrderProcessed:
+        if self.status != OrderStatus.PENDING:
+            raise DomainException("Order must be pending to process")
+        self.status = OrderStatus.PROCESSING
+        return OrderProcessed(self.order_id, self.customer_id, self.total, datetime.now(timezone.utc))
+
+    def fail(self, reason: str) -> OrderFailed:
+        self.status = OrderStatus.FAILED
+        return OrderFailed(self.order_id, reason, datetime.now(timezone.utc))
+
+
+def _encode(event: Event) -> str:
+    return json.dumps({
+        name: value.isoformat() if isinstance(value, datetime) else value
+        for name, value in vars(event).items()
+    })
+
+
+def _decode(event_type: str, payload: str) -> Event:
+    fields = json.loads(payload)
+    for name, value in fields.items():
+        if name.endswith("_at"):
+            fields[name] = datetime.fromisoformat(value)
+    return EVENT_TYPES[event_type](**fields)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    items TEXT NOT NULL,
+    total REAL NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS outbox_order ON outbox (order_id, id);
+CREATE TABLE IF NOT EXISTS outbox_dead (
+    id INTEGER PRIMARY KEY,
+    order_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT NOT NULL,
+    failed_at REAL NOT NULL
+);
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    # Autocommit mode: transactions are explicit BEGIN IMMEDIATE ... COMMIT
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+@contextmanager
+def _immediate(connection: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back if the block or the COMMIT raises."""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+        connection.execute("COMMIT")
+    except BaseException:
+        # A failed COMMIT (busy, deferred constraint) leaves the transaction open
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+
+
+class SqliteOrderRepository:
+    """Orders and their outbox in one database; one connection per thread."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.on_commit: list[Callable[[], None]] = []
+        self._local = threading.local()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = connect(self.path)
+            self._local.depth = 0
+        return connection
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        One commit for everything saved inside the block (nesting joins the
+        outer transaction). Wrapping a batch of execute() calls trades a
+        larger unit of rollback for far fewer fsyncs.
+        """
+        connection = self._connection
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield connection
+            finally:
+                self._local.depth -= 1
+            return
+        self._local.depth = 1
+        try:
+            with _immediate(connection):
+                yield connection
+        finally:
+            self._local.depth = 0
+        for callback in self.on_commit:
+            callback()
+
+    def add_many(self, orders: Iterable[Order]) -> None:
+        with self.transaction() as connection:
+            connection.executemany(
+                "INSERT INTO orders VALUES (?, ?, ?, ?, ?)",
+                (
+                    (order.order_id, order.customer_id,
+                     json.dumps([[item.product_id, item.quantity] for item in order.items]),
+                     order.total, order.status.value)
+                    for order in orders
+                ),
+            )
+
+    def find_by_id(self, order_id: str) -> Optional[Order]:
+        row = self._connection.execute(
+            "SELECT customer_id, items, total, status FROM orders WHERE order_id = ?", (order_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        customer_id, items, total, status = row
+        return Order(order_id, customer_id, [OrderItem(*item) for item in json.loads(items)],
+                     total, OrderStatus(status))
+
+    def save(self, order: Order, *events: Event) -> None:
+        """Persist the order's state and queue its events, atomically."""
+        with self.transaction() as connection:
+            connection.execute(
+                "UPDATE orders SET status = ? WHERE order_id = ?", (order.status.value, order.order_id)
+            )
+            connection.executemany(
+                "INSERT INTO outbox (order_id, event_type, payload) VALUES (?, ?, ?)",
+                ((event.order_id, type(event).__name__, _encode(event)) for event in events),
+            )
+
+
+@dataclass(frozen=True)
+class ProcessOrderCommand:
+    order_id: str
+
+
+class ProcessOrderService:
+    def __init__(self, order_repository: SqliteOrderRepository, inventory_service, payment_service) -> None:
+        self.order_repository = order_repository
+        self.inventory_service = inventory_service
+        self.payment_service = payment_service
+
+    def execute(self, process_command: ProcessOrderCommand) -> None:
+        order = self.order_repository.find_by_id(process_command.order_id)
+
+        if not order.can_process(self.inventory_service):
+            self.order_repository.save(order, order.fail("Insufficient inventory"))
+            return
+
+        try:
+            self.payment_service.charge(order.total, order.customer_id)
+        except PaymentError as error:
+            self.order_repository.save(order, order.fail(f"Payment failed: {error}"))
+            return
+        self.order_repository.save(order, order.process())
+
+
+class Broker(Protocol):
+    def publish(self, events: list[Event]) -> None:
+        """Deliver the whole batch or raise; a raise means its events are retried."""
+
+
+# Oldest eligible events first, skipping any order with an earlier event in backoff
+_NEXT_BATCH = """
+SELECT id, order_id, event_type, payload, attempts FROM outbox AS candidate
+WHERE available_at <= :now AND NOT EXISTS (
+    SELECT 1 FROM outbox AS earlier
+    WHERE earlier.order_id = candidate.order_id
+      AND earlier.id < candidate.id
+      AND earlier.available_at > :now
+)
+ORDER BY id
+LIMIT :limit
+"""
+
+
+class OutboxPublisher:
+    def __init__(
+        self,
+        path: str,
+        broker: Broker,
+        batch_size: int = 500,
+        poll_interval: float = 0.05,
+        base_backoff: float = 0.1,
+        max_backoff: float = 30.0,
+        max_attempts: int = 25,
+    ) -> None:
+        self.broker = broker
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts  # Size with max_backoff to outlast a broker outage
+        self.published = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.failed_events = 0
+        self.dead_lettered = 0
+        self.last_error: Optional[BaseException] = None
+        self._outages = 0  # Rounds in a row that published nothing
+        self._resume_at = 0.0
+        self._connection = connect(path)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self) -> None:
+        """Wake the publisher early; register as SqliteOrderRepository.on_commit."""
+        self._wake.set()
+
+    def start(self) -> "OutboxPublisher":
+        self._thread = threading.Thread(target=self._run, name="outbox-publisher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def pending(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def wait_until_empty(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while self.pending():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                published = self.publish_batch()
+            except sqlite3.Error:
+                logger.exception("Outbox read failed")
+                published = 0
+            if published < self.batch_size:
+                # Caught up (or backing off): sleep until notified or polled
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def dead_letters(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM outbox_dead").fetchone()[0]
+
+    def publish_batch(self) -> int:
+        """Publish one batch; return how many events went out."""
+        if time.time() < self._resume_at:
+            return 0
+        rows = self._connection.execute(
+            _NEXT_BATCH, {"now": time.time(), "limit": self.batch_size}
+        ).fetchall()
+        if not rows:
+            return 0
+        events, undecodable = [], []
+        for row in rows:
+            try:
+                events.append((row, _decode(row[2], row[3])))
+            except Exception as error:
+                undecodable.append((row, error))
+        if undecodable:
+            with self._transaction():
+                for row, error in undecodable:
+                    self._dead_letter(row, row[4], error)
+        if not events:
+            return 0
+        if len(events) > 1:
+            try:
+                self.broker.publish([event for _, event in events])
+            except Exception as error:
+                self.failed_batches += 1
+                self.last_error = error
+                logger.warning("Outbox batch of %d failed, retrying one by one: %s", len(events), error)
+            else:
+                with self._transaction():
+                    self._connection.executemany("DELETE FROM outbox WHERE id = ?", [(row[0],) for row, _ in events])
+                self.published += len(events)
+                self.batches += 1
+                self._outages = 0
+                return len(events)
+        return self._publish_each(events)
+
+    def _publish_each(self, events: list) -> int:
+        """Publish events one at a time, so a failed one only holds back its own order."""
+        published, failed, blocked = [], [], set()
+        for row, event in events:
+            if row[1] in blocked:
+                continue  # Stays behind its order's failed event
+            try:
+                self.broker.publish([event])
+            except Exception as error:
+                self.failed_events += 1
+                self.last_error = error
+                failed.append((row, error))
+                blocked.add(row[1])
+                if not published:
+                    break  # Nothing goes through: the broker, not this event, is the problem
+            else:
+                published.append((row[0],))
+        with self._transaction():
+            self._connection.executemany("DELETE FROM outbox WHERE id = ?", published)
+            for row, error in failed:
+                self._retry_or_dead_letter(row, error)
+        self.published += len(published)
+        self.batches += len(published)
+        if published:
+            self._outages = 0
+        else:
+            self._outages += 1
+            self._resume_at = time.time() + self._backoff(self._outages)
+        return len(published)
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _retry_or_dead_letter(self, row: tuple, error: Exception) -> None:
+        row_id, _, _, _, attempts = row
+        attempts += 1
+        if attempts >= self.max_attempts:
+            self._dead_letter(row, attempts, error)
+            return
+        self._connection.execute(
+            "UPDATE outbox SET attempts = ?, available_at = ? WHERE id = ?",
+            (attempts, time.time() + self._backoff(attempts), row_id),
+        )
+        logger.warning("Outbox event %d failed (attempt %d): %s", row_id, attempts, error)
+
+    def _dead_letter(self, row: tuple, attempts: int, error: Exception) -> None:
+        row_id, order_id, event_type, payload, _ = row
+        self._connection.execute(
+            "INSERT INTO outbox_dead VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (row_id, order_id, event_type, payload, attempts, repr(error), time.time()),
+        )
+        self._connection.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+        self.dead_lettered += 1
+        logger.error("Outbox event %d for order %s dead-lettered after %d attempts: %r",
+                     row_id, order_id, attempts, error)
+
+    def _transaction(self):
+        return _immediate(self._connection)
+
+
+_STOP = object()
+
+
+class HandlerPool:
+    """
+    Broker-side fan-out to event handlers on `workers` threads.
+
+    Handler errors are logged and counted, not retried: once the publisher has
+    handed a batch over, the outbox's job is done. Point a real broker's
+    consumer at dispatch() to keep its redelivery instead.
+    """
+
+    def __init__(self, handlers: dict[type, list[Callable[[Event], None]]],
+                 workers: int = 8, queue_size: int = 1000) -> None:
+        self.handlers = handlers
+        self.handled = 0
+        self.errors = 0
+        self._counts_lock = threading.Lock()
+        self._queues: list[queue.Queue] = [queue.Queue(queue_size) for _ in range(workers)]
+        self._threads = [
+            threading.Thread(target=self._work, args=(work,), name=f"order-handlers-{number}", daemon=True)
+            for number, work in enumerate(self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def publish(self, events: list[Event]) -> None:
+        for event in events:
+            self.dispatch(event)
+
+    def dispatch(self, event: Event) -> None:
+        # Blocks while that worker's queue is full: back-pressure to the publisher
+        self._queues[hash(event.order_id) % len(self._queues)].put(event)
+
+    def join(self) -> None:
+        """Wait until every dispatched event has been handled."""
+        for work in self._queues:
+            work.join()
+
+    def close(self) -> None:
+        for work in self._queues:
+            work.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self, work: queue.Queue) -> None:
+        handled = errors = 0
+        while True:
+            event = work.get()
+            if event is _STOP:
+                work.task_done()
+                return
+            for handler in self.handlers.get(type(event), ()):
+                try:
+                    handler(event)
+                except Exception:
+                    errors += 1
+                    logger.exception("Handler %r failed for event %s", handler, event.event_id)
+            handled += 1
+            if work.empty() or handled >= 100:
+                with self._counts_lock:
+                    self.handled += handled
+                    self.errors += errors
+                handled = errors = 0
+            work.task_done()
+
+
+class OrderCompletedHandler:
+    def __init__(self, customer_repository, email_service) -> None:
+        self.customer_repository = customer_repository
+        self.email_service = email_service
+
+    def handle(self, event: OrderProcessed) -> None:
+        customer = self.customer_repository.find_by_id(event.customer_id)
+        self.email_service.send_confirmation(customer.email, event)
@@ -0,0 +1,158 @@
+"""
+Local Redis stand-in for exercising session-store.py without a Redis server.
+
+Speaks enough RESP for the SessionStore commands (GET, GETEX, MGET, SET,
+SETEX, DEL, TTL, EXPIRE, PING, FLUSHDB, plus the HELLO/CLIENT handshake
+redis-py sends). It counts connections, commands and round trips, and can add a
+fixed latency per round trip (per socket read, as a network would), so
+pipelining shows up in timings the way it does against a real server.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class RedisStandIn:
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.data: dict[bytes, tuple[bytes, Optional[float]]] = {}  # key -> (value, expires at)
+        self.connections = 0
+        self.commands = 0
+        self.round_trips = 0
+        self.port: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> str:
+        """Serve on 127.0.0.1 from a background thread; return the redis:// URL."""
+        ready = threading.Event()
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            server = self._loop.run_until_complete(asyncio.start_server(self._serve, "127.0.0.1", 0))
+            self.port = server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    def ttl_of(self, key: bytes) -> Optional[float]:
+        entry = self.data.get(key)
+        return None if entry is None or entry[1] is None else entry[1] - time.monotonic()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        buffer = b""
+        connection = {"protocol": 2}
+        try:
+            while data := await reader.read(65536):
+                buffer += data
+                commands, buffer = _parse_commands(buffer)
+                if not commands:
+                    continue  # Partial command: wait for the rest
+                # A pipeline arrives in one read: one round trip, many commands
+                self.round_trips += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(b"".join(self._execute(command, connection) for command in commands))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry[0]
+
+    def _execute(self, command: list[bytes], connection: dict) -> bytes:
+        self.commands += 1
+        name, args = command[0].upper(), command[1:]
+        now = time.monotonic()
+        null = b"_\r\n" if connection["protocol"] == 3 else b"$-1\r\n"
+
+        def bulk(value: Optional[bytes]) -> bytes:
+            return null if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name == b"HELLO":
+            # redis-py 8 asks for RESP3, which only changes how nulls are sent here
+            protocol = connection["protocol"] = int(args[0]) if args else 2
+            fields = [b"server", b"redis", b"version", b"7.2.0", b"proto", protocol,
+                      b"id", 1, b"mode", b"standalone", b"role", b"master", b"modules", []]
+            encoded = b"".join(
+                b":%d\r\n" % field if isinstance(field, int)
+                else b"*0\r\n" if isinstance(field, list) else bulk(field)
+                for field in fields
+            )
+            if protocol == 3:
+                return b"%%%d\r\n" % (len(fields) // 2) + encoded
+            return b"*%d\r\n" % len(fields) + encoded
+        if name in (b"CLIENT", b"SELECT"):
+            return b"+OK\r\n"
+        if name == b"FLUSHDB":
+            self.data.clear()
+            return b"+OK\r\n"
+        if name == b"GET":
+            return bulk(self._get(args[0]))
+        if name == b"GETEX":
+            value = self._get(args[0])
+            if value is not None and len(args) == 3 and args[1].upper() == b"EX":
+                self.data[args[0]] = (value, now + int(args[2]))
+            return bulk(value)
+        if name == b"MGET":
+            return b"*%d\r\n" % len(args) + b"".join(bulk(self._get(key)) for key in args)
+        if name == b"SET":
+            expires = now + int(args[3]) if len(args) == 4 and args[2].upper() == b"EX" else None
+            self.data[args[0]] = (args[1], expires)
+            return b"+OK\r\n"
+        if name == b"SETEX":
+            self.data[args[0]] = (args[2], now + int(args[1]))
+            return b"+OK\r\n"
+        if name == b"DEL":
+            return b":%d\r\n" % sum(self.data.pop(key, None) is not None for key in args)
+        if name == b"EXPIRE":
+            value = self._get(args[0])
+            if value is None:
+                return b":0\r\n"
+            self.data[args[0]] = (value, now + int(args[1]))
+            return b":1\r\n"
+        if name == b"TTL":
+            if self._get(args[0]) is None:
+                return b":-2\r\n"
+            remaining = self.ttl_of(args[0])
+            return b":%d\r\n" % (-1 if remaining is None else round(remaining))
+        return b"-ERR unknown command '%s'\r\n" % name.lower()
+
+
+def _parse_commands(buffer: bytes) -> tuple[list[list[bytes]], bytes]:
+    """Split complete RESP arrays off the front of the buffer."""
+    commands = []
+    while True:
+        position, parts = 0, []
+        header_end = buffer.find(b"\r\n", position)
+        if header_end == -1:
+            return commands, buffer
+        count = int(buffer[1:header_end])
+        position = header_end + 2
+        for _ in range(count):
+            length_end = buffer.find(b"\r\n", position)
+            if length_end == -1:
+                return commands, buffer
+            length = int(buffer[position + 1:length_end])
+            start = length_end + 2
+            if len(buffer) < start + length + 2:
+                return commands, buffer
+            parts.append(buffer[start:start + length])
+            position = start + length + 2
+        commands.append(parts)
+        buffer = buffer[position:]
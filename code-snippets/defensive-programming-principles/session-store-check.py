@@ -0,0 +1,103 @@
+"""
+Checks and timings for session-store.py against redis-stand-in.py.
+
+The stand-in adds 0.5ms per round trip, roughly a same-datacentre hop, so a
+page reading 20 sessions shows the cost of 20 round trips against one
+pipelined get_many, and the local layer shows the cost of none.
+"""
+
+import asyncio
+import importlib.util
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LATENCY = 0.0005
+SESSIONS = 20
+PAGES = 50
+
+
+def load(name: str, filename: str):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+session_store = load("session_store", "session-store.py")
+redis_stand_in = load("redis_stand_in", "redis-stand-in.py")
+
+
+def check_sync(url: str, server) -> None:
+    store = session_store.SessionStore.from_url(url, ttl=60)
+    store.set("a", {"user": 1})
+    assert store.get("a") == {"user": 1}
+    assert store.get("missing") is None
+
+    # Sliding expiry: a read pushes the TTL back out
+    server.data[b"session:a"] = (server.data[b"session:a"][0], time.monotonic() + 5)
+    store.get("a")
+    assert server.ttl_of(b"session:a") > 55
+
+    store.set_many({f"s{i}": {"user": i} for i in range(SESSIONS)})
+    before = server.round_trips
+    sessions = store.get_many([f"s{i}" for i in range(SESSIONS)] + ["missing"])
+    assert server.round_trips - before == 1, "get_many is one round trip"
+    assert sessions == {f"s{i}": {"user": i} for i in range(SESSIONS)}
+
+    store.delete("a")
+    assert store.get("a") is None
+
+    # The local layer answers repeat reads without Redis
+    local = session_store.SessionStore.from_url(url, ttl=60, local_ttl=1.0)
+    local.get_many([f"s{i}" for i in range(SESSIONS)])
+    before = server.round_trips
+    assert local.get("s3") == {"user": 3}
+    assert server.round_trips == before
+
+    # Stores built from the same URL share one pool
+    assert store.redis_client.connection_pool is local.redis_client.connection_pool
+
+
+async def check_async(url: str, server) -> None:
+    store = session_store.AsyncSessionStore.from_url(url, ttl=60)
+    await store.set_many({f"async{i}": {"user": i} for i in range(SESSIONS)})
+    before = server.round_trips
+    sessions = await store.get_many([f"async{i}" for i in range(SESSIONS)])
+    assert server.round_trips - before == 1
+    assert sessions[f"async{SESSIONS - 1}"] == {"user": SESSIONS - 1}
+    await store.delete("async0")
+    assert await store.get("async0") is None
+    await store.redis_client.aclose()
+
+
+def time_pages(read_page) -> float:
+    start = time.perf_counter()
+    for _ in range(PAGES):
+        read_page()
+    return (time.perf_counter() - start) / PAGES * 1000
+
+
+def main() -> None:
+    server = redis_stand_in.RedisStandIn(latency=LATENCY)
+    url = server.start()
+    check_sync(url, server)
+    asyncio.run(check_async(url, server))
+    print(f"checks passed ({server.connections} connections for every store and call)")
+
+    ids = [f"s{i}" for i in range(SESSIONS)]
+    store = session_store.SessionStore.from_url(url)
+    local = session_store.SessionStore.from_url(url, local_ttl=5.0)
+    print(f"page reading {SESSIONS} sessions, {LATENCY * 1000:.1f}ms per round trip:")
+    for name, read_page in (
+        ("get() per session", lambda: [store.get(session_id) for session_id in ids]),
+        ("get_many()", lambda: store.get_many(ids)),
+        ("get_many() + local layer", lambda: local.get_many(ids)),
+    ):
+        print(f"  {name:<26} {time_pages(read_page):>7.2f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+SessionStore from pseudocode-principles.py, as real Python on redis-py.
+
+Still the simple solution, sized for a gateway that reads sessions on every
+request:
+- One connection pool per Redis URL per process, shared by every store
+- get_many/set_many send all keys in one pipelined round trip
+- Sliding expiry: reads use GETEX, so a read also pushes the TTL out
+- Optional read-through local layer (local_ttl seconds) that skips the
+  round trip and the JSON parse for sessions read again within that window;
+  it remembers misses too, so keep local_ttl short
+- AsyncSessionStore: the same API on redis.asyncio
+
+Values returned from the local layer are shared between callers: treat
+sessions as read-only and write changes back with set().
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Mapping, Optional
+
+import redis
+import redis.asyncio
+
+KEY_PREFIX = "session:"
+DEFAULT_TTL = 3600
+
+_pools: dict[str, redis.ConnectionPool] = {}
+_async_pools: dict[str, redis.asyncio.ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def shared_pool(url: str) -> redis.ConnectionPool:
+    with _pools_lock:
+        if url not in _pools:
+            _pools[url] = redis.ConnectionPool.from_url(url, max_connections=64)
+        return _pools[url]
+
+
+def shared_async_pool(url: str) -> redis.asyncio.ConnectionPool:
+    # One per URL, used from one event loop
+    with _pools_lock:
+        if url not in _async_pools:
+            _async_pools[url] = redis.asyncio.ConnectionPool.from_url(url, max_connections=64)
+        return _async_pools[url]
+
+
+class LocalLayer:
+    """Short-lived, size-bounded copy of recently read sessions."""
+
+    def __init__(self, ttl: float, maxsize: int = 10_000) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, Optional[dict]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> tuple[bool, Optional[dict]]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[0] <= time.monotonic():
+                return False, None
+            return True, entry[1]
+
+    def put(self, session_id: str, data: Optional[dict]) -> None:
+        with self._lock:
+            self._entries[session_id] = (time.monotonic() + self.ttl, data)
+            self._entries.move_to_end(session_id)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+
+def _parse(raw: Optional[bytes]) -> Optional[dict]:
+    return json.loads(raw) if raw is not None else None
+
+
+class SessionStore:
+    def __init__(self, client: redis.Redis, ttl: int = DEFAULT_TTL, local_ttl: Optional[float] = None) -> None:
+        self.redis_client = client
+        self.ttl = ttl
+        self.local = LocalLayer(local_ttl) if local_ttl else None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "SessionStore":
+        return cls(redis.Redis(connection_pool=shared_pool(url)), **kwargs)
+
+    def get(self, session_id: str) -> Optional[dict]:
+        return self.get_many([session_id]).get(session_id)
+
+    def get_many(self, session_ids: Iterable[str]) -> dict[str, dict]:
+        """Sessions that exist, by id: one round trip for every id not held locally."""
+        found: dict[str, dict] = {}
+        missing = _take_local(self.local, session_ids, found)
+        if not missing:
+            return found
+        if len(missing) == 1:
+            raws = [self.redis_client.getex(KEY_PREFIX + missing[0], ex=self.ttl)]
+        else:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for session_id in missing:
+                pipe.getex(KEY_PREFIX + session_id, ex=self.ttl)
+            raws = pipe.execute()
+        return _merge(self.local, missing, raws, found)
+
+    def set(self, session_id: str, data: dict, ttl: Optional[int] = None) -> None:
+        self.set_many({session_id: data}, ttl)
+
+    def set_many(self, sessions: Mapping[str, dict], ttl: Optional[int] = None) -> None:
+        pipe = self.redis_client.pipeline(transaction=False)
+        for session_id, data in sessions.items():
+            pipe.set(KEY_PREFIX + session_id, json.dumps(data), ex=ttl or self.ttl)
+        pipe.execute()
+        _remember(self.local, sessions)
+
+    def delete(self, session_id: str) -> None:
+        self.redis_client.delete(KEY_PREFIX + session_id)
+        if self.local:
+            self.local.discard(session_id)
+
+
+class AsyncSessionStore:
+    def __init__(self, client: redis.asyncio.Redis, ttl: int = DEFAULT_TTL, local_ttl: Optional[float] = None) -> None:
+        self.redis_client = client
+        self.ttl = ttl
+        self.local = LocalLayer(local_ttl) if local_ttl else None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "AsyncSessionStore":
+        return cls(redis.asyncio.Redis(connection_pool=shared_async_pool(url)), **kwargs)
+
+    async def get(self, session_id: str) -> Optional[dict]:
+        return (await self.get_many([session_id])).get(session_id)
+
+    async def get_many(self, session_ids: Iterable[str]) -> dict[str, dict]:
+        found: dict[str, dict] = {}
+        missing = _take_local(self.local, session_ids, found)
+        if not missing:
+            return found
+        if len(missing) == 1:
+            raws = [await self.redis_client.getex(KEY_PREFIX + missing[0], ex=self.ttl)]
+        else:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for session_id in missing:
+                pipe.getex(KEY_PREFIX + session_id, ex=self.ttl)
+            raws = await pipe.execute()
+        return _merge(self.local, missing, raws, found)
+
+    async def set(self, session_id: str, data: dict, ttl: Optional[int] = None) -> None:
+        await self.set_many({session_id: data}, ttl)
+
+    async def set_many(self, sessions: Mapping[str, dict], ttl: Optional[int] = None) -> None:
+        pipe = self.redis_client.pipeline(transaction=False)
+        for session_id, data in sessions.items():
+            pipe.set(KEY_PREFIX + session_id, json.dumps(data), ex=ttl or self.ttl)
+        await pipe.execute()
+        _remember(self.local, sessions)
+
+    async def delete(self, session_id: str) -> None:
+        await self.redis_client.delete(KEY_PREFIX + session_id)
+        if self.local:
+            self.local.discard(session_id)
+
+
+# Shared by both stores: everything but the I/O
+
+def _take_local(local: Optional[LocalLayer], session_ids: Iterable[str], found: dict) -> list[str]:
+    """Fill `found` from the local layer; return the ids still to fetch."""
+    missing = []
+    for session_id in dict.fromkeys(session_ids):
+        hit, data = local.get(session_id) if local else (False, None)
+        if not hit:
+            missing.append(session_id)
+        elif data is not None:
+            found[session_id] = data
+    return missing
+
+
+def _merge(local: Optional[LocalLayer], missing: list[str], raws: list, found: dict) -> dict:
+    for session_id, raw in zip(missing, raws):
+        data = _parse(raw)
+        if local:
+            local.put(session_id, data)
+        if data is not None:
+            found[session_id] = data
+    return found
+
+
+def _remember(local: Optional[LocalLayer], sessions: Mapping[str, dict]) -> None:
+    if local:
+        for session_id, data in sessions.items():
+            local.put(session_id, data)
@@ -0,0 +1,129 @@
+"""
+Checks and throughput for user-import.py.
+
+Uses a cheaper scrypt cost (n=2**12) so a run takes seconds. It compares the
+one-at-a-time create_user() loop with import_users() on every core. The
+speed-up tracks the core count, because the hash is the whole cost.
+"""
+
+import importlib.util
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HASH_COST = 2 ** 12
+ROWS = 600
+
+
+def load(name: str, filename: str):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module  # Pool workers look _hash_chunk up by module name
+    spec.loader.exec_module(module)
+    return module
+
+
+user_import = load("user_import", "user-import.py")
+
+
+def write_sources(directory: str, rows: int) -> tuple[str, str]:
+    csv_path = os.path.join(directory, "users.csv")
+    jsonl_path = os.path.join(directory, "users.jsonl")
+    with open(csv_path, "w", encoding="utf-8") as csv_file, open(jsonl_path, "w", encoding="utf-8") as jsonl:
+        csv_file.write("id,email,password\n")
+        for number in range(rows):
+            email = f"user{number}@Example.COM" if number % 97 else "not-an-email"
+            password = f"correct horse {number}" if number % 89 else "short"
+            csv_file.write(f"u{number},{email},{password}\n")
+            jsonl.write(json.dumps({"id": f"u{number}", "email": email, "password": password}) + "\n")
+        csv_file.write("u1,again@example.com,long enough password\n")
+        jsonl.write("{broken\n")
+        jsonl.write(json.dumps({"id": 42, "email": ["x@example.com"], "password": 12345678}) + "\n")
+    return csv_path, jsonl_path
+
+
+def check(directory: str) -> None:
+    csv_path, jsonl_path = write_sources(directory, 200)
+    db_path = os.path.join(directory, "check.db")
+    errors = io.StringIO()
+    bound = []
+    metrics = user_import.import_users(
+        user_import.read_rows(csv_path), user_import.SqliteUserSink(db_path),
+        user_import.RejectedRows(errors), workers=2, chunk_size=8, max_pending_chunks=3,
+        batch_size=50, hash_cost=HASH_COST,
+        on_progress=lambda progress: bound.append(progress.in_flight), progress_every=0,
+    )
+    rejected = [json.loads(line) for line in errors.getvalue().splitlines()]
+    expected_rejections = 3 + 2 + 1  # Emails 0/97/194, passwords 89/178, the repeated u1
+    assert metrics.rejected == len(rejected) == expected_rejections, rejected
+    assert {row["field"] for row in rejected} == {"email", "password", "id"}
+    assert "short" not in errors.getvalue(), "passwords never reach the error stream"
+    assert metrics.written == 200 - 5
+    assert max(bound) <= 3 * 8, "back-pressure caps hashes in flight"
+
+    connection = sqlite3.connect(db_path)
+    ids = [row[0] for row in connection.execute("SELECT id FROM users ORDER BY rowid")]
+    assert ids == sorted(ids, key=lambda user_id: int(user_id[1:])), "written in input order"
+    email, password_hash = connection.execute("SELECT email, password_hash FROM users WHERE id = 'u3'").fetchone()
+    assert email == "user3@example.com"
+    assert user_import.verify_password("correct horse 3", password_hash)
+
+    # Re-running skips what is already there without hashing it again;
+    # JSONL rejects the broken line
+    errors = io.StringIO()
+    metrics = user_import.import_users(
+        user_import.read_rows(jsonl_path), user_import.SqliteUserSink(db_path),
+        user_import.RejectedRows(errors), workers=2, hash_cost=HASH_COST,
+    )
+    assert metrics.written == 0 and metrics.skipped_existing == 200 - 5
+    assert metrics.hashed == 0
+    broken, wrong_types = (json.loads(line) for line in errors.getvalue().splitlines()[-2:])
+    assert broken["field"] == "row"
+    assert (wrong_types["id"], wrong_types["field"], wrong_types["reason"]) == (42, "id", "must be a string")
+    assert metrics.rejected == 5 + 2, "the JSONL has no repeated u1, but a broken line and a non-string row"
+    print(f"checks passed ({metrics})")
+
+
+def benchmark(directory: str) -> None:
+    csv_path, _ = write_sources(directory, ROWS)
+    print(f"{ROWS} rows, scrypt n={HASH_COST}, {os.cpu_count()} cores:")
+
+    # The smart constructor one row at a time, committing each insert
+    connection = sqlite3.connect(os.path.join(directory, "baseline.db"))
+    connection.execute("CREATE TABLE users (id TEXT PRIMARY KEY, email TEXT, status TEXT, password_hash TEXT)")
+    original_cost, user_import.SCRYPT_N = user_import.SCRYPT_N, HASH_COST
+    start = time.perf_counter()
+    for _, row in user_import.read_rows(csv_path):
+        try:
+            account = user_import.create_user(row["id"], row["email"], row["password"])
+        except user_import.ValidationError:
+            continue
+        with connection:
+            connection.execute("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?)",
+                               (account.id, account.email, account.status.value, account.password_hash))
+    baseline = time.perf_counter() - start
+    user_import.SCRYPT_N = original_cost
+    print(f"  create_user() loop        {ROWS / baseline:>7,.0f} rows/s")
+
+    with open(os.devnull, "w") as errors:
+        metrics = user_import.import_users(
+            user_import.read_rows(csv_path), user_import.SqliteUserSink(os.path.join(directory, "bulk.db")),
+            user_import.RejectedRows(errors), hash_cost=HASH_COST,
+        )
+    print(f"  import_users()            {ROWS / metrics.elapsed:>7,.0f} rows/s "
+          f"({baseline / metrics.elapsed:.1f}x)")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        check(directory)
+        benchmark(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+Bulk user import built on the create_user smart constructor from
+pseudocode-principles.py.
+
+create_user() hashes one password at a time, so a migration of a few million
+accounts runs at the speed of one core running a deliberately slow hash.
+import_users() keeps the same invariants and spreads the work:
+- Rows stream from CSV or JSONL; nothing holds the whole file
+- validate_user_id/validate_email/validate_password run inline in this
+  process with precompiled patterns, so rejected rows never cost a hash
+- Passwords are hashed in chunks on a process pool; at most
+  `max_pending_chunks` are in flight, so a fast reader cannot queue the whole
+  file in memory (back-pressure)
+- Accounts are written in batches of `batch_size`, in input order;
+  ids already in the sink are skipped before hashing, so an interrupted
+  import can be re-run cheaply
+- Rejected rows go to a separate JSONL error stream with line, id, field and
+  reason (never the password)
+- ImportMetrics tracks progress and throughput and is passed to on_progress
+
+Usage: python user-import.py users.csv --db users.db --errors rejected.jsonl
+"""
+
+import argparse
+import base64
+import csv
+import hashlib
+import hmac
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import IO, Callable, Iterable, Iterator, Mapping, NewType, Optional
+
+UserId = NewType("UserId", str)
+Email = NewType("Email", str)
+PasswordHash = NewType("PasswordHash", str)
+
+# scrypt cost: about 60ms and 16MB per hash on a current server core
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+_USER_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+_EMAIL = re.compile(r"([^@\s]{1,64})@([A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+)")
+_PASSWORD_HASH = re.compile(r"scrypt\$\d+\$\d+\$\d+\$[A-Za-z0-9+/=]+\$[A-Za-z0-9+/=]+")
+
+
+class UserStatus(str, Enum):
+    ACTIVE = "active"
+    PENDING_VERIFICATION = "pending_verification"
+    SUSPENDED = "suspended"
+    DELETED = "deleted"
+
+
+class ValidationError(ValueError):
+    def __init__(self, field_name: str, reason: str) -> None:
+        super().__init__(f"{field_name}: {reason}")
+        self.field = field_name
+        self.reason = reason
+
+
+@dataclass(frozen=True, slots=True)
+class UserAccount:
+    id: UserId
+    email: Email
+    status: UserStatus
+    password_hash: Optional[PasswordHash] = None
+    verified_at: Optional[datetime] = None
+
+    def __post_init__(self) -> None:
+        if self.password_hash is not None and not _PASSWORD_HASH.fullmatch(self.password_hash):
+            raise ValidationError("password_hash", "not an scrypt hash")
+
+    def can_login(self) -> bool:
+        if self.status == UserStatus.ACTIVE:
+            return self.password_hash is not None
+        if self.status == UserStatus.PENDING_VERIFICATION:
+            return self.password_hash is not None and self.verified_at is not None
+        return False
+
+
+def validate_user_id(value: Optional[str]) -> UserId:
+    # JSONL rows can hold any JSON type; only strings are validated further
+    if value is not None and not isinstance(value, str):
+        raise ValidationError("id", "must be a string")
+    if not value or not _USER_ID.fullmatch(value):
+        raise ValidationError("id", "must be 1-64 letters, digits, '_', '.' or '-'")
+    return UserId(value)
+
+
+def validate_email(value: Optional[str]) -> Email:
+    if value is not None and not isinstance(value, str):
+        raise ValidationError("email", "must be a string")
+    match = _EMAIL.fullmatch(value.strip()) if value else None
+    if match is None or len(value) > 254:
+        raise ValidationError("email", "not a valid address")
+    return Email(f"{match[1]}@{match[2].lower()}")
+
+
+def validate_password(value: Optional[str]) -> str:
+    if value is not None and not isinstance(value, str):
+        raise ValidationError("password", "must be a string")
+    if not value or not 8 <= len(value) <= 1024:
+        raise ValidationError("password", "must be 8-1024 characters")
+    return value
+
+
+def hash_password(password: str, n: Optional[int] = None) -> PasswordHash:
+    n = n or SCRYPT_N
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=n, r=SCRYPT_R, p=SCRYPT_P)
+    encoded = f"scrypt${n}${SCRYPT_R}${SCRYPT_P}${base64.b64encode(salt).decode()}${base64.b64encode(digest).decode()}"
+    return PasswordHash(encoded)
+
+
+def verify_password(password: str, password_hash: PasswordHash) -> bool:
+    _, n, r, p, salt, digest = password_hash.split("$")
+    candidate = hashlib.scrypt(password.encode(), salt=base64.b64decode(salt), n=int(n), r=int(r), p=int(p))
+    return hmac.compare_digest(candidate, base64.b64decode(digest))
+
+
+def create_user(id_str: str, email_str: str, password_str: str) -> UserAccount:
+    user_id = validate_user_id(id_str)
+    email = validate_email(email_str)
+    password_hash = hash_password(validate_password(password_str))
+    return UserAccount(user_id, email, UserStatus.PENDING_VERIFICATION, password_hash, None)
+
+
+def _hash_chunk(passwords: list[str], n: int) -> list[PasswordHash]:
+    # Runs in a pool worker: one task per chunk keeps pickling overhead small
+    return [hash_password(password, n) for password in passwords]
+
+
+def read_rows(path: str) -> Iterator[tuple[int, Mapping[str, Optional[str]]]]:
+    """(line number, row) pairs from a .csv (with a header) or .jsonl file."""
+    with open(path, newline="", encoding="utf-8") as handle:
+        if path.endswith(".csv"):
+            reader = csv.DictReader(handle)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_number, line in enumerate(handle, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as error:
+                row = {"_error": f"invalid JSON: {error.msg}"}
+            yield line_number, row if isinstance(row, dict) else {"_error": "not a JSON object"}
+
+
+class RejectedRows:
+    """JSONL error stream: one object per rejected row."""
+
+    def __init__(self, stream: IO[str]) -> None:
+        self.stream = stream
+
+    def reject(self, line_number: int, user_id: Optional[str], field_name: str, reason: str) -> None:
+        self.stream.write(json.dumps(
+            {"line": line_number, "id": user_id, "field": field_name, "reason": reason}
+        ) + "\n")
+
+
+class SqliteUserSink:
+    def __init__(self, path: str) -> None:
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id TEXT PRIMARY KEY,
+                email TEXT NOT NULL,
+                status TEXT NOT NULL,
+                password_hash TEXT,
+                verified_at TEXT
+            )
+        """)
+
+    def existing(self, user_ids: list[str]) -> set[str]:
+        placeholders = ",".join("?" * len(user_ids))
+        return {row[0] for row in self.connection.execute(
+            f"SELECT id FROM users WHERE id IN ({placeholders})", user_ids
+        )}
+
+    def write_many(self, accounts: list[UserAccount]) -> int:
+        """Insert a batch in one transaction; return how many were new."""
+        before = self.connection.total_changes
+        self.connection.execute("BEGIN")
+        try:
+            self.connection.executemany(
+                "INSERT INTO users VALUES (?, ?, ?, ?, ?) ON CONFLICT (id) DO NOTHING",
+                (
+                    (account.id, account.email, account.status.value, account.password_hash,
+                     account.verified_at.isoformat() if account.verified_at else None)
+                    for account in accounts
+                ),
+            )
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        return self.connection.total_changes - before
+
+
+@dataclass
+class ImportMetrics:
+    read: int = 0
+    rejected: int = 0
+    hashed: int = 0
+    written: int = 0
+    skipped_existing: int = 0
+    in_flight: int = 0  # Submitted for hashing, not yet back
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def hashes_per_second(self) -> float:
+        return self.hashed / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.read:,} read, {self.rejected:,} rejected, {self.written:,} written, "
+                f"{self.skipped_existing:,} existing, {self.in_flight:,} hashing; "
+                f"{self.hashes_per_second:,.0f} hashes/s over {self.elapsed:.1f}s")
+
+
+def import_users(
+    rows: Iterable[tuple[int, Mapping[str, Optional[str]]]],
+    sink: SqliteUserSink,
+    rejected: RejectedRows,
+    workers: Optional[int] = None,
+    chunk_size: int = 32,
+    max_pending_chunks: Optional[int] = None,
+    batch_size: int = 1000,
+    hash_cost: int = SCRYPT_N,
+    on_progress: Optional[Callable[[ImportMetrics], None]] = None,
+    progress_every: float = 1.0,
+) -> ImportMetrics:
+    """
+    Import rows as PENDING_VERIFICATION accounts. Ids are checked for
+    duplicates within the import in memory (one set entry per account).
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending_chunks = max_pending_chunks or 2 * workers
+    metrics = ImportMetrics()
+    pending: deque[tuple[list[tuple[UserId, Email]], Future]] = deque()
+    users: list[tuple[UserId, Email]] = []
+    passwords: list[str] = []
+    batch: list[UserAccount] = []
+    seen: set[str] = set()
+    next_report = metrics.started + progress_every
+
+    def flush() -> None:
+        if batch:
+            inserted = sink.write_many(batch)
+            metrics.written += inserted
+            metrics.skipped_existing += len(batch) - inserted
+            batch.clear()
+
+    def collect(keep: int) -> None:
+        # Oldest first, so accounts are written in input order
+        while pending and (len(pending) > keep or pending[0][1].done()):
+            chunk_users, future = pending.popleft()
+            hashes = future.result()
+            metrics.hashed += len(hashes)
+            metrics.in_flight -= len(hashes)
+            batch.extend(
+                UserAccount(user_id, email, UserStatus.PENDING_VERIFICATION, password_hash, None)
+                for (user_id, email), password_hash in zip(chunk_users, hashes)
+            )
+            if len(batch) >= batch_size:
+                flush()
+
+    def submit(pool: ProcessPoolExecutor) -> None:
+        existing = sink.existing([user_id for user_id, _ in users])
+        if existing:
+            metrics.skipped_existing += len(existing)
+            kept = [index for index, (user_id, _) in enumerate(users) if user_id not in existing]
+            users[:] = [users[index] for index in kept]
+            passwords[:] = [passwords[index] for index in kept]
+            if not users:
+                return
+        collect(keep=max_pending_chunks - 1)  # Blocks while the pool is saturated
+        pending.append((users.copy(), pool.submit(_hash_chunk, passwords.copy(), hash_cost)))
+        metrics.in_flight += len(passwords)
+        users.clear()
+        passwords.clear()
+
+    with ProcessPoolExecutor(workers) as pool:
+        for line_number, row in rows:
+            metrics.read += 1
+            raw_id = row.get("id")
+            try:
+                if "_error" in row:
+                    raise ValidationError("row", row["_error"])
+                user_id = validate_user_id(raw_id)
+                email = validate_email(row.get("email"))
+                password = validate_password(row.get("password"))
+                if user_id in seen:
+                    raise ValidationError("id", "duplicate in this import")
+            except ValidationError as error:
+                rejected.reject(line_number, raw_id, error.field, error.reason)
+                metrics.rejected += 1
+                continue
+            seen.add(user_id)
+            users.append((user_id, email))
+            passwords.append(password)
+            if len(passwords) == chunk_size:
+                submit(pool)
+            if on_progress and time.monotonic() >= next_report:
+                on_progress(metrics)
+                next_report = time.monotonic() + progress_every
+        if passwords:
+            submit(pool)
+        collect(keep=0)
+    flush()
+    if on_progress:
+        on_progress(metrics)
+    return metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import users from CSV or JSONL")
+    parser.add_argument("source", help="users.csv (id,email,password header) or users.jsonl")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--errors", default="rejected.jsonl")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with open(args.errors, "w", encoding="utf-8") as errors:
+        import_users(
+            read_rows(args.source), SqliteUserSink(args.db), RejectedRows(errors),
+            workers=args.workers, batch_size=args.batch_size,
+            on_progress=lambda progress: print(progress, file=sys.stderr),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# Generate slotted, frozen Python models with the custom model template
+openapi-generator-cli generate \
+  -i api-spec.yaml \
+  -g python \
+  -o ./generated/python-client \
+  -t ./openapi-templates/python \
+  --additional-properties=dataclassSlots=true
@@ -0,0 +1,168 @@
+"""
+Throughput and peak RSS: decoding a JSON array of products.
+
+Each mode runs in its own process so ru_maxrss is that mode's peak:
+- baseline: json.load, then one plain @dataclass Product per dict
+- slots-kept: iter_products() into a list of slotted, frozen Products
+- slots-streamed: iter_products(), each instance dropped after use
+- columnar: decode_batches(), every batch kept
+"""
+
+import importlib.util
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PRODUCTS = int(os.environ.get("PRODUCTS", "300000"))
+MODES = ("baseline", "slots-kept", "slots-streamed", "columnar")
+
+spec = importlib.util.spec_from_file_location(
+    "generated_python_bulk_decoder", os.path.join(HERE, "generated-python-bulk-decoder.py")
+)
+decoder = importlib.util.module_from_spec(spec)
+sys.modules["generated_python_bulk_decoder"] = decoder
+spec.loader.exec_module(decoder)
+
+
+@dataclass
+class PlainProduct:
+    """The model as generated before: a plain @dataclass."""
+
+    id: str
+    name: str
+    price: float
+    category: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+def write_catalogue(path: str, count: int) -> None:
+    random.seed(7)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    categories = [f"category-{i}" for i in range(40)]
+    with open(path, "w") as catalogue:
+        catalogue.write("[\n")
+        for i in range(count):
+            product = {
+                "id": str(uuid.UUID(int=random.getrandbits(128))),
+                "name": f"Product {i}",
+                "price": round(random.uniform(1, 500), 2),
+                "category": random.choice(categories),
+                "createdAt": (start + timedelta(seconds=random.randrange(50_000_000))).isoformat(),
+            }
+            catalogue.write(("," if i else "") + json.dumps(product) + "\n")
+        catalogue.write("]\n")
+
+
+def run_mode(mode: str, path: str) -> None:
+    start = time.perf_counter()
+    with open(path) as stream:
+        if mode == "baseline":
+            kept = [
+                PlainProduct(item["id"], item["name"], item["price"], item.get("category"),
+                             datetime.fromisoformat(item["createdAt"]))
+                for item in json.load(stream)
+            ]
+            count = len(kept)
+        elif mode == "slots-kept":
+            kept = list(decoder.iter_products(stream))
+            count = len(kept)
+        elif mode == "slots-streamed":
+            count = sum(1 for _ in decoder.iter_products(stream))
+        else:
+            kept = list(decoder.decode_batches(stream))
+            count = sum(len(batch) for batch in kept)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"mode": mode, "count": count, "seconds": elapsed, "peak_mb": peak_mb}))
+
+
+def check(path: str) -> None:
+    """Every decoder agrees with json.load on a small file."""
+    with open(path) as stream:
+        expected = json.load(stream)
+    with open(path) as stream:
+        products = list(decoder.iter_products(stream))
+    with open(path) as stream:
+        batches = list(decoder.decode_batches(stream, batch_size=7))
+    rows = [batch.product(row) for batch in batches for row in range(len(batch))]
+    for item, product, row in zip(expected, products, rows, strict=True):
+        created = datetime.fromisoformat(item["createdAt"])
+        assert product == decoder.Product(item["id"], item["name"], item["price"], item["category"], created)
+        assert row == product, (row, product)
+
+
+def check_naive_timestamps() -> None:
+    """Timestamps without an offset are UTC on both paths, whatever the host's TZ."""
+    created = ["2024-03-10T12:00:00", "2024-03-10T12:00:00+02:00", "2024-03-10T12:00:00Z", None]
+    document = json.dumps([
+        {"id": str(uuid.UUID(int=i)), "name": f"Product {i}", "price": 1.0, "createdAt": value}
+        for i, value in enumerate(created)
+    ])
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "America/New_York"
+    time.tzset()
+    try:
+        products = list(decoder.iter_products(io.StringIO(document)))
+        for rows in (created, created[:3]):  # With and without a missing value
+            batch = next(decoder.decode_batches(io.StringIO(document), batch_size=len(rows)))
+            assert [batch.product(row) for row in range(len(rows))] == products[:len(rows)]
+        assert products[0].created_at == datetime(2024, 3, 10, 12, tzinfo=timezone.utc)
+    finally:
+        if previous is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = previous
+        time.tzset()
+
+
+def check_id_spellings() -> None:
+    """Ids that are not canonical lowercase UUIDs come back exactly as sent."""
+    canonical = str(uuid.UUID(int=1))
+    for ids in ([canonical, canonical.upper()], [canonical, canonical.replace("-", "")], [canonical, "sku-42"]):
+        document = json.dumps([{"id": value, "name": "Product", "price": 1.0} for value in ids])
+        products = list(decoder.iter_products(io.StringIO(document)))
+        batch = next(decoder.decode_batches(io.StringIO(document)))
+        assert [batch.product(row) for row in range(len(batch))] == products
+        assert [product.id for product in products] == ids
+    batch = next(decoder.decode_batches(io.StringIO(json.dumps([{"id": canonical, "name": "P", "price": 1.0}]))))
+    assert isinstance(batch.ids, bytes)  # Canonical ids are still packed
+
+
+def main() -> None:
+    if sys.argv[1:2] == ["--mode"]:
+        run_mode(sys.argv[2], sys.argv[3])
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        small = os.path.join(directory, "small.json")
+        write_catalogue(small, 50)
+        check(small)
+        check_naive_timestamps()
+        check_id_spellings()
+        print("decoders agree with json.load")
+
+        path = os.path.join(directory, "catalogue.json")
+        write_catalogue(path, PRODUCTS)
+        print(f"{PRODUCTS:,} products, {os.path.getsize(path) / 1e6:.0f} MB of JSON")
+        print(f"{'mode':<16} {'products/s':>12} {'peak RSS MB':>12}")
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, path], capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output)
+            print(f"{mode:<16} {result['count'] / result['seconds']:>12,.0f} {result['peak_mb']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Bulk decoding for the generated Product model (simplified).
+
+Product is the model as python-dataclass-model.mustache emits it with
+dataclassSlots=true (see generate-python-slots.sh). Two ways to read a JSON
+array of products without ever holding it as a list of dicts:
+
+- iter_products(): streams the array and yields slotted, frozen Product
+  instances one at a time (at most one chunk of dicts is alive at once)
+- decode_batches(): builds columnar ProductBatch objects of `batch_size`
+  rows: ids packed as 16-byte UUIDs (kept as strings when a batch has any
+  id not in canonical lowercase form), prices in a float array, categories
+  dictionary-encoded, and created_at parsed a whole column at a time into
+  epoch seconds
+
+Timestamps without an offset are read as UTC on both paths, whatever the
+host's TZ, so a batch row materialises to the same instant iter_products()
+yields.
+"""
+
+import json
+import re
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from operator import attrgetter
+from typing import IO, Iterator, Optional
+
+CHUNK_SIZE = 1 << 16
+BATCH_SIZE = 100_000
+
+_decoder = json.JSONDecoder()
+# Between array items; commas are not validated strictly
+_SEPARATORS = re.compile(r"[\s,]*")
+# Newline-joined column of ids that packing to bytes and back reproduces exactly
+_UUID = "[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+_CANONICAL_IDS = re.compile(f"{_UUID}(?:\n{_UUID})*+")
+
+
+@dataclass(slots=True, frozen=True)
+class Product:
+    id: str
+    name: str
+    price: float
+    category: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+def iter_objects(stream: IO[str]) -> Iterator[dict]:
+    """
+    Yield the items of a top-level JSON array, reading `CHUNK_SIZE` at a time.
+
+    Fast path: a raw newline can only sit between tokens, never inside a
+    string, so when items are written one per line (as most exporters do)
+    everything up to a chunk's last newline is whole items, decoded in one
+    C call. Any other layout falls back to decoding item by item.
+    """
+    buffer = stream.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array")
+    pending = buffer[1:]
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        pending += chunk
+        if chunk:
+            cut = pending.rfind("\n")
+            if cut == -1:
+                if len(pending) > 4 * CHUNK_SIZE:
+                    # No line breaks to split on (e.g. a single-line array)
+                    yield from _scan_items(pending, stream)
+                    return
+                continue
+            block, pending = pending[:cut], pending[cut:]
+        else:
+            block, pending = pending.rstrip(), ""
+            if not block.endswith("]"):
+                raise ValueError("Unterminated JSON array")
+            block = block[:-1]
+        body = block.strip().strip(",")
+        if not body:
+            if not chunk:
+                return
+            continue
+        try:
+            items = json.loads(f"[{body}]")
+        except json.JSONDecodeError:
+            # Items span lines: decode the rest one item at a time
+            yield from _scan_items(block + pending + ("" if chunk else "]"), stream)
+            return
+        yield from items
+        if not chunk:
+            return
+
+
+def _scan_items(buffer: str, stream: IO[str]) -> Iterator[dict]:
+    position = 0
+    while True:
+        position = _SEPARATORS.match(buffer, position).end()
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            if position == len(buffer):
+                raise json.JSONDecodeError("Need more data", buffer, position)
+            item, position = _decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The next item straddles the chunk boundary (or is malformed)
+            more = stream.read(CHUNK_SIZE)
+            if not more:
+                raise
+            buffer, position = buffer[position:] + more, 0
+            continue
+        yield item
+
+
+def _slot_setters(cls: type) -> list:
+    return [getattr(cls, name).__set__ for name in cls.__slots__]
+
+
+# A frozen dataclass __init__ goes through object.__setattr__ per field;
+# the bulk path writes the slots directly, which is about twice as fast
+_set_id, _set_name, _set_price, _set_category, _set_created_at = _slot_setters(Product)
+_new = object.__new__
+
+
+def iter_products(stream: IO[str]) -> Iterator[Product]:
+    for item in iter_objects(stream):
+        product = _new(Product)
+        _set_id(product, item["id"])
+        _set_name(product, item["name"])
+        _set_price(product, float(item["price"]))
+        _set_category(product, item.get("category"))
+        created_at = item.get("createdAt")
+        if created_at:
+            created_at = datetime.fromisoformat(created_at)
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)  # As _as_utc(), inlined
+        _set_created_at(product, created_at or None)
+        yield product
+
+
+@dataclass(slots=True)
+class ProductBatch:
+    """Column-oriented rows: one array per field instead of one object per product."""
+
+    ids: bytes | list[str] = b""  # 16 bytes per row, or the original strings
+    names: list[str] = field(default_factory=list)
+    prices: array = field(default_factory=lambda: array("d"))
+    category_codes: array = field(default_factory=lambda: array("I"))  # index into categories
+    categories: list[Optional[str]] = field(default_factory=lambda: [None])
+    created_at: array = field(default_factory=lambda: array("d"))  # epoch seconds, NaN if absent
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def product(self, row: int) -> Product:
+        """Materialise one row, for the rare caller that needs an object."""
+        if isinstance(self.ids, list):
+            product_id = self.ids[row]
+        else:
+            hex_id = self.ids[16 * row:16 * row + 16].hex()
+            product_id = f"{hex_id[:8]}-{hex_id[8:12]}-{hex_id[12:16]}-{hex_id[16:20]}-{hex_id[20:]}"
+        created_at = self.created_at[row]
+        return Product(
+            product_id,
+            self.names[row],
+            self.prices[row],
+            self.categories[self.category_codes[row]],
+            None if created_at != created_at else datetime.fromtimestamp(created_at, timezone.utc),
+        )
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Naive values are UTC, not the host's local time
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _parse_datetime(value: str) -> datetime:
+    return _as_utc(datetime.fromisoformat(value))
+
+
+_tzinfo = attrgetter("tzinfo")
+
+
+def _timestamp(value: Optional[str]) -> float:
+    return _parse_datetime(value).timestamp() if value else float("nan")
+
+
+def _finish(batch: ProductBatch, ids: list[str], created: list[Optional[str]]) -> ProductBatch:
+    # Whole-column conversions: one C-level pass each instead of a call per row
+    # Pack only ids that come back unchanged, so product() returns the same
+    # id iter_products() does (not a lowercased or re-dashed one)
+    if _CANONICAL_IDS.fullmatch("\n".join(ids)):
+        batch.ids = bytes.fromhex("".join(ids).replace("-", ""))
+    else:
+        batch.ids = ids
+    if None in created or "" in created:
+        batch.created_at = array("d", map(_timestamp, created))
+    else:
+        parsed = list(map(datetime.fromisoformat, created))
+        if None in map(_tzinfo, parsed):
+            parsed = list(map(_as_utc, parsed))
+        batch.created_at = array("d", map(datetime.timestamp, parsed))
+    return batch
+
+
+def decode_batches(stream: IO[str], batch_size: int = BATCH_SIZE) -> Iterator[ProductBatch]:
+    batch, ids, created = ProductBatch(), [], []
+    codes: dict[Optional[str], int] = {None: 0}
+    for item in iter_objects(stream):
+        ids.append(item["id"])
+        batch.names.append(item["name"])
+        batch.prices.append(item["price"])
+        category = item.get("category")
+        code = codes.get(category)
+        if code is None:
+            code = codes[category] = len(batch.categories)
+            batch.categories.append(category)
+        batch.category_codes.append(code)
+        created.append(item.get("createdAt"))
+        if len(ids) == batch_size:
+            yield _finish(batch, ids, created)
+            batch, ids, created = ProductBatch(), [], []
+            codes = {None: 0}
+    if ids:
+        yield _finish(batch, ids, created)
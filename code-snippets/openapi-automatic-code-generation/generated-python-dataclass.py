@@ -1,5 +1,5 @@
-# Python dataclass (simplified)
-@dataclass
+# Python dataclass (simplified), generated with dataclassSlots=true
+@dataclass(slots=True, frozen=True)
 class Product:
     id: str
     name: str
@@ -0,0 +1,124 @@
+"""Batched stock reservation: a whole basket, one validation pass, one ExceptionGroup.
+
+`place_order` checks one SKU and blocks on the warehouse for each shortage.
+`reserve_basket` checks every line first, notifies the warehouse about all
+shortages concurrently under one overall timeout, then raises every
+shortage together so the caller can handle them with `except*`. Each
+InsufficientStockError keeps its warehouse failure as `__cause__`, exactly
+as `raise ... from previous` would.
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+import time
+from typing import Mapping
+
+spec = importlib.util.spec_from_file_location(
+    "python_exceptions", os.path.join(os.path.dirname(os.path.abspath(__file__)), "python-exceptions.py")
+)
+python_exceptions = importlib.util.module_from_spec(spec)
+sys.modules["python_exceptions"] = python_exceptions
+spec.loader.exec_module(python_exceptions)
+InsufficientStockError = python_exceptions.InsufficientStockError
+
+
+class WarehouseTimeout(python_exceptions.AppError):
+    """The warehouse did not acknowledge a shortage in time."""
+
+    __slots__ = ()
+
+    sku: str
+    seconds: float
+
+    def __str__(self) -> str:
+        return f"Warehouse did not acknowledge SKU {self.sku} within {self.seconds}s."
+
+
+def notify_all(notify, skus: list[str], timeout: float, max_workers: int = 8) -> dict[str, Exception | None]:
+    """
+    Call notify(sku) for every SKU, at most `max_workers` at a time. Returns
+    each SKU's failure (None if acknowledged). Calls still running after
+    `timeout` seconds in total count as WarehouseTimeout; they are left on
+    daemon threads, so nothing, not even interpreter exit, waits for them.
+    """
+    failures: dict[str, Exception | None] = {}
+    slots = threading.BoundedSemaphore(max_workers)
+
+    def call(sku: str) -> None:
+        with slots:
+            try:
+                notify(sku)
+                failures[sku] = None
+            except Exception as e:
+                failures[sku] = e
+
+    threads = [threading.Thread(target=call, args=(sku,), daemon=True) for sku in skus]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    return {sku: failures.get(sku, WarehouseTimeout(sku, timeout)) for sku in skus}
+
+
+def reserve_basket(basket: Mapping[str, int], stock: dict[str, int], notify, timeout: float = 2.0) -> None:
+    """
+    Reserve every line or none: raise an ExceptionGroup of all shortages.
+    An unknown SKU is a shortage with nothing available; a quantity that is
+    not positive is a caller bug and raises ValueError before anything else.
+    """
+    invalid = [sku for sku, qty in basket.items() if qty <= 0]
+    if invalid:
+        raise ValueError(f"Basket quantities must be positive: {', '.join(invalid)}")
+
+    shortages = [
+        (sku, qty, stock.get(sku, 0)) for sku, qty in basket.items() if qty > stock.get(sku, 0)
+    ]
+    if not shortages:
+        for sku, qty in basket.items():
+            stock[sku] -= qty
+        return
+
+    failures = notify_all(notify, [sku for sku, _, _ in shortages], timeout)
+    errors = []
+    for sku, qty, available in shortages:
+        error = InsufficientStockError(sku, qty, available)
+        # Same as `raise error from previous`: also suppresses the implicit context
+        error.__cause__ = failures[sku]
+        errors.append(error)
+    raise ExceptionGroup(f"{len(errors)} of {len(basket)} basket lines short", errors)
+
+
+class StubWarehouse:
+    """Local stand-in: a fixed latency per call, some SKUs never answer in time."""
+
+    def __init__(self, latency: float = 0.2, unreachable: frozenset[str] = frozenset()) -> None:
+        self.latency = latency
+        self.unreachable = unreachable
+        self.notified: list[str] = []
+
+    def notify(self, sku: str) -> None:
+        time.sleep(5.0 if sku in self.unreachable else self.latency)
+        self.notified.append(sku)
+
+
+# Usage: handle the shortages together with except*
+if __name__ == "__main__":
+    stock = {f"SKU-{i}": 10 for i in range(50)}
+    basket = {f"SKU-{i}": 12 if i % 5 == 0 else 1 for i in range(50)}  # 10 lines short
+    warehouse = StubWarehouse(latency=0.2, unreachable=frozenset({"SKU-25"}))
+
+    start = time.perf_counter()
+    try:
+        reserve_basket(basket, stock, warehouse.notify, timeout=1.0)
+    except* InsufficientStockError as group:
+        for error in group.exceptions:
+            cause = f" (caused by: {error.__cause__})" if error.__cause__ else ""
+            print(f"{error}{cause}")
+    print(f"{len(warehouse.notified)} notifications in {time.perf_counter() - start:.2f}s "
+          f"(one at a time: {9 * 0.2 + 5.0:.1f}s)")
+    # 9 notifications in 1.00s (one at a time: 6.8s)
+
+    assert all(level == 10 for level in stock.values())  # Nothing was reserved
@@ -0,0 +1,101 @@
+"""Microbenchmark: construct, raise/catch and chain InsufficientStockError.
+
+Compares the args-backed, slotted class in python-exceptions.py with the
+previous `@dataclass` version, over the stock-check failure path where the
+exception is raised and caught but never rendered.
+"""
+
+import importlib.util
+import os
+import pickle
+import sys
+import timeit
+from dataclasses import dataclass
+
+spec = importlib.util.spec_from_file_location(
+    "python_exceptions", os.path.join(os.path.dirname(os.path.abspath(__file__)), "python-exceptions.py")
+)
+python_exceptions = importlib.util.module_from_spec(spec)
+sys.modules["python_exceptions"] = python_exceptions  # So pickle can find the classes
+spec.loader.exec_module(python_exceptions)
+
+NUMBER = 200_000
+
+
+class WarehouseTimeout(Exception):
+    pass
+
+
+class DataclassAppError(Exception):
+    """The previous AppError."""
+
+
+@dataclass
+class DataclassStockError(DataclassAppError):
+    """The previous InsufficientStockError."""
+
+    sku: str
+    requested: int
+    available: int
+
+    MESSAGE_FORMAT = "Insufficient stock for SKU {sku}: requested {requested}, only {available} available."
+
+    def __str__(self) -> str:
+        return self.MESSAGE_FORMAT.format(sku=self.sku, requested=self.requested, available=self.available)
+
+
+def scenarios(error_class):
+    previous = WarehouseTimeout("warehouse did not answer")
+
+    def construct():
+        error_class("SKU-1", 5, 3)
+
+    def raise_catch():
+        try:
+            raise error_class("SKU-1", 5, 3)
+        except Exception:
+            pass
+
+    def raise_chain_catch():
+        try:
+            raise error_class("SKU-1", 5, 3) from previous
+        except Exception:
+            pass
+
+    def raise_catch_read():
+        try:
+            raise error_class("SKU-1", 5, 3)
+        except Exception as error:
+            return error.available
+
+    return {
+        "construct": construct,
+        "raise/catch": raise_catch,
+        "raise from/catch": raise_chain_catch,
+        "raise/catch/read attr": raise_catch_read,
+    }
+
+
+def ns_per_call(func):
+    return min(timeit.repeat(func, number=NUMBER, repeat=5)) / NUMBER * 1e9
+
+
+def main():
+    after = python_exceptions.InsufficientStockError
+    for error_class in (DataclassStockError, after):
+        error = error_class("SKU-1", 5, 3)
+        assert str(error) == "Insufficient stock for SKU SKU-1: requested 5, only 3 available."
+    restored = pickle.loads(pickle.dumps(after("SKU-1", 5, 3)))
+    assert (restored.sku, restored.requested, restored.available) == ("SKU-1", 5, 3)
+
+    before_runs = scenarios(DataclassStockError)
+    after_runs = scenarios(after)
+    print(f"{'':<24} {'dataclass ns':>13} {'slotted ns':>11} {'speedup':>8}")
+    for name in before_runs:
+        before_ns = ns_per_call(before_runs[name])
+        after_ns = ns_per_call(after_runs[name])
+        print(f"{name:<24} {before_ns:>13.0f} {after_ns:>11.0f} {before_ns / after_ns:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
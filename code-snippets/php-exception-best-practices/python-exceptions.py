@@ -7,17 +7,67 @@
   deliberately hiding a noisy cause (rarely the right call).
 """
 
-from dataclasses import dataclass
+import inspect
+import typing
+from typing import ClassVar
 
 
 class AppError(Exception):
-    """Root of the project's exception tree, catch-all marker."""
+    """
+    Root of the project's exception tree, catch-all marker.
+
+    Subclasses declare their data as annotations (ClassVar and annotations
+    with a default stay plain class attributes). The values live only in
+    `self.args`, where BaseException's C constructor already puts them, and
+    are read back through read-only properties: `__init__` only folds
+    keyword arguments into `args` and checks that every field was given,
+    nothing is copied into the instance `__dict__` BaseException keeps, and
+    pickling (process pools) works unchanged because the exception is
+    rebuilt from `args`. Subclasses must not also be `@dataclass`.
+    """
+
+    __slots__ = ()
+    _fields: tuple[str, ...] = ()
+
+    def __init__(self, *args, **kwargs) -> None:
+        fields = self._fields
+        if kwargs:
+            unexpected = kwargs.keys() - set(fields[len(args):])
+            if unexpected:
+                raise TypeError(f"{type(self).__name__}() got unexpected or repeated arguments: "
+                                f"{', '.join(sorted(unexpected))}")
+            args += tuple(kwargs[name] for name in fields[len(args):] if name in kwargs)
+            self.args = args
+        # Fail at the raise site, not with an IndexError when a field is read
+        if fields and len(args) != len(fields):
+            raise TypeError(
+                f"{type(self).__name__}() takes {len(fields)} arguments "
+                f"({', '.join(fields)}), {len(args)} given"
+            )
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        own = tuple(
+            name for name, annotation in inspect.get_annotations(cls).items()
+            if name not in vars(cls) and not _is_class_var(annotation)
+        )
+        cls._fields = cls._fields + own
+        for index, name in enumerate(cls._fields):
+            if name in own:
+                setattr(cls, name, property(lambda self, index=index: self.args[index]))
+
+
+def _is_class_var(annotation) -> bool:
+    if isinstance(annotation, str):  # from __future__ import annotations
+        return annotation.startswith(("ClassVar", "typing.ClassVar"))
+    return annotation is ClassVar or typing.get_origin(annotation) is ClassVar
 
 
-@dataclass
 class InsufficientStockError(AppError):
     """Data on attributes; message is synthesised in __str__."""
 
+    __slots__ = ()
+
     sku: str
     requested: int
     available: int
@@ -25,6 +75,7 @@ class InsufficientStockError(AppError):
     MESSAGE_FORMAT = "Insufficient stock for SKU {sku}: requested {requested}, only {available} available."
 
     def __str__(self) -> str:
+        # Only formatted when rendered, not on every raise
         return self.MESSAGE_FORMAT.format(
             sku=self.sku,
             requested=self.requested,
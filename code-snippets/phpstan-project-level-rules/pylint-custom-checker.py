@@ -3,16 +3,37 @@ Pylint custom checker: query-in-loop
 
 Detects database query execution inside loops in Python code.
 This is a common performance anti-pattern that leads to N+1 query problems.
+
+Loops include `for`, `async for`, `while` and comprehensions (list, set,
+dict and generator expressions). Calls to functions in the same module that
+transitively run a query are flagged where they are called inside a loop.
+
+The receiver of a query method is resolved with astroid inference and matched
+against a configurable allow-list of ORM classes; variable-name matching is
+only used when inference cannot determine the type.
+
+Each finding carries an estimated query count: the product of the estimated
+iterations of every enclosing loop (and of loops inside a called helper).
+With `--query-in-loop-report=path.json` the top offenders are written as a
+JSON report, most expensive first.
 """
 
-from typing import TYPE_CHECKING
+import json
+from typing import TYPE_CHECKING, Optional, Union
 
-from astroid import nodes
+from astroid import bases, nodes
+from astroid.util import Uninferable
 from pylint.checkers import BaseChecker
+from pylint.checkers.utils import safe_infer
 
 if TYPE_CHECKING:
     from pylint.lint import PyLinter
 
+Loop = Union[nodes.For, nodes.While, nodes.ComprehensionScope]
+
+# Estimates saturate here; a recursive helper would otherwise grow forever
+MAX_ESTIMATE = 10**9
+
 
 class QueryInLoopChecker(BaseChecker):
     """Checker for detecting database queries inside loops."""
@@ -26,8 +47,70 @@ class QueryInLoopChecker(BaseChecker):
             "Refactor to batch queries outside the loop using WHERE IN clauses "
             "or bulk operations.",
         ),
+        "W9002": (
+            "Function %r runs a database query and is called inside a loop (%s). "
+            "This creates N+1 query problems and severe performance degradation.",
+            "query-in-loop-via-call",
+            "Pass the loop's keys to the helper and batch the query inside it, "
+            "or fetch the rows before the loop.",
+        ),
     }
 
+    options = (
+        (
+            "orm-base-classes",
+            {
+                "default": ("Session", "Query", "Cursor", "Manager", "QuerySet"),
+                "type": "csv",
+                "metavar": "<class names>",
+                "help": "Classes whose instances (or subclass instances) are "
+                "database receivers. Bare names match any module; dotted names "
+                "match the fully qualified name.",
+            },
+        ),
+        (
+            "assumed-iterations",
+            {
+                "default": 100,
+                "type": "int",
+                "metavar": "<n>",
+                "help": "Iterations assumed for a loop whose size is unknown.",
+            },
+        ),
+        (
+            "assumed-result-rows",
+            {
+                "default": 1000,
+                "type": "int",
+                "metavar": "<n>",
+                "help": "Iterations assumed for a loop over a query result "
+                "(`.all()`, `fetchall()`).",
+            },
+        ),
+        (
+            "query-in-loop-report",
+            {
+                "default": "",
+                "type": "string",
+                "metavar": "<file>",
+                "help": "Write the top findings, ranked by estimated query "
+                "count, to this JSON file.",
+            },
+        ),
+        (
+            "query-in-loop-report-top",
+            {
+                "default": 20,
+                "type": "int",
+                "metavar": "<n>",
+                "help": "Number of findings in the JSON report.",
+            },
+        ),
+    )
+
+    # Methods whose result is a full query result set
+    RESULT_METHODS = {"all", "fetchall"}
+
     # Query method patterns commonly used in Python ORMs
     QUERY_METHODS = {
         "execute",
@@ -47,6 +130,40 @@ class QueryInLoopChecker(BaseChecker):
     def __init__(self, linter: "PyLinter") -> None:
         super().__init__(linter)
         self._loop_depth = 0
+        # Querying function -> estimated queries per call
+        self._querying_functions: dict[nodes.FunctionDef, int] = {}
+        self._findings: list[dict[str, object]] = []
+        self._orm_base_classes: frozenset[str] = frozenset()
+        # Inference is the expensive part: each receiver node and each class
+        # is resolved at most once, even though the call-graph pass and the
+        # visitor both ask about the same calls
+        self._receiver_cache: dict[nodes.NodeNG, bool] = {}
+        self._class_cache: dict[nodes.ClassDef, bool] = {}
+
+    def open(self) -> None:
+        """Read configuration once per run."""
+        self._orm_base_classes = frozenset(self.linter.config.orm_base_classes)
+        self._findings = []
+
+    def close(self) -> None:
+        """Write the ranked report of the most expensive findings."""
+        report_path = self.linter.config.query_in_loop_report
+        if not report_path:
+            return
+
+        ranked = sorted(
+            self._findings,
+            key=lambda f: (-f["estimated_queries"], f["path"], f["line"]),
+        )
+        top = ranked[: self.linter.config.query_in_loop_report_top]
+        with open(report_path, "w", encoding="utf-8") as report:
+            json.dump(top, report, indent=2)
+
+    def visit_module(self, node: nodes.Module) -> None:
+        """Build the module's call graph before any call is checked."""
+        self._receiver_cache.clear()
+        self._class_cache.clear()
+        self._querying_functions = self._find_querying_functions(node)
 
     def visit_for(self, node: nodes.For) -> None:
         """Track entering a for loop."""
@@ -56,6 +173,10 @@ class QueryInLoopChecker(BaseChecker):
         """Track exiting a for loop."""
         self._loop_depth -= 1
 
+    # `async for` is its own node class, so pylint dispatches it separately
+    visit_asyncfor = visit_for
+    leave_asyncfor = leave_for
+
     def visit_while(self, node: nodes.While) -> None:
         """Track entering a while loop."""
         self._loop_depth += 1
@@ -64,31 +185,125 @@ class QueryInLoopChecker(BaseChecker):
         """Track exiting a while loop."""
         self._loop_depth -= 1
 
+    def visit_listcomp(self, node: nodes.ListComp) -> None:
+        """Track entering a comprehension (list, set, dict or generator)."""
+        self._loop_depth += 1
+
+    def leave_listcomp(self, node: nodes.ListComp) -> None:
+        """Track exiting a comprehension."""
+        self._loop_depth -= 1
+
+    visit_setcomp = visit_dictcomp = visit_generatorexp = visit_listcomp
+    leave_setcomp = leave_dictcomp = leave_generatorexp = leave_listcomp
+
     def visit_call(self, node: nodes.Call) -> None:
         """Check for database query calls inside loops."""
         # Only check if we're inside a loop
         if self._loop_depth == 0:
             return
 
-        # Check if this is a method call
-        if not isinstance(node.func, nodes.Attribute):
+        loops = self._enclosing_loops(node)
+        if not loops:
             return
 
-        method_name = node.func.attrname
+        if self._is_query_call(node):
+            estimate = self._loop_multiplicity(node, loops)
+            self._report(node, "query-in-loop", None, loops, estimate)
+            return
+
+        helper = self._resolve_local_function(node)
+        if helper is not None and helper in self._querying_functions:
+            estimate = min(
+                self._loop_multiplicity(node, loops) * self._querying_functions[helper],
+                MAX_ESTIMATE,
+            )
+            self._report(node, "query-in-loop-via-call", helper.name, loops, estimate)
+
+    def _report(
+        self,
+        node: nodes.Call,
+        symbol: str,
+        helper: Optional[str],
+        loops: list[Loop],
+        estimate: int,
+    ) -> None:
+        """Add the message and keep the finding for the ranked report."""
+        loop_type = self._get_loop_type(node, loops)
+        description = f"{loop_type}, depth {len(loops)}, ~{estimate} queries"
+        args = (description,) if helper is None else (helper, description)
+        self.add_message(symbol, node=node, args=args)
+
+        self._findings.append(
+            {
+                "path": node.root().file,
+                "line": node.lineno,
+                "column": node.col_offset,
+                "symbol": symbol,
+                "call": node.as_string(),
+                "loop": loop_type,
+                "depth": len(loops),
+                "estimated_queries": estimate,
+            }
+        )
+
+    def _is_query_call(self, node: nodes.Call) -> bool:
+        """Check whether a call is a query method on a database object."""
+        # Check if this is a method call
+        if not isinstance(node.func, nodes.Attribute):
+            return False
 
         # Check if it's a query method
-        if method_name not in self.QUERY_METHODS:
-            return
+        if node.func.attrname not in self.QUERY_METHODS:
+            return False
 
         # Try to determine if the object is database-related
-        if self._is_database_object(node.func.expr):
-            loop_type = self._get_loop_type(node)
-            self.add_message("query-in-loop", node=node, args=(loop_type,))
+        return self._is_database_object(node.func.expr)
 
     def _is_database_object(self, node: nodes.NodeNG) -> bool:
+        """Determine if an object is database-related, caching per node."""
+        cached = self._receiver_cache.get(node)
+        if cached is None:
+            cached = self._receiver_cache[node] = self._classify_receiver(node)
+        return cached
+
+    def _classify_receiver(self, node: nodes.NodeNG) -> bool:
+        """
+        Resolve the receiver's class with astroid inference. A receiver whose
+        type is known but not an ORM class (a dict named `query_params`) is not
+        a database object; only an unknown type falls back to the name
+        heuristic.
+        """
+        inferred = safe_infer(node)
+
+        if inferred is None or inferred is Uninferable:
+            return self._matches_db_name(node)
+
+        if isinstance(inferred, bases.Instance) and not isinstance(
+            inferred, nodes.Const
+        ):
+            return self._is_orm_class(inferred._proxied)
+
+        if isinstance(inferred, nodes.ClassDef):
+            return self._is_orm_class(inferred)
+
+        return False
+
+    def _is_orm_class(self, class_node: nodes.ClassDef) -> bool:
+        """Check a class or any of its ancestors is in the ORM allow-list."""
+        cached = self._class_cache.get(class_node)
+        if cached is None:
+            cached = self._class_cache[class_node] = any(
+                klass.name in self._orm_base_classes
+                or klass.qname() in self._orm_base_classes
+                for klass in (class_node, *class_node.ancestors())
+            )
+        return cached
+
+    @staticmethod
+    def _matches_db_name(node: nodes.NodeNG) -> bool:
         """
         Heuristic to determine if an object is database-related.
-        Checks variable names and types for common patterns.
+        Checks variable names for common patterns.
         """
         # Check for common database object names
         db_patterns = ["db", "session", "connection", "conn", "cursor", "query"]
@@ -103,16 +318,174 @@ class QueryInLoopChecker(BaseChecker):
 
         return False
 
-    def _get_loop_type(self, node: nodes.NodeNG) -> str:
-        """Determine the type of loop containing the query."""
-        parent = node.parent
-        while parent:
-            if isinstance(parent, nodes.For):
-                return "for loop"
-            if isinstance(parent, nodes.While):
-                return "while loop"
-            parent = parent.parent
-        return "loop"
+    @staticmethod
+    def _enclosing_loops(node: nodes.NodeNG) -> list[Loop]:
+        """
+        List the loops, innermost first, that run `node` once per iteration,
+        up to the enclosing function.
+
+        The iterable of a `for` loop or of a comprehension's first generator is
+        evaluated once, before iteration starts, so `for row in
+        session.query(User).all()` is not an N+1 on its own.
+        """
+        loops: list[Loop] = []
+        child, parent = node, node.parent
+        while parent is not None:
+            if isinstance(parent, (nodes.FunctionDef, nodes.Lambda, nodes.ClassDef)):
+                break
+            if isinstance(parent, nodes.Comprehension) and child is parent.iter:
+                scope = parent.parent
+                if parent is scope.generators[0]:
+                    # Evaluated outside the comprehension: skip past it
+                    child, parent = scope, scope.parent
+                    continue
+            if isinstance(parent, nodes.For) and child is parent.iter:
+                child, parent = parent, parent.parent
+                continue
+            if isinstance(parent, (nodes.For, nodes.While, nodes.ComprehensionScope)):
+                loops.append(parent)
+            child, parent = parent, parent.parent
+        return loops
+
+    def _loop_multiplicity(self, node: nodes.NodeNG, loops: list[Loop]) -> int:
+        """Estimate how many times `node` runs per call of its function."""
+        total = 1
+        for loop in loops:
+            if isinstance(loop, nodes.ComprehensionScope):
+                for generator in loop.generators:
+                    if generator.iter.parent_of(node):
+                        break  # This and later generators have not started yet
+                    total *= self._estimate_iterations(generator.iter)
+            elif isinstance(loop, nodes.For):
+                total *= self._estimate_iterations(loop.iter)
+            else:
+                total *= self.linter.config.assumed_iterations
+        return min(total, MAX_ESTIMATE)
+
+    def _estimate_iterations(self, iterable: nodes.NodeNG) -> int:
+        """
+        Estimate a loop's iteration count from its iterable: `range()` with
+        literal arguments and literal collections are exact, a query result
+        (`.all()`, `fetchall()`, or a name assigned from one) uses the assumed
+        result size, anything else the assumed iteration count.
+        """
+        if isinstance(iterable, nodes.Name):
+            _, assignments = iterable.lookup(iterable.name)
+            if len(assignments) == 1 and isinstance(assignments[0].parent, nodes.Assign):
+                iterable = assignments[0].parent.value
+
+        if isinstance(iterable, (nodes.List, nodes.Tuple, nodes.Set)):
+            return len(iterable.elts)
+
+        if isinstance(iterable, nodes.Call):
+            func = iterable.func
+            if (
+                isinstance(func, nodes.Name)
+                and func.name == "range"
+                and iterable.args
+                and all(
+                    isinstance(arg, nodes.Const) and isinstance(arg.value, int)
+                    for arg in iterable.args
+                )
+            ):
+                try:
+                    return len(range(*(arg.value for arg in iterable.args)))
+                except (TypeError, ValueError, OverflowError):
+                    # range(0, 10, 0), too many arguments, or a length past sys.maxsize
+                    return self.linter.config.assumed_iterations
+            if isinstance(func, nodes.Attribute) and (
+                func.attrname in self.RESULT_METHODS or self._is_query_call(iterable)
+            ):
+                return self.linter.config.assumed_result_rows
+
+        return self.linter.config.assumed_iterations
+
+    def _find_querying_functions(
+        self, module: nodes.Module
+    ) -> dict[nodes.FunctionDef, int]:
+        """
+        Find every function in the module that runs a query, directly or by
+        calling another function in the module that does, with the estimated
+        queries per call (fixed point over the intra-module call graph).
+        """
+        calls: dict[nodes.FunctionDef, list[tuple[nodes.FunctionDef, int]]] = {}
+        querying: dict[nodes.FunctionDef, int] = {}
+
+        for function in module.nodes_of_class(nodes.FunctionDef):
+            calls[function] = []
+            for call in function.nodes_of_class(nodes.Call):
+                if call.frame() is not function:
+                    continue  # Belongs to a nested function or lambda
+                multiplicity = self._loop_multiplicity(call, self._enclosing_loops(call))
+                if self._is_query_call(call):
+                    querying[function] = max(querying.get(function, 0), multiplicity)
+                callee = self._resolve_local_function(call)
+                if callee is not None:
+                    calls[function].append((callee, multiplicity))
+
+        changed = True
+        while changed:
+            changed = False
+            for function, callees in calls.items():
+                for callee, multiplicity in callees:
+                    if callee not in querying:
+                        continue
+                    estimate = min(querying[callee] * multiplicity, MAX_ESTIMATE)
+                    if estimate > querying.get(function, 0):
+                        querying[function] = estimate
+                        changed = True
+
+        return querying
+
+    @staticmethod
+    def _resolve_local_function(node: nodes.Call) -> Optional[nodes.FunctionDef]:
+        """
+        Resolve `helper(...)` and `self.helper(...)` to a function defined in
+        the same module, or None if the callee lives elsewhere.
+        """
+        func = node.func
+
+        if isinstance(func, nodes.Name):
+            _, assignments = func.lookup(func.name)
+            if len(assignments) == 1 and isinstance(assignments[0], nodes.FunctionDef):
+                return assignments[0]
+            return None
+
+        if (
+            isinstance(func, nodes.Attribute)
+            and isinstance(func.expr, nodes.Name)
+            and func.expr.name in ("self", "cls")
+        ):
+            class_node = node.frame().parent
+            if isinstance(class_node, nodes.ClassDef):
+                methods = class_node.locals.get(func.attrname, [])
+                if len(methods) == 1 and isinstance(methods[0], nodes.FunctionDef):
+                    return methods[0]
+
+        return None
+
+    @classmethod
+    def _get_loop_type(
+        cls, node: nodes.NodeNG, loops: Optional[list[Loop]] = None
+    ) -> str:
+        """
+        Name the innermost loop from `_enclosing_loops`, so the description
+        always agrees with the depth and estimate reported alongside it.
+        """
+        if loops is None:
+            loops = cls._enclosing_loops(node)
+        if not loops:
+            return "loop"
+        loop = loops[0]
+        if isinstance(loop, nodes.AsyncFor):
+            return "async for loop"
+        if isinstance(loop, nodes.For):
+            return "for loop"
+        if isinstance(loop, nodes.While):
+            return "while loop"
+        if isinstance(loop, nodes.GeneratorExp):
+            return "generator expression"
+        return "comprehension"
 
 
 def register(linter: "PyLinter") -> None:
@@ -0,0 +1,186 @@
+"""
+Benchmark and accuracy suite for the query-in-loop checker
+
+Throughput: generates synthetic modules of increasing size and loop nesting,
+walks each with QueryInLoopChecker (pylint-custom-checker.py, saved as
+`query_in_loop.py`) and with an empty checker as a baseline, and reports
+the checker's overhead per AST node and the peak memory of the walk.
+
+Accuracy: runs the checker over query-in-loop-corpus.py (next to this
+script) and compares its findings with the `# [symbol]` markers to report
+precision and recall.
+
+Run it on every change to the heuristics and keep the JSON output alongside
+the change:
+
+    python query-in-loop-benchmark.py --json bench.json
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Optional
+
+import astroid
+from astroid import nodes
+from pylint.checkers import BaseChecker
+from pylint.lint import PyLinter
+from pylint.utils.ast_walker import ASTWalker
+
+from query_in_loop import QueryInLoopChecker
+
+SIZES = (100, 500, 2_000)
+DEPTHS = (1, 2, 3)
+REPEATS = 3
+CORPUS = Path(__file__).with_name("query-in-loop-corpus.py")
+MARKER = re.compile(r"#\s*\[([a-z-]+)\]\s*$")
+
+
+class EmptyChecker(BaseChecker):
+    """Baseline: the walk with no checker work."""
+
+    name = "empty"
+
+
+class CollectingChecker(QueryInLoopChecker):
+    """The real checker, with messages collected instead of reported."""
+
+    def __init__(self, linter: PyLinter) -> None:
+        super().__init__(linter)
+        self.found: list[tuple[int, str]] = []
+
+    def add_message(
+        self,
+        msgid: str,
+        line: Optional[int] = None,
+        node: Optional[nodes.NodeNG] = None,
+        args: Any = None,
+        **kwargs: Any,
+    ) -> None:
+        self.found.append((node.lineno, msgid))
+
+
+def synthetic_module(functions: int, depth: int) -> str:
+    """
+    `functions` functions, each with `depth` nested loops around one query,
+    one non-query method call and one plain call.
+    """
+    lines = []
+    for index in range(functions):
+        lines.append(f"def handler_{index}(session, rows, items):")
+        indent = "    "
+        for level in range(depth):
+            lines.append(f"{indent}for x{level} in rows:")
+            indent += "    "
+        lines.append(f"{indent}items.append(x0)")
+        lines.append(f"{indent}session.get('Order', x0)")
+        lines.append(f"{indent}print(x0)")
+    return "\n".join(lines) + "\n"
+
+
+def make_walker(checker_class: type[BaseChecker]) -> tuple[ASTWalker, BaseChecker]:
+    linter = PyLinter()
+    checker = checker_class(linter)
+    linter.register_checker(checker)
+    checker.open()
+    walker = ASTWalker(linter)
+    walker.add_checker(checker)
+    return walker, checker
+
+
+def time_walk(checker_class: type[BaseChecker], source: str) -> tuple[float, int]:
+    """Best-of-N walk time, and the peak traced memory of one walk."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        # A fresh tree each time: astroid caches inference on the nodes
+        module = astroid.parse(source)
+        walker, _ = make_walker(checker_class)
+        start = time.perf_counter()
+        walker.walk(module)
+        best = min(best, time.perf_counter() - start)
+
+    module = astroid.parse(source)
+    walker, _ = make_walker(checker_class)
+    tracemalloc.start()
+    walker.walk(module)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def throughput() -> list[dict[str, Any]]:
+    results = []
+    for depth in DEPTHS:
+        for size in SIZES:
+            source = synthetic_module(size, depth)
+            node_count = sum(1 for _ in astroid.parse(source).nodes_of_class(nodes.NodeNG))
+            baseline, _ = time_walk(EmptyChecker, source)
+            elapsed, peak = time_walk(CollectingChecker, source)
+            results.append(
+                {
+                    "functions": size,
+                    "depth": depth,
+                    "nodes": node_count,
+                    "seconds": round(elapsed, 4),
+                    "overhead_ns_per_node": round((elapsed - baseline) / node_count * 1e9),
+                    "peak_kib": peak // 1024,
+                }
+            )
+    return results
+
+
+def accuracy(corpus: Path) -> dict[str, Any]:
+    source = corpus.read_text(encoding="utf-8")
+    expected = {
+        (number, match.group(1))
+        for number, line in enumerate(source.splitlines(), start=1)
+        if (match := MARKER.search(line))
+    }
+
+    walker, checker = make_walker(CollectingChecker)
+    walker.walk(astroid.parse(source, path=str(corpus)))
+    found = set(checker.found)
+
+    true_positives = len(found & expected)
+    return {
+        "true_positives": true_positives,
+        "false_positives": sorted(found - expected),
+        "false_negatives": sorted(expected - found),
+        "precision": round(true_positives / len(found), 3) if found else 1.0,
+        "recall": round(true_positives / len(expected), 3) if expected else 1.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", type=Path, default=CORPUS)
+    parser.add_argument("--json", type=Path, help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = {"throughput": throughput(), "accuracy": accuracy(args.corpus)}
+
+    print(f"{'functions':>9} {'depth':>5} {'nodes':>8} {'seconds':>8} {'ns/node':>8} {'peak KiB':>9}")
+    for row in results["throughput"]:
+        print(
+            f"{row['functions']:>9} {row['depth']:>5} {row['nodes']:>8} "
+            f"{row['seconds']:>8.4f} {row['overhead_ns_per_node']:>8} {row['peak_kib']:>9}"
+        )
+
+    score = results["accuracy"]
+    print(f"\nprecision {score['precision']}  recall {score['recall']}")
+    for line, symbol in score["false_positives"]:
+        print(f"  false positive: line {line} ({symbol})")
+    for line, symbol in score["false_negatives"]:
+        print(f"  false negative: line {line} ({symbol})")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Labelled corpus for the query-in-loop checker
+
+Lines that should be reported end with the expected symbol in brackets, the
+same marker pylint's own functional tests use. Any other line the checker
+reports is a false positive; a marked line it misses is a false negative.
+Known misses and false alarms are kept in the corpus so the benchmark's
+precision and recall show them rather than hide them.
+"""
+# pylint: disable=missing-function-docstring,unused-variable,invalid-name
+
+
+class Session:
+    def get(self, model, key): ...
+    def query(self, model): ...
+    def execute(self, sql, *params): ...
+
+
+class Order: ...
+
+
+# --- True positives -------------------------------------------------------
+
+
+def plain_for(session, ids):
+    for i in ids:
+        session.get(Order, i)  # [query-in-loop]
+
+
+def nested_for(session, ids, days):
+    for day in days:
+        for i in ids:
+            session.execute("SELECT 1", day, i)  # [query-in-loop]
+
+
+def while_loop(cursor):
+    while True:
+        cursor.execute("SELECT 1")  # [query-in-loop]
+
+
+def comprehensions(session, ids):
+    as_list = [session.get(Order, i) for i in ids]  # [query-in-loop]
+    as_dict = {i: session.get(Order, i) for i in ids}  # [query-in-loop]
+    as_gen = list(session.get(Order, i) for i in ids)  # [query-in-loop]
+
+
+async def async_loop(session, ids):
+    async for i in ids:
+        await session.execute("SELECT 1", i)  # [query-in-loop]
+
+
+def inferred_receiver(ids):
+    s = Session()
+    for i in ids:
+        s.get(Order, i)  # [query-in-loop]
+
+
+def load_one(session, key):
+    return session.get(Order, key)
+
+
+def via_helper(session, ids):
+    for i in ids:
+        load_one(session, i)  # [query-in-loop-via-call]
+
+
+class Repository:
+    def __init__(self):
+        self.s = Session()
+
+    def fetch(self, key):
+        return self.s.get(Order, key)
+
+    def fetch_all(self, keys):
+        return [self.fetch(key) for key in keys]  # [query-in-loop-via-call]
+
+
+# --- True negatives -------------------------------------------------------
+
+
+def iterable_is_evaluated_once(session):
+    for row in session.query(Order).all():
+        print(row)
+    rows = [row for row in session.query(Order).all()]
+
+
+def dict_named_like_a_query(ids):
+    query_params = {}
+    for i in ids:
+        query_params.get(i)
+
+
+def function_defined_in_loop(session, ids):
+    for i in ids:
+        def later():
+            return session.get(Order, i)
+
+
+def batched(session, ids):
+    rows = session.query(Order).filter(Order.id.in_(ids)).all()
+    for row in rows:
+        print(row)
+
+
+# --- Known false negatives --------------------------------------------------
+
+
+def dynamic_dispatch(session, ids):
+    fetch = getattr(session, "get")
+    for i in ids:
+        fetch(Order, i)  # [query-in-loop]
+
+
+# --- Known false positives --------------------------------------------------
+
+
+def config_named_like_a_database(db_settings, keys):
+    # Unknown type, so only the name heuristic applies
+    for key in keys:
+        db_settings.get(key)
@@ -0,0 +1,222 @@
+"""
+Auto-fix suggestions for the query-in-loop checker
+
+Rewrites the common N+1 shape
+
+    for order_id in order_ids:
+        order = session.get(Order, order_id)
+
+into one bulk fetch hoisted above the loop and a dict lookup inside it:
+
+    order_by_id = {
+        order.id: order
+        for order in session.query(Order).filter(Order.id.in_(order_ids))
+    }
+    for order_id in order_ids:
+        order = order_by_id.get(order_id)
+
+`dict.get` returns None for a missing key, like `session.get`, so the loop
+body sees the same values. Only calls the checker (pylint-custom-checker.py,
+saved as `query_in_loop.py`) flags, in loops over a plain name or attribute,
+are rewritten, since the iterable is evaluated twice. The result is printed
+as a unified diff and is verified first: it must re-parse, and re-running the
+checker must report one fewer finding per rewrite.
+
+Usage: python query-in-loop-fixer.py app/reports.py [--key-attr id] > fix.diff
+"""
+
+import argparse
+import ast
+import difflib
+import sys
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+from pylint.lint import Run
+from pylint.reporters import CollectingReporter
+
+CHECKER_MODULE = "query_in_loop"
+
+
+@dataclass(frozen=True)
+class Rewrite:
+    """One loop to fix, located by 1-based lines and 0-based columns."""
+
+    loop_line: int
+    indent: str
+    call_line: int
+    call_start: int
+    call_end: int
+    lookup: str
+    bulk_fetch: str
+
+
+def find_rewrites(
+    source: str, key_attr: str, flagged: Optional[set[int]] = None
+) -> list[Rewrite]:
+    """
+    Find `for key in keys: var = receiver.get(Model, key)` loops, limited to
+    calls on `flagged` lines when given.
+
+    Loops nested inside another loop (even through a function defined in its
+    body) are left alone: their bulk fetch would be hoisted into the outer
+    loop body and still run once per outer iteration.
+    """
+    tree = ast.parse(source)
+    lines = source.splitlines()
+    taken = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    rewrites = []
+
+    for loop in _outermost_loops(tree):
+        if not (
+            isinstance(loop, ast.For)
+            and isinstance(loop.target, ast.Name)
+            and isinstance(loop.iter, (ast.Name, ast.Attribute))
+        ):
+            continue
+
+        for statement in loop.body:
+            if not (
+                isinstance(statement, ast.Assign)
+                and len(statement.targets) == 1
+                and isinstance(statement.targets[0], ast.Name)
+            ):
+                continue
+            call = statement.value
+            if not (
+                isinstance(call, ast.Call)
+                and isinstance(call.func, ast.Attribute)
+                and call.func.attr == "get"
+                and len(call.args) == 2
+                and not call.keywords
+                and isinstance(call.args[1], ast.Name)
+                and call.args[1].id == loop.target.id
+                and call.lineno == call.end_lineno
+                and (flagged is None or call.lineno in flagged)
+            ):
+                continue
+
+            var = statement.targets[0].id
+            mapping = f"{var}_by_{key_attr}"
+            while mapping in taken:
+                mapping += "_"
+            taken.add(mapping)
+
+            receiver = ast.unparse(call.func.value)
+            model = ast.unparse(call.args[0])
+            keys = ast.unparse(loop.iter)
+            indent = lines[loop.lineno - 1][: loop.col_offset]
+            rewrites.append(
+                Rewrite(
+                    loop_line=loop.lineno,
+                    indent=indent,
+                    call_line=call.lineno,
+                    call_start=call.col_offset,
+                    call_end=call.end_col_offset,
+                    lookup=f"{mapping}.get({loop.target.id})",
+                    bulk_fetch=(
+                        f"{indent}{mapping} = {{\n"
+                        f"{indent}    {var}.{key_attr}: {var}\n"
+                        f"{indent}    for {var} in {receiver}.query({model})"
+                        f".filter({model}.{key_attr}.in_({keys}))\n"
+                        f"{indent}}}\n"
+                    ),
+                )
+            )
+            break  # One bulk fetch per loop
+
+    return rewrites
+
+
+def _outermost_loops(node: ast.AST) -> Iterator[ast.AST]:
+    """Loops with no enclosing loop, in source order."""
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.For, ast.AsyncFor, ast.While)):
+            yield child
+        else:
+            yield from _outermost_loops(child)
+
+
+def apply_rewrites(source: str, rewrites: list[Rewrite]) -> str:
+    """
+    Replace the calls in place first, which moves no lines, then insert the
+    bulk fetches bottom-up so every insertion point is still valid.
+    """
+    lines = source.splitlines(keepends=True)
+    for rewrite in sorted(rewrites, key=lambda r: (r.call_line, r.call_start), reverse=True):
+        # ast columns are UTF-8 byte offsets
+        line = lines[rewrite.call_line - 1].encode()
+        lines[rewrite.call_line - 1] = (
+            line[: rewrite.call_start] + rewrite.lookup.encode() + line[rewrite.call_end :]
+        ).decode()
+    for rewrite in sorted(rewrites, key=lambda r: r.loop_line, reverse=True):
+        lines.insert(rewrite.loop_line - 1, rewrite.bulk_fetch)
+    return "".join(lines)
+
+
+def flagged_lines(source: str) -> list[int]:
+    """Run the checker on a source string and return its findings' lines."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "candidate.py"
+        path.write_text(source, encoding="utf-8")
+        reporter = CollectingReporter()
+        Run(
+            [
+                f"--load-plugins={CHECKER_MODULE}",
+                "--disable=all",
+                "--enable=query-in-loop,query-in-loop-via-call",
+                str(path),
+            ],
+            reporter=reporter,
+            exit=False,
+        )
+        return [message.line for message in reporter.messages]
+
+
+def fix(path: Path, key_attr: str) -> str:
+    """Return a verified unified diff for the file, or '' if nothing applies."""
+    source = path.read_text(encoding="utf-8")
+    before = flagged_lines(source)
+    rewrites = find_rewrites(source, key_attr, set(before))
+    if not rewrites:
+        return ""
+
+    fixed = apply_rewrites(source, rewrites)
+    ast.parse(fixed)  # Raises SyntaxError rather than emitting a broken diff
+
+    before, after = len(before), len(flagged_lines(fixed))
+    if after > before - len(rewrites):
+        raise RuntimeError(
+            f"{path}: rewrite left {after} findings, expected at most "
+            f"{before - len(rewrites)}; not emitting a diff"
+        )
+
+    return "".join(
+        difflib.unified_diff(
+            source.splitlines(keepends=True),
+            fixed.splitlines(keepends=True),
+            fromfile=f"a/{path}",
+            tofile=f"b/{path}",
+        )
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("paths", type=Path, nargs="+")
+    parser.add_argument("--key-attr", default="id", help="Primary key attribute")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        try:
+            sys.stdout.write(fix(path, args.key_attr))
+        except (SyntaxError, RuntimeError) as error:
+            # One bad file must not stop the diffs for the rest
+            print(f"{path}: skipped: {error}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
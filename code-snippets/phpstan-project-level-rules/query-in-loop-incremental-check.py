@@ -0,0 +1,113 @@
+"""
+Check for query-in-loop-incremental.py: cold, warm and edited runs
+
+Builds a throwaway project and runs it by absolute root from the project's
+parent directory, where pylint's message paths are relative and the
+runner's are not. A second project covers identical package files whose
+relative imports differ, and a module with a syntax error. Installs pylint-custom-checker.py as `query_in_loop` on
+the plugin path, and asserts that a warm run replays the same findings from
+the cache instead of reporting nothing.
+
+Usage: python query-in-loop-incremental-check.py
+"""
+
+import contextlib
+import importlib.util
+import io
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+N_PLUS_ONE = '''
+def report(session, ids):
+    for i in ids:
+        session.get("Order", i)
+'''
+
+CLEAN = '''
+def report(session, ids):
+    return session.query("Order").filter(ids)
+'''
+
+
+def load_runner():
+    spec = importlib.util.spec_from_file_location(
+        "query_in_loop_incremental", HERE / "query-in-loop-incremental.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_quietly(runner, root: Path, cache: Path) -> tuple[list, str]:
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        findings = runner.run(root, cache, [])
+    return findings, stderr.getvalue().strip()
+
+
+def check(runner, root: Path, cache: Path) -> None:
+    cold, summary = run_quietly(runner, root, cache)
+    assert summary == "0 cached, 3 analysed", summary
+    assert [finding.symbol for finding in cold] == ["query-in-loop"], cold
+
+    warm, summary = run_quietly(runner, root, cache)
+    assert summary == "3 cached, 0 analysed", summary
+    assert warm == cold, "warm run must replay the cached findings"
+
+    (root / "app" / "views.py").write_text(CLEAN + "\n\nVIEWS = 1\n")
+    edited, summary = run_quietly(runner, root, cache)
+    assert summary == "2 cached, 1 analysed", summary
+    assert edited == [], edited
+
+
+def check_packages(runner, root: Path, cache: Path) -> None:
+    """Same-content modules in two packages, and a module that does not parse."""
+    for package in ("shop", "blog"):
+        (root / package).mkdir(parents=True)
+        (root / package / "__init__.py").write_text("from .models import report\n")
+        (root / package / "models.py").write_text(CLEAN)
+    (root / "broken.py").write_text("def report(:\n")
+
+    findings, summary = run_quietly(runner, root, cache)
+    assert summary == "0 cached, 5 analysed", summary
+    assert [finding.symbol for finding in findings] == ["syntax-error"], findings
+
+    # blog/__init__.py depends on blog.models, not on the shop.models its twin imports
+    (root / "blog" / "models.py").write_text(N_PLUS_ONE)
+    findings, summary = run_quietly(runner, root, cache)
+    assert summary == "3 cached, 2 analysed", summary
+
+
+def main() -> None:
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        base = Path(directory).resolve()
+        plugins = base / "plugins"
+        plugins.mkdir()
+        shutil.copy(HERE / "pylint-custom-checker.py", plugins / "query_in_loop.py")
+        sys.path.insert(0, str(plugins))
+        runner = load_runner()
+
+        root = base / "project"
+        (root / "app").mkdir(parents=True)
+        (root / "app" / "__init__.py").write_text("")
+        (root / "app" / "views.py").write_text(N_PLUS_ONE)
+        (root / "app" / "models.py").write_text(CLEAN)
+        cache = base / "cache.sqlite"
+        os.chdir(base)
+        try:
+            check(runner, root, cache)
+            check_packages(runner, base / "packages", base / "packages.sqlite")
+        finally:
+            os.chdir(previous)
+
+    print("incremental runner checks passed")
+
+
+if __name__ == "__main__":
+    main()
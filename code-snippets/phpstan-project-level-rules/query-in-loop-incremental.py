@@ -0,0 +1,241 @@
+"""
+Incremental runner for the query-in-loop checker
+
+Runs QueryInLoopChecker (pylint-custom-checker.py, saved on the plugin path
+as `query_in_loop.py`) over a project, caching results on disk. A module's
+findings are keyed by its content hash, the content hashes of every project
+module it imports (transitively), and the checker version. Unchanged modules
+replay their stored W9001/W9002 messages without being parsed; only modules
+whose key changed are handed to pylint.
+
+Usage: python query-in-loop-incremental.py src/ [--cache .query-in-loop.sqlite]
+"""
+
+import argparse
+import ast
+import hashlib
+import importlib
+import json
+import sqlite3
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import astroid
+import pylint
+from pylint.lint import Run
+from pylint.reporters import CollectingReporter
+
+CHECKER_MODULE = "query_in_loop"
+CHECKER_SYMBOLS = ("query-in-loop", "query-in-loop-via-call")
+# Kept on so a module the runner could not parse is reported, not dropped
+REPORTED_SYMBOLS = (*CHECKER_SYMBOLS, "syntax-error")
+
+
+@dataclass(frozen=True)
+class Finding:
+    """One stored checker message, replayable without the AST."""
+
+    path: str
+    line: int
+    column: int
+    msg_id: str
+    symbol: str
+    message: str
+
+    def format(self) -> str:
+        return f"{self.path}:{self.line}:{self.column}: {self.msg_id}: {self.message} ({self.symbol})"
+
+
+class ResultCache:
+    """SQLite-backed store for per-module imports and findings."""
+
+    def __init__(self, path: Path) -> None:
+        self._db = sqlite3.connect(path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS module_imports (import_key TEXT PRIMARY KEY, modules TEXT);
+            CREATE TABLE IF NOT EXISTS findings (result_key TEXT PRIMARY KEY, messages TEXT);
+            """
+        )
+
+    def imports(self, import_key: str) -> list[str] | None:
+        row = self._db.execute(
+            "SELECT modules FROM module_imports WHERE import_key = ?", (import_key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def store_imports(self, import_key: str, modules: list[str]) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO module_imports VALUES (?, ?)", (import_key, json.dumps(modules))
+        )
+
+    def findings(self, result_key: str) -> list[Finding] | None:
+        row = self._db.execute(
+            "SELECT messages FROM findings WHERE result_key = ?", (result_key,)
+        ).fetchone()
+        return [Finding(**item) for item in json.loads(row[0])] if row else None
+
+    def store_findings(self, result_key: str, findings: list[Finding]) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO findings VALUES (?, ?)",
+            (result_key, json.dumps([asdict(finding) for finding in findings])),
+        )
+
+    def commit(self) -> None:
+        self._db.commit()
+
+
+def checker_version(pylint_args: list[str]) -> str:
+    """Hash everything that can change a finding other than the module itself."""
+    checker = importlib.import_module(CHECKER_MODULE)
+    digest = hashlib.sha256(Path(checker.__file__).read_bytes())
+    digest.update(f"{pylint.__version__}:{astroid.__version__}".encode())
+    digest.update("\0".join(pylint_args).encode())
+    return digest.hexdigest()
+
+
+def discover_modules(root: Path) -> dict[str, Path]:
+    """Map dotted module names to files under the project root."""
+    modules = {}
+    for path in sorted(root.rglob("*.py")):
+        parts = path.relative_to(root).with_suffix("").parts
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        if parts:
+            modules[".".join(parts)] = path
+    return modules
+
+
+def parse_imports(source: bytes, module_name: str, is_package: bool) -> list[str]:
+    """
+    List every dotted name a module imports, with relative imports resolved.
+    `from pkg import helper` records both `pkg` and `pkg.helper`, since the
+    name may be a submodule. A module that does not parse imports nothing;
+    pylint reports its syntax error.
+    """
+    package = module_name.split(".") if is_package else module_name.split(".")[:-1]
+    imported = set()
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):  # ValueError: null bytes, before Python 3.12
+        return []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imported.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = package[: len(package) - node.level + 1] if node.level else []
+            target = ".".join([*base, node.module] if node.module else base)
+            imported.add(target)
+            imported.update(f"{target}.{alias.name}" for alias in node.names)
+
+    return sorted(imported)
+
+
+def dependency_closure(name: str, imports: dict[str, list[str]]) -> set[str]:
+    """Project modules reachable from `name` through imports."""
+    seen: set[str] = set()
+    pending = [name]
+    while pending:
+        for dependency in imports[pending.pop()]:
+            if dependency in imports and dependency not in seen:
+                seen.add(dependency)
+                pending.append(dependency)
+    seen.discard(name)
+    return seen
+
+
+def analyse(paths: list[Path], pylint_args: list[str]) -> dict[str, list[Finding]]:
+    """Run pylint with only the query-in-loop messages on the given files."""
+    reporter = CollectingReporter()
+    # astroid caches parsed modules per process; drop them so a second run()
+    # in the same process sees edited files
+    astroid.MANAGER.clear_cache()
+    Run(
+        [
+            f"--load-plugins={CHECKER_MODULE}",
+            "--disable=all",
+            f"--enable={','.join(REPORTED_SYMBOLS)}",
+            *pylint_args,
+            *map(str, paths),
+        ],
+        reporter=reporter,
+        exit=False,
+    )
+
+    # Keyed by absolute path: message.path is relative to the working directory
+    results: dict[str, list[Finding]] = {str(path.resolve()): [] for path in paths}
+    for message in reporter.messages:
+        results.setdefault(str(Path(message.abspath).resolve()), []).append(
+            Finding(
+                message.path,
+                message.line,
+                message.column,
+                message.msg_id,
+                message.symbol,
+                message.msg,
+            )
+        )
+    return results
+
+
+def run(root: Path, cache_path: Path, pylint_args: list[str]) -> list[Finding]:
+    """Replay cached findings and analyse only modules whose key changed."""
+    cache = ResultCache(cache_path)
+    version = checker_version(pylint_args)
+    modules = discover_modules(root)
+
+    hashes: dict[str, str] = {}
+    imports: dict[str, list[str]] = {}
+    for name, path in modules.items():
+        source = path.read_bytes()
+        hashes[name] = hashlib.sha256(source).hexdigest()
+        is_package = path.name == "__init__.py"
+        # Relative imports resolve against the module's own name, so identical
+        # files in different packages need their own rows
+        import_key = f"{name}:{int(is_package)}:{hashes[name]}"
+        cached_imports = cache.imports(import_key)
+        if cached_imports is None:
+            cached_imports = parse_imports(source, name, is_package)
+            cache.store_imports(import_key, cached_imports)
+        imports[name] = cached_imports
+
+    findings: list[Finding] = []
+    stale: dict[str, str] = {}
+    for name, path in modules.items():
+        dependencies = sorted(dependency_closure(name, imports))
+        key = hashlib.sha256(
+            "\0".join([version, hashes[name], *(hashes[dep] for dep in dependencies)]).encode()
+        ).hexdigest()
+        cached_findings = cache.findings(key)
+        if cached_findings is None:
+            stale[str(path.resolve())] = key
+        else:
+            findings.extend(cached_findings)
+
+    if stale:
+        for path, module_findings in analyse(list(map(Path, stale)), pylint_args).items():
+            if path in stale:
+                cache.store_findings(stale[path], module_findings)
+            findings.extend(module_findings)
+
+    cache.commit()
+    print(f"{len(modules) - len(stale)} cached, {len(stale)} analysed", file=sys.stderr)
+    return sorted(findings, key=lambda f: (f.path, f.line, f.column))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--cache", type=Path, default=Path(".query-in-loop.sqlite"))
+    args, pylint_args = parser.parse_known_args()
+
+    findings = run(args.root, args.cache, pylint_args)
+    for finding in findings:
+        print(finding.format())
+    return 1 if findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
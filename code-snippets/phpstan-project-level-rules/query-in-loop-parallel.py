@@ -0,0 +1,278 @@
+"""
+Parallel whole-project driver for the query-in-loop checker
+
+`pylint -j` shares nothing between workers, and QueryInLoopChecker keeps
+per-instance loop state, so cross-module N+1s (a loop calling a helper that
+queries in another module) are invisible to it. This driver runs the same
+checker (pylint-custom-checker.py, saved on the plugin path as
+`query_in_loop.py`) in two phases:
+
+1. Map: a process pool parses each module with astroid and walks it with a
+   per-process checker, producing its intra-module findings plus a summary of
+   which functions query and which imported functions are called.
+2. Reduce: the parent merges summaries, propagates "runs a query" (and the
+   estimated queries per call) across module boundaries to a fixed point, and
+   reports in-loop calls to imported querying functions as W9002.
+
+Results are sorted, so `--jobs 1` and `--jobs N` print identical output.
+
+Usage: python query-in-loop-parallel.py src/ [--jobs 8]
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import astroid
+from astroid import nodes
+from pylint.lint import PyLinter
+from pylint.utils.ast_walker import ASTWalker
+
+from query_in_loop import MAX_ESTIMATE, QueryInLoopChecker
+
+
+@dataclass(frozen=True, order=True)
+class Finding:
+    path: str
+    line: int
+    column: int
+    msg_id: str
+    symbol: str
+    message: str
+
+    def format(self) -> str:
+        return f"{self.path}:{self.line}:{self.column}: {self.msg_id}: {self.message} ({self.symbol})"
+
+
+@dataclass(frozen=True)
+class LoopCall:
+    """An in-loop call the checker cannot resolve to a querying function alone."""
+
+    callee: str
+    path: str
+    line: int
+    column: int
+    loop_type: str
+    depth: int
+    multiplicity: int
+
+
+@dataclass
+class ModuleSummary:
+    """Everything the reduce phase needs; small and picklable, no AST."""
+
+    findings: list[Finding] = field(default_factory=list)
+    # Qualified function name -> estimated queries per call
+    querying: dict[str, int] = field(default_factory=dict)
+    # Qualified function name -> callees not yet known to query (imported
+    # ones, and local ones that may query via an import), with the loop
+    # multiplicity at the call site
+    calls: dict[str, list[tuple[str, int]]] = field(default_factory=dict)
+    loop_calls: list[LoopCall] = field(default_factory=list)
+
+
+class CollectingChecker(QueryInLoopChecker):
+    """The pylint checker, with messages captured instead of reported."""
+
+    def __init__(self, linter: PyLinter) -> None:
+        super().__init__(linter)
+        self.path = ""
+        self.findings: list[Finding] = []
+        self._symbols = {msg[1]: msg_id for msg_id, msg in self.msgs.items()}
+
+    def add_message(
+        self,
+        msgid: str,
+        line: Optional[int] = None,
+        node: Optional[nodes.NodeNG] = None,
+        args: Any = None,
+        **kwargs: Any,
+    ) -> None:
+        msg_id = self._symbols[msgid]
+        self.findings.append(
+            Finding(
+                self.path,
+                node.lineno,
+                node.col_offset,
+                msg_id,
+                msgid,
+                self.msgs[msg_id][0] % args,
+            )
+        )
+
+
+_checker: Optional[CollectingChecker] = None
+_walker: Optional[ASTWalker] = None
+
+
+def _init_worker() -> None:
+    """Build one checker per process; its loop state never crosses workers."""
+    global _checker, _walker
+    linter = PyLinter()
+    _checker = CollectingChecker(linter)
+    linter.register_checker(_checker)
+    _checker.open()
+    _walker = ASTWalker(linter)
+    _walker.add_checker(_checker)
+
+
+def _imported_name(call: nodes.Call) -> Optional[str]:
+    """
+    Resolve `helper(...)` bound by `from mod import helper`, and
+    `mod.helper(...)` bound by `import mod` or `from pkg import mod`, to the
+    helper's qualified name.
+    """
+    func = call.func
+    if isinstance(func, nodes.Name):
+        name_node, attribute = func, None
+    elif isinstance(func, nodes.Attribute) and isinstance(func.expr, nodes.Name):
+        name_node, attribute = func.expr, func.attrname
+    else:
+        return None
+
+    name = name_node.name
+    _, assignments = name_node.lookup(name)
+    if len(assignments) != 1:
+        return None
+    binding = assignments[0]
+
+    if isinstance(binding, nodes.ImportFrom):
+        module = call.root().relative_to_absolute_name(binding.modname, binding.level)
+        imported = f"{module}.{binding.real_name(name)}"
+        # `from pkg import module` then `module.helper(...)`
+        return imported if attribute is None else f"{imported}.{attribute}"
+    if isinstance(binding, nodes.Import) and attribute is not None:
+        return f"{binding.real_name(name)}.{attribute}"
+    return None
+
+
+def summarise(job: tuple[str, str]) -> ModuleSummary:
+    """Map phase: analyse one module in a worker process."""
+    module_name, path = job
+    module = astroid.MANAGER.ast_from_file(path, modname=module_name)
+
+    _checker.path = path
+    _checker.findings = []
+    _walker.walk(module)
+
+    summary = ModuleSummary(findings=_checker.findings)
+    summary.querying = {
+        function.qname(): estimate
+        for function, estimate in _checker._querying_functions.items()
+    }
+
+    for function in module.nodes_of_class(nodes.FunctionDef):
+        callees = summary.calls.setdefault(function.qname(), [])
+        for call in function.nodes_of_class(nodes.Call):
+            if call.frame() is not function:
+                continue
+            local = _checker._resolve_local_function(call)
+            if local is not None:
+                if local in _checker._querying_functions:
+                    continue  # Already reported by the checker itself
+                callee = local.qname()
+            else:
+                callee = _imported_name(call)
+                if callee is None:
+                    continue
+            loops = _checker._enclosing_loops(call)
+            multiplicity = _checker._loop_multiplicity(call, loops)
+            callees.append((callee, multiplicity))
+            if loops:
+                summary.loop_calls.append(
+                    LoopCall(
+                        callee,
+                        path,
+                        call.lineno,
+                        call.col_offset,
+                        _checker._get_loop_type(call, loops),
+                        len(loops),
+                        multiplicity,
+                    )
+                )
+
+    return summary
+
+
+def merge(summaries: list[ModuleSummary]) -> list[Finding]:
+    """Reduce phase: propagate querying functions across modules."""
+    querying: dict[str, int] = {}
+    calls: dict[str, list[tuple[str, int]]] = {}
+    for summary in summaries:
+        querying.update(summary.querying)
+        calls.update(summary.calls)
+
+    changed = True
+    while changed:
+        changed = False
+        for function, callees in calls.items():
+            for callee, multiplicity in callees:
+                if callee not in querying:
+                    continue
+                estimate = min(querying[callee] * multiplicity, MAX_ESTIMATE)
+                if estimate > querying.get(function, 0):
+                    querying[function] = estimate
+                    changed = True
+
+    message = QueryInLoopChecker.msgs["W9002"][0]
+    findings = {finding for summary in summaries for finding in summary.findings}
+    for summary in summaries:
+        for call in summary.loop_calls:
+            if call.callee in querying:
+                estimate = min(call.multiplicity * querying[call.callee], MAX_ESTIMATE)
+                description = f"{call.loop_type}, depth {call.depth}, ~{estimate} queries"
+                findings.add(
+                    Finding(
+                        call.path,
+                        call.line,
+                        call.column,
+                        "W9002",
+                        "query-in-loop-via-call",
+                        message % (call.callee.rsplit(".", 1)[-1], description),
+                    )
+                )
+    return sorted(findings)
+
+
+def discover_modules(root: Path) -> list[tuple[str, str]]:
+    """Dotted module names and paths for every file under the root."""
+    modules = []
+    for path in sorted(root.rglob("*.py")):
+        parts = path.relative_to(root).with_suffix("").parts
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        if parts:
+            modules.append((".".join(parts), str(path)))
+    return modules
+
+
+def run(root: Path, jobs: int) -> list[Finding]:
+    modules = discover_modules(root)
+    if jobs == 1:
+        _init_worker()
+        return merge([summarise(module) for module in modules])
+
+    # Large chunks amortise pickling; several per worker keep the tail short
+    chunksize = max(1, len(modules) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        return merge(list(pool.map(summarise, modules, chunksize=chunksize)))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    findings = run(args.root, args.jobs)
+    for finding in findings:
+        print(finding.format())
+    return 1 if findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
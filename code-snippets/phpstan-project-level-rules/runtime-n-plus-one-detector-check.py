@@ -0,0 +1,105 @@
+"""
+Checks for runtime-n-plus-one-detector.py against sqlite3
+
+Asserts both sides of the detector: repeated shapes from one call site are
+flagged, and batched queries, calls under the threshold and unsampled units
+are not. Statements sent through the connection's execute and executemany
+shortcuts are counted the same way as those sent through a cursor, and
+iterating a cursor pulls rows as they are consumed.
+
+Usage: python runtime-n-plus-one-detector-check.py
+"""
+
+import importlib.util
+import itertools
+import sqlite3
+from pathlib import Path
+
+spec = importlib.util.spec_from_file_location(
+    "runtime_n_plus_one_detector", Path(__file__).with_name("runtime-n-plus-one-detector.py")
+)
+detector_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(detector_module)
+NPlusOneDetector = detector_module.NPlusOneDetector
+TracedConnection = detector_module.TracedConnection
+
+
+def connect(detector: NPlusOneDetector) -> TracedConnection:
+    db = TracedConnection(sqlite3.connect(":memory:"), detector)
+    db.execute("CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT)")
+    db.executemany("INSERT INTO customers VALUES (?, ?)", [(i, f"c{i}") for i in range(50)])
+    return db
+
+
+def check_flags_repeated_lookups() -> None:
+    detector = NPlusOneDetector(threshold=3)
+    db = connect(detector)
+    with detector.unit_of_work("n+1") as reports:
+        for customer_id in range(20):
+            db.execute(f"SELECT name FROM customers WHERE id = {customer_id}").fetchone()
+    assert len(reports) == 1, reports
+    assert reports[0].count == 20
+    assert reports[0].sql == "SELECT name FROM customers WHERE id = ?"
+    assert reports[0].stack[0][0] == __file__, "report points at the calling code"
+
+
+def check_ignores_batched_and_rare_queries() -> None:
+    detector = NPlusOneDetector(threshold=3)
+    db = connect(detector)
+    with detector.unit_of_work("batched") as reports:
+        ids = list(range(20))
+        placeholders = ", ".join("?" for _ in ids)
+        db.execute(f"SELECT id, name FROM customers WHERE id IN ({placeholders})", ids).fetchall()
+        for customer_id in range(2):
+            db.execute("SELECT name FROM customers WHERE id = ?", (customer_id,)).fetchone()
+    assert reports == [], reports
+
+
+def check_executemany_is_traced() -> None:
+    detector = NPlusOneDetector(threshold=3)
+    db = connect(detector)
+    with detector.unit_of_work("executemany in a loop") as reports:
+        for batch in range(5):
+            db.executemany("UPDATE customers SET name = ? WHERE id = ?", [(f"n{batch}", batch)])
+    assert [report.count for report in reports] == [5], reports
+    assert reports[0].sql.startswith("UPDATE customers")
+
+    with detector.unit_of_work("one executemany") as reports:
+        db.executemany("UPDATE customers SET name = ? WHERE id = ?", [("x", i) for i in range(50)])
+    assert reports == [], reports
+
+
+def check_iteration_is_lazy() -> None:
+    detector = NPlusOneDetector(threshold=3)
+    db = connect(detector)
+    produced = []
+    db.create_function("produce", 1, lambda value: produced.append(value) or value)
+    with detector.unit_of_work("scan"):
+        cursor = db.execute("SELECT produce(id) FROM customers ORDER BY id")
+        assert [row[0] for row in itertools.islice(cursor, 3)] == [0, 1, 2]
+    assert len(produced) <= 4, "rows are pulled as they are consumed, not fetched all at once"
+
+
+def check_sampling_and_limits() -> None:
+    detector = NPlusOneDetector(threshold=3, sample_rate=0.0)
+    db = connect(detector)
+    with detector.unit_of_work("unsampled") as reports:
+        for customer_id in range(20):
+            db.execute("SELECT name FROM customers WHERE id = ?", (customer_id,)).fetchone()
+    assert reports == [] and not detector.reports
+
+    detector = NPlusOneDetector(threshold=1, max_fingerprints=2)
+    db = connect(detector)
+    with detector.unit_of_work("many shapes") as reports:
+        for column in ("id", "name", "rowid", "id + 1"):
+            db.execute(f"SELECT {column} FROM customers").fetchall()
+    assert len(reports) == 2 and detector.dropped == 2, (reports, detector.dropped)
+
+
+if __name__ == "__main__":
+    check_flags_repeated_lookups()
+    check_ignores_batched_and_rare_queries()
+    check_executemany_is_traced()
+    check_iteration_is_lazy()
+    check_sampling_and_limits()
+    print("runtime N+1 detector checks passed")
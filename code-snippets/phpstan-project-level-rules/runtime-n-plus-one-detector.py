@@ -0,0 +1,271 @@
+"""
+Runtime N+1 detector: the dynamic companion to the query-in-loop checker
+
+Static analysis cannot follow dynamic dispatch, so this wraps a DB-API
+connection instead. Every `execute`/`executemany`/`fetch*` call (the same
+names as QueryInLoopChecker.QUERY_METHODS) is attributed to a fingerprint of
+the normalised SQL plus the calling stack. When a unit of work (one request,
+one job) ends, any fingerprint repeated `threshold` times or more is
+reported with its count and cumulative time.
+
+Built to stay on in staging:
+- Sampling: only `sample_rate` of units of work are traced; the rest pay one
+  context-variable lookup per query.
+- Bounded memory: at most `max_fingerprints` distinct shapes per unit, stacks
+  truncated to `stack_depth` frames, and reports kept in a fixed-size ring
+  buffer.
+"""
+
+import contextvars
+import random
+import re
+import sqlite3
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional, Sequence
+
+Frame = tuple[str, int, str]
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+# The detector's own frames between the caller and record()
+_INTERNAL_FRAMES = {"record", "_caller_stack", "execute", "executemany"}
+
+# Marks the end of a driver cursor's rows
+_END = object()
+
+
+def normalise_sql(sql: str) -> str:
+    """
+    Reduce a statement to its shape: literals become `?`, IN lists of any
+    length collapse to `IN (?+)`, and whitespace is squeezed.
+    """
+    shape = _LITERALS.sub("?", sql)
+    shape = _IN_LISTS.sub("IN (?+)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@dataclass(frozen=True)
+class NPlusOneReport:
+    """A query shape repeated within one unit of work from one call site."""
+
+    unit: str
+    sql: str
+    count: int
+    total_seconds: float
+    stack: tuple[Frame, ...]
+
+    def format(self) -> str:
+        frames = "\n".join(f"    {path}:{line} in {name}" for path, line, name in self.stack)
+        return (
+            f"[{self.unit}] {self.count}x {self.total_seconds * 1000:.1f}ms: {self.sql}\n"
+            f"{frames}"
+        )
+
+
+@dataclass
+class _Stats:
+    sql: str
+    stack: tuple[Frame, ...]
+    count: int = 0
+    total_seconds: float = 0.0
+
+
+@dataclass
+class _UnitOfWork:
+    name: str
+    stats: dict[tuple[str, tuple[Frame, ...]], _Stats] = field(default_factory=dict)
+    dropped: int = 0
+
+
+class NPlusOneDetector:
+    """Collects query statistics per unit of work and reports repeats."""
+
+    def __init__(
+        self,
+        threshold: int = 5,
+        sample_rate: float = 1.0,
+        max_fingerprints: int = 256,
+        stack_depth: int = 6,
+        history: int = 100,
+    ) -> None:
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.max_fingerprints = max_fingerprints
+        self.stack_depth = stack_depth
+        self.reports: deque[NPlusOneReport] = deque(maxlen=history)
+        # Queries not tracked because a unit hit max_fingerprints
+        self.dropped = 0
+        self._current: contextvars.ContextVar[Optional[_UnitOfWork]] = contextvars.ContextVar(
+            "n_plus_one_unit", default=None
+        )
+
+    @contextmanager
+    def unit_of_work(self, name: str) -> Iterator[list[NPlusOneReport]]:
+        """
+        Trace the queries issued inside the block (if sampled). The yielded
+        list is filled with this unit's reports when the block exits.
+        """
+        found: list[NPlusOneReport] = []
+        if random.random() >= self.sample_rate:
+            yield found
+            return
+
+        token = self._current.set(_UnitOfWork(name))
+        try:
+            yield found
+        finally:
+            unit = self._current.get()
+            self._current.reset(token)
+            found.extend(self._finish(unit))
+
+    def record(self, sql: str, elapsed: float) -> Optional[_Stats]:
+        """Attribute one execute call to its shape and call site."""
+        unit = self._current.get()
+        if unit is None:
+            return None
+
+        stack = self._caller_stack()
+        shape = normalise_sql(sql)
+        stats = unit.stats.get((shape, stack))
+        if stats is None:
+            if len(unit.stats) >= self.max_fingerprints:
+                unit.dropped += 1
+                return None
+            stats = unit.stats[(shape, stack)] = _Stats(shape, stack)
+        stats.count += 1
+        stats.total_seconds += elapsed
+        return stats
+
+    def _caller_stack(self) -> tuple[Frame, ...]:
+        """The innermost caller frames, cheapest way available."""
+        frames = []
+        frame = sys._getframe(1)
+        while frame is not None and len(frames) < self.stack_depth:
+            code = frame.f_code
+            if code.co_filename != __file__ or code.co_name not in _INTERNAL_FRAMES:
+                frames.append((code.co_filename, frame.f_lineno, code.co_name))
+            frame = frame.f_back
+        return tuple(frames)
+
+    def _finish(self, unit: _UnitOfWork) -> list[NPlusOneReport]:
+        found = [
+            NPlusOneReport(unit.name, stats.sql, stats.count, stats.total_seconds, stats.stack)
+            for stats in unit.stats.values()
+            if stats.count >= self.threshold
+        ]
+        found.sort(key=lambda report: report.total_seconds, reverse=True)
+        self.reports.extend(found)
+        self.dropped += unit.dropped
+        return found
+
+
+class TracedCursor:
+    """DB-API cursor proxy that times execute and fetch calls."""
+
+    def __init__(self, cursor: Any, detector: NPlusOneDetector) -> None:
+        self._cursor = cursor
+        self._detector = detector
+        self._stats: Optional[_Stats] = None
+
+    def execute(self, sql: str, parameters: Sequence[Any] = ()) -> "TracedCursor":
+        start = time.perf_counter()
+        self._cursor.execute(sql, parameters)
+        self._stats = self._detector.record(sql, time.perf_counter() - start)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Sequence[Sequence[Any]]) -> "TracedCursor":
+        start = time.perf_counter()
+        self._cursor.executemany(sql, seq_of_parameters)
+        self._stats = self._detector.record(sql, time.perf_counter() - start)
+        return self
+
+    def _timed_fetch(self, method: str, *args: Any) -> Any:
+        start = time.perf_counter()
+        result = getattr(self._cursor, method)(*args)
+        if self._stats is not None:
+            # Fetch time belongs to the statement that produced the rows
+            self._stats.total_seconds += time.perf_counter() - start
+        return result
+
+    def fetchone(self) -> Any:
+        return self._timed_fetch("fetchone")
+
+    def fetchmany(self, size: int = 1) -> list[Any]:
+        return self._timed_fetch("fetchmany", size)
+
+    def fetchall(self) -> list[Any]:
+        return self._timed_fetch("fetchall")
+
+    def __iter__(self) -> Iterator[Any]:
+        # Row by row from the driver, so a large scan is never held in memory
+        rows, stats = iter(self._cursor), self._stats
+        while True:
+            start = time.perf_counter()
+            row = next(rows, _END)
+            if stats is not None:
+                stats.total_seconds += time.perf_counter() - start
+            if row is _END:
+                return
+            yield row
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class TracedConnection:
+    """DB-API connection proxy whose cursors report to the detector."""
+
+    def __init__(self, connection: Any, detector: NPlusOneDetector) -> None:
+        self._connection = connection
+        self._detector = detector
+
+    def cursor(self) -> TracedCursor:
+        return TracedCursor(self._connection.cursor(), self._detector)
+
+    def execute(self, sql: str, parameters: Sequence[Any] = ()) -> TracedCursor:
+        """sqlite3-style shortcut: a new cursor per statement."""
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Sequence[Sequence[Any]]) -> TracedCursor:
+        """sqlite3-style shortcut, traced like execute()."""
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+
+# Usage against sqlite3: the classic N+1 and its batched fix
+if __name__ == "__main__":
+    detector = NPlusOneDetector(threshold=3)
+    db = TracedConnection(sqlite3.connect(":memory:"), detector)
+    db.execute("CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT)")
+    db.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER)")
+    db.executemany("INSERT INTO customers VALUES (?, ?)", [(i, f"c{i}") for i in range(50)])
+    db.executemany("INSERT INTO orders VALUES (?, ?)", [(i, i % 50) for i in range(200)])
+
+    def order_report_n_plus_one() -> None:
+        for order_id, customer_id in db.execute("SELECT id, customer_id FROM orders").fetchall():
+            db.execute(f"SELECT name FROM customers WHERE id = {customer_id}").fetchone()
+
+    def order_report_batched() -> None:
+        orders = db.execute("SELECT id, customer_id FROM orders").fetchall()
+        ids = sorted({customer_id for _, customer_id in orders})
+        placeholders = ", ".join("?" for _ in ids)
+        db.execute(f"SELECT id, name FROM customers WHERE id IN ({placeholders})", ids).fetchall()
+
+    with detector.unit_of_work("GET /orders (n+1)") as reports:
+        order_report_n_plus_one()
+    for report in reports:
+        print(report.format())
+    # [GET /orders (n+1)] 200x 0.7ms: SELECT name FROM customers WHERE id = ?
+
+    with detector.unit_of_work("GET /orders (batched)") as reports:
+        order_report_batched()
+    print(f"batched: {len(reports)} reports")
+    # batched: 0 reports
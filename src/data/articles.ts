@@ -469,7 +469,7 @@ export const SAMPLE_ARTICLES: readonly Article[] = [
 <section>
     <h2>Python: Same Principles, Different Syntax</h2>
 
-    <p>The principles port directly. Python's <code>raise ... from previous</code> is the language-level equivalent of PHP's <code>previous</code> constructor argument. Data goes on instance attributes, <code>__str__</code> synthesises the message from them.</p>
+    <p>The principles port directly. Python's <code>raise ... from previous</code> is the language-level equivalent of PHP's <code>previous</code> constructor argument. Data is declared as annotated fields: the values are stored once in the exception's <code>args</code> and read back through read-only properties, construction fails with <code>TypeError</code> unless every field is given, and <code>__str__</code> synthesises the message from them only when it is rendered.</p>
 
     <pre><code class="language-python">{{SNIPPET:php-exception-best-practices/python-exceptions.py}}</code></pre>
 
@@ -6371,7 +6371,7 @@ to explore the full documentation and get started with intelligent command manag
 
         <section>
             <h2>The Solution: Sub-Agent Detection and Control</h2>
-            <p>We can solve this by creating a hook that detects when it's running in a sub-agent context and blocks test execution, while still allowing other QA tools like static analysis and code style checks.</p>
+            <p>We can solve this by creating a hook that detects when it's running in a sub-agent context and stops unscheduled test runs, sending them through a small scheduler instead, while still allowing other QA tools like static analysis and code style checks.</p>
 
             <p>The key insight is that sub-agents run as child processes of the main <code>claude</code> process. By examining the parent process ID (PPID), we can determine whether we're in the main session or a sub-agent.</p>
         </section>
@@ -6390,27 +6390,41 @@ to explore the full documentation and get started with intelligent command manag
             <h3>1. Sub-Agent Detection</h3>
             <p>The <code>is_subagent()</code> function uses process inspection to determine context:</p>
             <ul>
-                <li>Gets the parent process ID using <code>os.getppid()</code></li>
-                <li>Queries the parent's command name using <code>ps</code></li>
+                <li>Gets the parent process ID using <code>os.getppid()</code> (the daemon is sent the client's instead)</li>
+                <li>Reads the parent's command name from <code>/proc/&lt;ppid&gt;/comm</code>, so no subprocess is forked per call; <code>ps</code> is only run on systems without <code>/proc</code>, such as macOS</li>
+                <li>Caches the name for a few seconds, so a long-running daemon does not misread a reused PID</li>
                 <li>Returns <code>True</code> if the parent is the <code>claude</code> process</li>
                 <li>Fails open (returns <code>False</code>) on errors to avoid blocking legitimate operations</li>
             </ul>
 
-            <h3>2. Command Pattern Matching</h3>
-            <p>The hook uses regex patterns to categorize commands:</p>
+            <h3>2. Command Matching</h3>
+            <p>The rules live in <code>subagent-test-rules.json</code>, next to the hook. Each rule names a tool and, optionally, a regex over that tool's arguments:</p>
+
+            <pre><code class="language-json">{{SNIPPET:claude-code-hooks-subagent-control/subagent-test-rules.json}}
+</code></pre>
+
+            <p>Rather than running every pattern over the command, <code>RuleSet.classify()</code> tokenises it once:</p>
             <ul>
-                <li><strong>Test commands</strong>: PHPUnit, Infection, <code>bin/qa -t unit</code></li>
-                <li><strong>Allowed QA commands</strong>: <code>bin/qa -t allCs</code>, <code>bin/qa -t allStatic</code></li>
-                <li><strong>All other commands</strong>: Allowed without restriction</li>
+                <li>A single regex splits the command into words and separators: <code>;</code>, <code>&amp;</code>, <code>&amp;&amp;</code>, <code>||</code>, <code>|</code>, newlines, parentheses and backticks. The <code>&amp;</code> in a redirection such as <code>2&gt;&amp;1</code> is not a separator</li>
+                <li>Each word is looked up by its last path component in a dict of tool names, so <code>vendor/bin/phpunit</code> and <code>phpunit</code> hit the same rule, and adding rules does not slow the scan down</li>
+                <li>Quotes, <code>$</code> and redirections only end a word, so a test run hidden in <code>bash -c '...'</code>, <code>$(...)</code> or a subshell is still seen</li>
+                <li>Rules are settled per segment: a segment that matches an allow rule (<code>bin/qa -t allCs</code>, <code>bin/qa -t allStatic</code>) passes, while a segment that matches only block rules (PHPUnit, Infection, <code>bin/qa -t unit</code>) blocks the whole command. Chaining or backgrounding a test run next to an allowed command therefore does not get it through</li>
+                <li>Commands that match no rule are allowed without restriction</li>
             </ul>
 
-            <h3>3. Selective Blocking</h3>
-            <p>The hook implements a whitelist/blacklist strategy:</p>
+            <h3>3. Scheduling Instead of Blocking</h3>
+            <p>The hook implements an allow/redirect strategy:</p>
             <ul>
                 <li>Main agent: All commands allowed</li>
-                <li>Sub-agents: Static analysis allowed, tests blocked</li>
-                <li>Error response: Structured JSON explaining the block</li>
+                <li>Sub-agents: Static analysis allowed; an unscheduled test command is refused with structured JSON whose <code>retry</code> field holds the same command wrapped as <code>test-slot.py run -- ...</code></li>
+                <li>Scheduled runs: a command that starts with <code>test-slot.py run</code> and has no unquoted separators, subshells or substitutions is allowed, because it waits for a slot before it starts</li>
+                <li>Without <code>test-slot.py</code> next to the hook, test commands are simply blocked</li>
             </ul>
+
+            <p><code>test-slot.py</code> holds one of <code>TEST_SLOTS</code> file locks (one by default) for as long as the test process lives, so runs from different sub-agents queue up instead of colliding. With more than one slot, each run gets <code>TEST_TOKEN</code> set to its slot number, as ParaTest does, so the test bootstrap can point it at its own database. A run still waiting after <code>TEST_SLOT_TIMEOUT</code> seconds exits with code 75 without running anything, and <code>test-slot.py status</code> shows who holds the slots.</p>
+
+            <pre><code class="language-python">{{SNIPPET:claude-code-hooks-subagent-control/test-slot.py}}
+</code></pre>
         </section>
 
         <section>
@@ -6420,7 +6434,9 @@ to explore the full documentation and get started with intelligent command manag
             <pre><code class="language-json">{{SNIPPET:claude-code-hooks-subagent-control/settings.json}}
 </code></pre>
 
-            <p>Make the script executable:</p>
+            <p>The command points at <code>prevent-subagent-tests-client.py</code>, a thin client that asks the long-running daemon (<code>prevent-subagent-tests.py --daemon</code>) for a decision and, when no daemon is running, loads <code>prevent-subagent-tests.py</code> and decides in-process. Starting the daemon is optional; it only removes the per-call rule loading.</p>
+
+            <p>Make the scripts executable, including <code>test-slot.py</code>, which the <code>retry</code> command runs directly:</p>
             <pre><code class="language-bash">{{SNIPPET:claude-code-hooks-subagent-control/make-executable.sh}}
 </code></pre>
         </section>
@@ -6429,13 +6445,13 @@ to explore the full documentation and get started with intelligent command manag
             <h2>Real-World Benefits</h2>
 
             <h3>Prevents Database Lock Conflicts</h3>
-            <p>By blocking parallel test execution, you eliminate SQLite database lock errors that would otherwise cause test failures and confuse the AI agents.</p>
+            <p>By admitting test runs through a slot at a time instead of in parallel, you eliminate SQLite database lock errors that would otherwise cause test failures and confuse the AI agents, while sub-agents still get to run their tests.</p>
 
             <h3>Enables Parallel Static Analysis</h3>
             <p>Sub-agents can still run code style checks (<code>allCs</code>) and static analysis (<code>allStatic</code>) in parallel, since these tools don't share resources.</p>
 
             <h3>Clear Error Messages</h3>
-            <p>When a sub-agent attempts to run tests, it receives a structured JSON response explaining why the operation was blocked and what commands are allowed.</p>
+            <p>When a sub-agent attempts an unscheduled test run, it receives a structured JSON response explaining why, with a <code>retry</code> command it can run as-is to wait for a slot.</p>
 
             <h3>Fail-Safe Design</h3>
             <p>The hook uses a "fail open" strategy. If it can't determine whether it's in a sub-agent, it allows the command. This prevents blocking legitimate operations due to hook errors.</p>